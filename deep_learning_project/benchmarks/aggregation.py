@@ -0,0 +1,52 @@
+"""
+Benchmark of the aggregate features on a synthetic transaction table.
+
+Usage: python -m benchmarks.aggregation [n_rows]
+"""
+import sys
+
+import numpy as np
+
+from benchmarks.synthetic import make_transactions
+from benchmarks.timing import timed
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer
+
+GROUPS = [['date'], ['week_of_year'], ['month'], ['season'], ['country_id'], ['main_category'],
+          ['season', 'country_id'], ['season', 'main_category'], ['country_id', 'main_category']]
+
+
+def groupby_transform(df):
+    """
+    The previous implementation: one `groupby(...).transform` per key set and statistic.
+    """
+    return {(tuple(keys), statistic): df.groupby(keys)['amount'].transform(statistic).to_numpy()
+            for keys in GROUPS for statistic in ('sum', 'mean')}
+
+
+def bincount_aggregator(df):
+    """
+    The single-pass aggregation engine used by `FeatureEngineer`.
+    """
+    aggregator = FeatureEngineer(df).get_aggregator()
+    results = {}
+    for keys in GROUPS:
+        results[(tuple(keys), 'sum')], results[(tuple(keys), 'mean')] = aggregator.sum_and_mean(keys, 'amount')
+    return results
+
+
+if __name__ == '__main__':
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    print(f'Synthetic transactions: {n_rows:,} rows')
+
+    engineer = FeatureEngineer(make_transactions(n_rows))
+    engineer.create_date_feature()
+    engineer.add_time_features()
+    df = engineer.df
+
+    expected = timed('groupby(...).transform x18', groupby_transform, df)
+    actual = timed('GroupAggregator (bincount)', bincount_aggregator, df)
+    for key, values in expected.items():
+        np.testing.assert_allclose(actual[key], values, rtol=1e-9)
+    print('Results match.')
+
+    timed('FeatureEngineer.engineer_features', FeatureEngineer(make_transactions(n_rows)).engineer_features)
@@ -0,0 +1,42 @@
+"""
+Benchmark of the date parsing and calendar features on a synthetic date column.
+
+Usage: python -m benchmarks.dates [n_rows]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.timing import timed
+from services.data_services.preprocessing.feature_engineering import CalendarTable
+
+
+def per_row(dates):
+    """
+    The previous implementation: parse every row, then one `.dt` accessor per field over every row.
+    """
+    parsed = pd.to_datetime(dates, format='%d.%m.%Y', dayfirst=True)
+    return parsed, CalendarTable.derive(parsed)
+
+
+def calendar_table(dates):
+    """
+    The calendar table used by `FeatureEngineer`: parse and derive the distinct dates, then take by code.
+    """
+    calendar = CalendarTable(dates)
+    return calendar.date_column(), pd.DataFrame({field: calendar.field(field) for field in CalendarTable.FIELDS})
+
+
+if __name__ == '__main__':
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    print(f'Synthetic dates: {n_rows:,} rows')
+
+    days = pd.date_range('2013-01-01', periods=1034, freq='D').strftime('%d.%m.%Y').to_numpy()
+    dates = pd.Series(days[np.sort(np.random.default_rng(0).integers(0, len(days), n_rows))], name='date')
+
+    expected_dates, expected_fields = timed('to_datetime + .dt accessors per row', per_row, dates)
+    actual_dates, actual_fields = timed('CalendarTable (unique dates + take)', calendar_table, dates)
+    pd.testing.assert_series_equal(actual_dates, expected_dates)
+    pd.testing.assert_frame_equal(actual_fields, expected_fields)
+    print('Results match.')
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+
+def make_transactions(n_rows, n_shops=60, n_items=22170, n_days=1034, seed=0):
+    """
+    Build a synthetic merged transaction table shaped like the output of `DataPreparer.prepare_data`.
+
+    Parameters:
+    n_rows (int): The number of transaction rows.
+    n_shops (int, optional): The number of distinct shops. Default is 60.
+    n_items (int, optional): The number of distinct items. Default is 22170.
+    n_days (int, optional): The number of distinct dates. Default is 1034.
+    seed (int, optional): The random seed. Default is 0.
+
+    Returns:
+    pandas.DataFrame: The synthetic transactions.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2013-01-01', periods=n_days, freq='D').strftime('%d.%m.%Y').to_numpy()
+    item = rng.integers(0, n_items, n_rows)
+    price = rng.gamma(2.0, 400.0, n_rows).round(2)
+    amount = rng.integers(1, 5, n_rows).astype(np.float64)
+    return pd.DataFrame({
+        'date': dates[np.sort(rng.integers(0, n_days, n_rows))],
+        'shop': rng.integers(0, n_shops, n_rows),
+        'item': item,
+        'price': price,
+        'amount': amount,
+        'total_price': price * amount,
+        'item_category_id': item % 84,
+        'main_category': item % 20,
+        'country_id': rng.integers(0, 31, n_rows),
+    })
@@ -0,0 +1,19 @@
+import time
+
+
+def timed(label, func, *args):
+    """
+    Run a function once and print how long it took.
+
+    Parameters:
+    label (str): The name printed next to the time.
+    func (callable): The function to run.
+    *args: The arguments of the function.
+
+    Returns:
+    object: The result of the function.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    print(f'{label:<40}{time.perf_counter() - start:8.2f}s')
+    return result
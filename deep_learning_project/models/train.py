@@ -24,6 +24,13 @@ class TrainRequest(BaseModel):
     epochs: int = Field(default=10, ge=1, le=999, description="Number of epochs for training.")
     n_components: int = Field(default=10, ge=1, le=49, description="Number of components.")
     train_ratio: float = Field(default=0.8, gt=0, lt=1.0, description="Ratio of the data used for training.")
+    checkpoint_every: int = Field(default=10, ge=1, le=999, description="Number of epochs between training checkpoints.")
+    warm_start: bool = Field(default=False, description="Fine-tune the deployed model on the new rows only.")
+    warm_start_epochs: int = Field(default=5, ge=1, le=999, description="Number of epochs for a warm-start run.")
+    replay_ratio: float = Field(default=0.0, ge=0, le=10.0, description="Replayed old rows per new row in a warm-start run.")
+    validation_ratio: float = Field(default=0.1, gt=0, lt=1.0, description="Share of the training window used for validation.")
+    streaming: bool = Field(default=False, description="Preprocess the training data chunk by chunk from disk.")
+    patience: Optional[int] = Field(default=None, ge=1, le=999, description="Epochs without validation improvement before stopping early.")
     layer_architecture: List[LayerConfig]
 
     @field_validator('layer_architecture', mode='before')
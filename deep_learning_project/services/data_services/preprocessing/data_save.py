@@ -28,7 +28,7 @@ if __name__ == "__main__":
     data = data_handler.prepare_data()
     logger.info("Data prepared.")
 
-    engineer = FeatureEngineer(data)
+    engineer = FeatureEngineer(data, cache_dir='FEATURE_CACHE_DIR')
 
     logger.info("Engineering features...")
     df = engineer.engineer_features()
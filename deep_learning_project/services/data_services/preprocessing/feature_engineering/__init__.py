@@ -1 +1,7 @@
-from .engineering import FeatureEngineer
\ No newline at end of file
+from .engineering import FeatureEngineer
+from .aggregation import GroupAggregator
+from .lags import LagEngine
+from .dates import CalendarTable
+from .stages import FeatureStage, FeatureStageCache
+from .incremental import IncrementalFeatureEngineer, FeatureStateStore
+from .partitioned import PartitionedFeatureEngineer
\ No newline at end of file
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+
+class GroupAggregator:
+    """
+    A class for computing group sums and means of a column for many key sets at once.
+
+    Every key column is factorized only once and the codes are reused by all key sets that
+    contain it. For each key set, the group sums and counts are computed in a single
+    `np.bincount` pass, the mean is derived from them, and both are broadcast back to the
+    rows by indexing with the group codes.
+    """
+
+    DENSE_KEY_LIMIT = 1 << 20
+
+    def __init__(self, df):
+        """
+        Initialize the GroupAggregator with a dataset.
+
+        Parameters:
+        df (DataFrame): The data holding the key and value columns.
+        """
+        self.df = df
+        self._column_codes = {}
+        self._group_codes = {}
+        self._group_counts = {}
+
+    def column_codes(self, column):
+        """
+        Factorize a key column, caching the result.
+
+        Parameters:
+        column (str): The name of the key column.
+
+        Returns:
+        tuple: The integer codes of the rows (-1 for missing keys) and the number of distinct keys.
+        """
+        if column not in self._column_codes:
+            dtype = self.df[column].dtype
+            values = self.df[column].to_numpy() if isinstance(dtype, np.dtype) and dtype.kind in 'iu' else None
+            if values is not None and len(values) and int(values.max()) - int(values.min()) < self.DENSE_KEY_LIMIT:
+                # Small integer keys are their own codes, no hashing needed
+                low = int(values.min())
+                self._column_codes[column] = (values.astype(np.int64) - low, int(values.max()) - low + 1)
+            else:
+                codes, uniques = pd.factorize(self.df[column])
+                self._column_codes[column] = (codes.astype(np.int64), len(uniques))
+        return self._column_codes[column]
+
+    def group_codes(self, keys):
+        """
+        Compute dense group codes for a set of key columns.
+
+        Parameters:
+        keys (list): The names of the key columns.
+
+        Returns:
+        tuple: The group codes of the rows (-1 if any key is missing) and the number of groups.
+        """
+        keys = tuple(keys)
+        if keys not in self._group_codes:
+            codes, n_groups = self.column_codes(keys[0])
+            missing = codes < 0
+            for column in keys[1:]:
+                column_codes, n_keys = self.column_codes(column)
+                missing |= column_codes < 0
+                codes = codes * n_keys + column_codes
+                n_groups *= n_keys
+            if len(keys) > 1 and n_groups > self.DENSE_KEY_LIMIT:
+                codes, uniques = pd.factorize(np.where(missing, -1, codes))
+                n_groups = len(uniques)
+            if missing.any():
+                codes = np.where(missing, -1, codes)
+            self._group_codes[keys] = (codes, n_groups)
+        return self._group_codes[keys]
+
+    def group_counts(self, keys):
+        """
+        Count the rows of every group of a key set, caching the result.
+
+        Parameters:
+        keys (list): The names of the key columns.
+
+        Returns:
+        numpy.ndarray: The number of rows per group.
+        """
+        keys = tuple(keys)
+        if keys not in self._group_counts:
+            codes, n_groups = self.group_codes(keys)
+            self._group_counts[keys] = np.bincount(codes[codes >= 0], minlength=n_groups)
+        return self._group_counts[keys]
+
+    def sum_and_mean(self, keys, column):
+        """
+        Compute the group sum and mean of a column and broadcast them to every row.
+
+        Missing values are skipped, and rows with a missing key get NaN, like
+        `groupby(keys)[column].transform('sum' / 'mean')`.
+
+        Parameters:
+        keys (list): The names of the key columns.
+        column (str): The name of the value column.
+
+        Returns:
+        tuple: The per-row group sums and group means as NumPy arrays.
+        """
+        codes, n_groups = self.group_codes(keys)
+        values = self.df[column].to_numpy()
+        missing_keys = codes < 0
+        has_missing_keys = missing_keys.any()
+        missing_values = np.isnan(values) if values.dtype.kind == 'f' else None
+
+        if has_missing_keys or (missing_values is not None and missing_values.any()):
+            in_group = ~missing_keys if missing_values is None else ~missing_keys & ~missing_values
+            sums = np.bincount(codes[in_group], weights=values[in_group], minlength=n_groups)
+            counts = np.bincount(codes[in_group], minlength=n_groups)
+        else:
+            # Common case: a single pass over the rows without any masking
+            sums = np.bincount(codes, weights=values, minlength=n_groups)
+            counts = self.group_counts(keys)
+        means = np.divide(sums, counts, out=np.full(n_groups, np.nan), where=counts > 0)
+
+        if has_missing_keys:
+            # Code -1 picks the extra NaN slot appended to the group results
+            row_sums = np.append(sums, np.nan).take(codes)
+            row_means = np.append(means, np.nan).take(codes)
+            return row_sums, row_means
+
+        if values.dtype.kind in 'iuf':
+            sums = sums.astype(values.dtype, copy=False)
+        if values.dtype.kind == 'f':
+            means = means.astype(values.dtype, copy=False)
+        return sums.take(codes), means.take(codes)
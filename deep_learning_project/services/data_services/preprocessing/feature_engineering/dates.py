@@ -0,0 +1,88 @@
+import pandas as pd
+
+
+class CalendarTable:
+    """
+    A class for deriving calendar features on the distinct dates of a column only.
+
+    The date column is factorized once; the dates are parsed and the calendar fields are
+    derived for the unique values, then broadcast back to the rows by taking with the codes.
+    A NaT entry is appended to the unique dates so that missing dates (code -1) pick it up.
+    """
+
+    FIELDS = ['month', 'day_of_week', 'day_of_year', 'day_of_month', 'week_of_year', 'season']
+
+    def __init__(self, dates, date_format='%d.%m.%Y'):
+        """
+        Initialize the CalendarTable.
+
+        Parameters:
+        dates (Series): The date of every row, as strings or datetimes.
+        date_format (str): The format of date strings. Default is '%d.%m.%Y'.
+        """
+        codes, uniques = pd.factorize(dates)
+        self.codes = codes
+        parsed = pd.to_datetime(pd.Index(uniques), format=date_format) if len(uniques) else pd.DatetimeIndex([])
+        self.dates = parsed.append(pd.DatetimeIndex([pd.NaT], dtype=parsed.dtype))
+        if not (codes < 0).any():
+            # Without missing dates the fields keep the integer dtypes of the `.dt` accessors
+            self.dates = self.dates[:-1]
+        self.table = self.derive(pd.Series(self.dates))
+
+    @staticmethod
+    def derive(dates):
+        """
+        Derive the calendar fields of a datetime Series, like `FeatureEngineer` does per row.
+
+        Parameters:
+        dates (Series): The dates.
+
+        Returns:
+        DataFrame: One column per calendar field.
+        """
+        return pd.DataFrame({
+            'month': dates.dt.month,
+            'day_of_week': dates.dt.dayofweek,
+            'day_of_year': dates.dt.dayofyear,
+            'day_of_month': dates.dt.day,
+            'week_of_year': dates.dt.isocalendar().week,
+            'season': dates.dt.month % 12 // 3 + 1,
+        })
+
+    def take(self, values, index=None):
+        """
+        Broadcast per-date values to the rows.
+
+        Parameters:
+        values (Series or Index): One value per unique date.
+        index (Index): The index of the result. Default is a RangeIndex.
+
+        Returns:
+        Series: The value of every row.
+        """
+        return pd.Series(values.array.take(self.codes), index=index, name=values.name)
+
+    def date_column(self, index=None):
+        """
+        Return the parsed date of every row.
+
+        Parameters:
+        index (Index): The index of the result.
+
+        Returns:
+        Series: The datetimes.
+        """
+        return self.take(pd.Series(self.dates, name='date'), index)
+
+    def field(self, name, index=None):
+        """
+        Return a calendar field of every row.
+
+        Parameters:
+        name (str): The name of the field, one of `FIELDS`.
+        index (Index): The index of the result.
+
+        Returns:
+        Series: The field values.
+        """
+        return self.take(self.table[name], index)
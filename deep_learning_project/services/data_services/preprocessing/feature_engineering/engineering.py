@@ -1,112 +1,338 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from services.data_services.preprocessing.feature_engineering.aggregation import GroupAggregator
+from services.data_services.preprocessing.feature_engineering.dates import CalendarTable
+from services.data_services.preprocessing.feature_engineering.lags import LagEngine
+from services.data_services.preprocessing.feature_engineering.stages import FeatureStage, FeatureStageCache, stage_levels
+from services.data_services.preprocessing.schema import cast, planned_dtype, apply_dtype_plan
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+SERIES = ['shop', 'item', 'date']
+
 
 class FeatureEngineer:
-    def __init__(self, data):
+    """
+    A class for engineering the features of the merged transaction data.
+
+    The feature steps are declared in `STAGES` with the columns they read and write. `engineer_features`
+    runs independent stages concurrently and can cache the output columns of every stage on disk.
+    """
+
+    STAGES = [
+        FeatureStage('date', 'create_date_feature', ['date'], ['date'], code=[CalendarTable]),
+        FeatureStage('time', 'add_time_features', ['date'], CalendarTable.FIELDS, code=[CalendarTable]),
+        FeatureStage('lags', 'add_lag_features', SERIES + ['amount'],
+                     ['amount_lag_1', 'amount_lag_7', 'amount_lag_30',
+                      'amount_rolling_mean_7', 'amount_rolling_mean_14', 'amount_rolling_mean_30'], code=[LagEngine]),
+        FeatureStage('aggregates', 'add_aggregate_features', ['date', 'week_of_year', 'month', 'amount'],
+                     ['daily_total_amount', 'weekly_total_amount', 'monthly_total_amount',
+                      'daily_avg_amount', 'weekly_avg_amount', 'monthly_avg_amount'],
+                     code=['add_group_amount_features', GroupAggregator]),
+        FeatureStage('change_rates', 'add_change_rate_features', SERIES + ['amount'],
+                     ['daily_amount_pct_change', 'weekly_amount_pct_change', 'monthly_amount_pct_change'],
+                     code=[LagEngine]),
+        FeatureStage('price_relationships', 'add_price_relationship_features', SERIES + ['price', 'amount'],
+                     ['price_amount_ratio', 'price_lag_1', 'price_lag_7', 'price_lag_30'], code=[LagEngine]),
+        FeatureStage('season_country_category', 'add_season_country_category_features',
+                     ['season', 'country_id', 'main_category', 'amount'],
+                     ['season_avg_amount', 'season_total_amount', 'country_avg_amount', 'country_total_amount',
+                      'main_category_avg_amount', 'main_category_total_amount',
+                      'season_country_avg_amount', 'season_country_total_amount',
+                      'season_main_category_avg_amount', 'season_main_category_total_amount',
+                      'country_main_category_avg_amount', 'country_main_category_total_amount'],
+                     code=['add_group_amount_features', GroupAggregator]),
+    ]
+
+    # Code every stage depends on
+    COMMON_CODE = ['set_feature', cast, planned_dtype]
+
+    def __init__(self, data, cache_dir=None, max_workers=4, cache_max_bytes=10 * 2 ** 30):
         """
         Initialize the FeatureEngineer with a dataset.
 
         Parameters:
         data (dict or DataFrame): The data to be used for feature engineering.
+        cache_dir (str, optional): The environment variable name of the local directory for
+            the stage output cache. Default is None, which disables the cache.
+        max_workers (int, optional): The number of stages run at once. Default is 4.
+        cache_max_bytes (int, optional): The size the stage output cache is evicted down to. Default is 10 GiB.
         """
         self.df = pd.DataFrame(data)
+        self.aggregator = None
+        self.lag_engine = None
+        self.calendar = None
+        self.max_workers = max_workers
+        directory = os.getenv(cache_dir) if cache_dir else None
+        self.stage_cache = FeatureStageCache(directory, cache_max_bytes) if directory else None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def set_feature(self, column, values):
+        """
+        Set a feature column in its planned dtype.
+
+        While a stage runs in `run_stages`, the column is collected for that stage instead,
+        so concurrent stages never write to the shared DataFrame.
+
+        Parameters:
+        column (str): The name of the column.
+        values (Series or ndarray): The values of the feature.
+        """
+        values = cast(column, values)
+        outputs = getattr(self._local, 'outputs', None)
+        if outputs is None:
+            self.df[column] = values
+        else:
+            outputs[column] = values.array if isinstance(values, pd.Series) else values
+
+    def get_calendar(self):
+        """
+        Return the calendar table of the 'date' column, which holds the calendar fields of the distinct dates.
+
+        Returns:
+        CalendarTable: The calendar table.
+        """
+        with self._lock:
+            if self.calendar is None:
+                self.calendar = CalendarTable(self.df['date'])
+            return self.calendar
+
+    def get_lag_engine(self):
+        """
+        Return the lag engine of the current DataFrame, which sorts the rows by (shop, item, date)
+        once for all lag, rolling and percentage change features.
+
+        Returns:
+        LagEngine: The lag engine.
+        """
+        with self._lock:
+            if self.lag_engine is None:
+                self.lag_engine = LagEngine.from_frame(self.df)
+            return self.lag_engine
+
+    def get_aggregator(self):
+        """
+        Return the group aggregator of the current DataFrame, whose key codes are shared
+        by all aggregate features.
+
+        Returns:
+        GroupAggregator: The group aggregator.
+        """
+        with self._lock:
+            if self.aggregator is None or self.aggregator.df is not self.df:
+                self.aggregator = GroupAggregator(self.df)
+            return self.aggregator
+
+    def add_group_amount_features(self, features):
+        """
+        Add group totals and averages of 'amount', computing the sum and mean of each key set only once.
+
+        Parameters:
+        features (list): Tuples of (column name, key columns, 'sum' or 'mean'), in column order.
+        """
+        aggregator = self.get_aggregator()
+        results = {}
+        for column, keys, statistic in features:
+            if tuple(keys) not in results:
+                results[tuple(keys)] = aggregator.sum_and_mean(keys, 'amount')
+            total, average = results[tuple(keys)]
+            self.set_feature(column, total if statistic == 'sum' else average)
 
     def create_date_feature(self):
         """
-        Convert the 'date' column to datetime format.
+        Convert the 'date' column to datetime format, parsing each distinct date string once.
         """
-        self.df['date'] = pd.to_datetime(self.df['date'], format='%d.%m.%Y', dayfirst=True)
+        calendar = CalendarTable(self.df['date'])
+        self.set_feature('date', calendar.date_column(self.df.index))
+        self.aggregator = None
+        self.lag_engine = None
+        self.calendar = calendar
 
     def add_time_features(self):
         """
         Add time-based features such as month, day of the week, day of the year,
         day of the month, week of the year, and season to the DataFrame.
+
+        The fields are derived for the distinct dates only and broadcast to the rows.
         """
-        self.df['month'] = self.df['date'].dt.month
-        self.df['day_of_week'] = self.df['date'].dt.dayofweek
-        self.df['day_of_year'] = self.df['date'].dt.dayofyear
-        self.df['day_of_month'] = self.df['date'].dt.day
-        self.df['week_of_year'] = self.df['date'].dt.isocalendar().week
-        self.df['season'] = self.df['date'].dt.month % 12 // 3 + 1
+        calendar = self.get_calendar()
+        for field in CalendarTable.FIELDS:
+            self.set_feature(field, calendar.field(field, self.df.index))
 
     def add_lag_features(self):
         """
         Add lag features for the 'amount' column, including 1-day, 7-day, and 30-day lags,
         as well as rolling mean features for 7, 14, and 30 days.
+
+        Lags and windows are taken within each (shop, item) series in date order, and are
+        NaN where they would reach into another series.
         """
-        self.df['amount_lag_1'] = self.df['amount'].shift(1)
-        self.df['amount_lag_7'] = self.df['amount'].shift(7)
-        self.df['amount_lag_30'] = self.df['amount'].shift(30)
-        self.df['amount_rolling_mean_7'] = self.df['amount'].rolling(window=7).mean()
-        self.df['amount_rolling_mean_14'] = self.df['amount'].rolling(window=14).mean()
-        self.df['amount_rolling_mean_30'] = self.df['amount'].rolling(window=30).mean()
+        engine = self.get_lag_engine()
+        amount = self.df['amount'].to_numpy()
+        for periods in (1, 7, 30):
+            self.set_feature(f'amount_lag_{periods}', engine.lag('amount', amount, periods))
+        for window in (7, 14, 30):
+            self.set_feature(f'amount_rolling_mean_{window}', engine.rolling_mean('amount', amount, window))
 
     def add_aggregate_features(self):
         """
         Add aggregate features such as total and average 'amount' per day, week, and month.
         """
-        self.df['daily_total_amount'] = self.df.groupby('date')['amount'].transform('sum')
-        self.df['weekly_total_amount'] = self.df.groupby('week_of_year')['amount'].transform('sum')
-        self.df['monthly_total_amount'] = self.df.groupby('month')['amount'].transform('sum')
-        self.df['daily_avg_amount'] = self.df.groupby('date')['amount'].transform('mean')
-        self.df['weekly_avg_amount'] = self.df.groupby('week_of_year')['amount'].transform('mean')
-        self.df['monthly_avg_amount'] = self.df.groupby('month')['amount'].transform('mean')
+        self.add_group_amount_features([
+            ('daily_total_amount', ['date'], 'sum'),
+            ('weekly_total_amount', ['week_of_year'], 'sum'),
+            ('monthly_total_amount', ['month'], 'sum'),
+            ('daily_avg_amount', ['date'], 'mean'),
+            ('weekly_avg_amount', ['week_of_year'], 'mean'),
+            ('monthly_avg_amount', ['month'], 'mean'),
+        ])
 
     def add_change_rate_features(self):
         """
-        Add percentage change features for the 'amount' column on a daily, weekly, and monthly basis.
+        Add percentage change features for the 'amount' column on a daily, weekly, and monthly basis,
+        within each (shop, item) series in date order.
         """
-        self.df['daily_amount_pct_change'] = self.df['amount'].pct_change()
-        self.df['weekly_amount_pct_change'] = self.df['amount'].pct_change(7)
-        self.df['monthly_amount_pct_change'] = self.df['amount'].pct_change(30)
+        engine = self.get_lag_engine()
+        amount = self.df['amount'].to_numpy()
+        self.set_feature('daily_amount_pct_change', engine.pct_change('amount', amount, 1))
+        self.set_feature('weekly_amount_pct_change', engine.pct_change('amount', amount, 7))
+        self.set_feature('monthly_amount_pct_change', engine.pct_change('amount', amount, 30))
 
     def add_price_relationship_features(self):
         """
         Add features related to the relationship between 'price' and 'amount', including
-        price to amount ratio and lagged price values.
+        price to amount ratio and lagged price values within each (shop, item) series.
         """
-        self.df['price_amount_ratio'] = self.df['price'] / self.df['amount']
-        self.df['price_lag_1'] = self.df['price'].shift(1)
-        self.df['price_lag_7'] = self.df['price'].shift(7)
-        self.df['price_lag_30'] = self.df['price'].shift(30)
+        engine = self.get_lag_engine()
+        price = self.df['price'].to_numpy()
+        self.set_feature('price_amount_ratio', self.df['price'] / self.df['amount'])
+        for periods in (1, 7, 30):
+            self.set_feature(f'price_lag_{periods}', engine.lag('price', price, periods))
 
     def add_season_country_category_features(self):
         """
         Add aggregate features based on season, country, and main category, such as
         average and total 'amount' per season, country, and main category.
         """
-        self.df['season_avg_amount'] = self.df.groupby('season')['amount'].transform('mean')
-        self.df['season_total_amount'] = self.df.groupby('season')['amount'].transform('sum')
-        self.df['country_avg_amount'] = self.df.groupby('country_id')['amount'].transform('mean')
-        self.df['country_total_amount'] = self.df.groupby('country_id')['amount'].transform('sum')
-        self.df['main_category_avg_amount'] = self.df.groupby('main_category')['amount'].transform('mean')
-        self.df['main_category_total_amount'] = self.df.groupby('main_category')['amount'].transform('sum')
-        self.df['season_country_avg_amount'] = self.df.groupby(['season', 'country_id'])['amount'].transform('mean')
-        self.df['season_country_total_amount'] = self.df.groupby(['season', 'country_id'])['amount'].transform('sum')
-        self.df['season_main_category_avg_amount'] = self.df.groupby(['season', 'main_category'])['amount'].transform(
-            'mean')
-        self.df['season_main_category_total_amount'] = self.df.groupby(['season', 'main_category'])['amount'].transform(
-            'sum')
-        self.df['country_main_category_avg_amount'] = self.df.groupby(['country_id', 'main_category'])[
-            'amount'].transform('mean')
-        self.df['country_main_category_total_amount'] = self.df.groupby(['country_id', 'main_category'])[
-            'amount'].transform('sum')
+        self.add_group_amount_features([
+            ('season_avg_amount', ['season'], 'mean'),
+            ('season_total_amount', ['season'], 'sum'),
+            ('country_avg_amount', ['country_id'], 'mean'),
+            ('country_total_amount', ['country_id'], 'sum'),
+            ('main_category_avg_amount', ['main_category'], 'mean'),
+            ('main_category_total_amount', ['main_category'], 'sum'),
+            ('season_country_avg_amount', ['season', 'country_id'], 'mean'),
+            ('season_country_total_amount', ['season', 'country_id'], 'sum'),
+            ('season_main_category_avg_amount', ['season', 'main_category'], 'mean'),
+            ('season_main_category_total_amount', ['season', 'main_category'], 'sum'),
+            ('country_main_category_avg_amount', ['country_id', 'main_category'], 'mean'),
+            ('country_main_category_total_amount', ['country_id', 'main_category'], 'sum'),
+        ])
 
     def round_decimal_values(self):
         """
-        Round numerical columns to 2 decimal places.
+        Round numerical columns to 2 decimal places. Integer columns need no rounding.
         """
-        numeric_cols = self.df.select_dtypes(include=['float64', 'int64']).columns
-        self.df[numeric_cols] = self.df[numeric_cols].round(2)
+        # Column by column, so only one rounded column is allocated at a time
+        for column in self.df.select_dtypes(include='floating').columns:
+            self.df[column] = self.df[column].round(2)
 
     def fill_missing_values(self):
         """
-        Fill missing values in the DataFrame with 0.
+        Fill missing values in the DataFrame with 0, and put the ID and calendar columns
+        back on their planned integer dtypes.
         """
         categorical_cols = ['shop', 'item', 'item_category_id', 'main_category', 'country_id', 'season', 'day_of_week',
                             'day_of_year', 'day_of_month', 'week_of_year']
-        self.df[categorical_cols] = self.df[categorical_cols].astype('float64')
-        self.df = self.df.fillna(0)
+        # Column by column, and only the columns with missing values
+        for column in self.df.columns:
+            if self.df[column].hasnans:
+                self.df[column] = self.df[column].fillna(0)
+        apply_dtype_plan(self.df, categorical_cols)
+
+    def run_stage(self, stage):
+        """
+        Run a stage and collect its output columns, from the stage cache if possible.
+
+        Parameters:
+        stage (FeatureStage): The stage.
+
+        Returns:
+        dict: The output columns.
+        """
+        start = time.perf_counter()
+        key = None
+        if self.stage_cache is not None:
+            key = self.stage_cache.make_key(stage, type(self), self.df)
+            outputs = self.stage_cache.load(key)
+            if outputs is not None:
+                logger.info(f"Stage '{stage.name}' loaded from cache in {time.perf_counter() - start:.2f}s.")
+                return outputs
+
+        outputs = self.compute_stage(stage)
+        if key is not None:
+            self.stage_cache.store(key, outputs)
+        logger.info(f"Stage '{stage.name}' computed in {time.perf_counter() - start:.2f}s.")
+        return outputs
+
+    def compute_stage(self, stage):
+        """
+        Run the method of a stage and collect the columns it sets.
+
+        Parameters:
+        stage (FeatureStage): The stage.
+
+        Returns:
+        dict: The output columns.
+
+        Raises:
+        ValueError: If the stage does not set exactly its declared outputs.
+        """
+        self._local.outputs = {}
+        try:
+            getattr(self, stage.method)()
+            outputs = self._local.outputs
+        finally:
+            self._local.outputs = None
+        if set(outputs) != set(stage.outputs):
+            raise ValueError(f"Stage '{stage.name}' wrote {sorted(outputs)}, but declares {sorted(stage.outputs)}")
+        return outputs
+
+    def run_stages(self, stages):
+        """
+        Run feature stages level by level. The stages of a level only read columns that exist
+        before the level starts, so they run concurrently on a thread pool; their outputs are
+        written to the DataFrame once the whole level is done, in declaration order.
+
+        Parameters:
+        stages (list): The FeatureStages, in declaration order.
+        """
+        stages = [FeatureStage(stage.name, stage.method, stage.inputs, stage.outputs, stage.code + self.COMMON_CODE)
+                  for stage in stages]
+        order = list(self.df.columns)
+        order += [column for stage in stages for column in stage.outputs if column not in order]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for level in stage_levels(stages, self.df.columns):
+                results = list(executor.map(self.run_stage, level))
+                for outputs in results:
+                    for column, values in outputs.items():
+                        if column in self.df.columns:
+                            self.df[column] = values
+                        else:
+                            # Insert where the column would be with sequential execution
+                            position = sum(1 for name in order[:order.index(column)] if name in self.df.columns)
+                            self.df.insert(position, column, values)
+                if any('date' in stage.outputs for stage in level):
+                    self.aggregator = None
+                    self.lag_engine = None
 
     def engineer_features(self):
         """
@@ -115,16 +341,13 @@ class FeatureEngineer:
         adding price relationship features, adding season, country, and category features,
         filling missing values, and rounding decimal values.
 
+        The steps up to the season, country, and category features run as the stage graph in
+        `STAGES`; filling and rounding touch every column and run afterwards.
+
         Returns:
         DataFrame: The DataFrame with engineered features.
         """
-        self.create_date_feature()
-        self.add_time_features()
-        self.add_lag_features()
-        self.add_aggregate_features()
-        self.add_change_rate_features()
-        self.add_price_relationship_features()
-        self.add_season_country_category_features()
+        self.run_stages(self.STAGES)
         self.fill_missing_values()
         self.round_decimal_values()
         return self.df
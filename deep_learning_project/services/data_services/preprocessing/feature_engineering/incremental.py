@@ -0,0 +1,233 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from services.data_services.preprocessing.feature_engineering.engineering import FeatureEngineer
+from services.data_services.preprocessing.feature_engineering.lags import LagEngine
+from utils.log.logger import get_logger
+from utils.tables import append_parquet, truncate_parquet
+from utils.tables.parquet import is_parquet
+
+logger = get_logger(__name__)
+
+
+class TailLagEngine:
+    """
+    A LagEngine over new rows that sees the stored tail of every (shop, item) series.
+
+    The tail rows are prepended to the new rows, so lags, rolling means and percentage
+    changes of the new rows are the same as if the whole history had been processed.
+    Results are returned for the new rows only.
+    """
+
+    def __init__(self, tail, df):
+        """
+        Initialize the TailLagEngine.
+
+        Parameters:
+        tail (DataFrame): The last rows of every series, with 'shop', 'item', 'date', 'amount' and 'price' columns.
+        df (DataFrame): The new rows.
+        """
+        self.tail = tail
+        self.n_tail = len(tail)
+        self.engine = LagEngine(*(self._extend(column, df[column].to_numpy()) for column in ('shop', 'item', 'date')))
+
+    def _extend(self, name, values):
+        if not self.n_tail:
+            return values
+        return np.concatenate([self.tail[name].to_numpy(), values])
+
+    def lag(self, name, values, periods):
+        return self.engine.lag(name, self._extend(name, values), periods)[self.n_tail:]
+
+    def rolling_mean(self, name, values, window):
+        return self.engine.rolling_mean(name, self._extend(name, values), window)[self.n_tail:]
+
+    def pct_change(self, name, values, periods):
+        return self.engine.pct_change(name, self._extend(name, values), periods)[self.n_tail:]
+
+
+class IncrementalFeatureEngineer(FeatureEngineer):
+    """
+    A FeatureEngineer that engineers only new transactions, carrying state from earlier runs.
+
+    The state holds the date watermark, the last `tail_length` rows of every (shop, item)
+    series for the lag and rolling features, and the running sum and count of 'amount' of
+    every group of every aggregate key set. Group aggregates of the new rows therefore cover
+    the whole history; rows written by earlier runs keep the aggregates they were written with.
+
+    With an empty state, the result is the same as `FeatureEngineer.engineer_features`.
+    """
+
+    TAIL_COLUMNS = ['shop', 'item', 'date', 'amount', 'price']
+
+    def __init__(self, data, state=None, tail_length=30):
+        """
+        Initialize the IncrementalFeatureEngineer.
+
+        Parameters:
+        data (dict or DataFrame): The new rows.
+        state (dict): The state returned by `get_state` of the previous run, or None for the first run.
+        tail_length (int): The number of rows kept per series, at least the longest lag or window.
+        """
+        super().__init__(data)
+        state = state or {}
+        self.tail_length = tail_length
+        self.tail = state.get('tail', pd.DataFrame(columns=self.TAIL_COLUMNS))
+        self.aggregates = dict(state.get('aggregates', {}))
+        self.watermark = state.get('watermark')
+        self.new_rows = None
+        self._updated = set()
+
+    def get_lag_engine(self):
+        """
+        Return the lag engine of the new rows, which also sees the stored series tails.
+
+        Returns:
+        TailLagEngine: The lag engine.
+        """
+        with self._lock:
+            if self.lag_engine is None:
+                self.lag_engine = TailLagEngine(self.tail, self.df)
+                # Keep the raw values for the next tail, before missing values are filled and rounded
+                self.new_rows = self.df[self.TAIL_COLUMNS].copy()
+            return self.lag_engine
+
+    def update_aggregates(self, keys):
+        """
+        Add the sums and counts of 'amount' of the new rows to the running totals of a key set.
+
+        Parameters:
+        keys (list): The names of the key columns.
+
+        Returns:
+        DataFrame: The running 'sum' and 'count' per group.
+        """
+        keys = tuple(keys)
+        with self._lock:
+            if keys not in self._updated:
+                amount = self.df['amount'].astype(np.float64)
+                totals = amount.groupby([self.df[key] for key in keys]).agg(['sum', 'count']).astype(np.float64)
+                if keys in self.aggregates:
+                    totals = self.aggregates[keys].add(totals, fill_value=0)
+                self.aggregates[keys] = totals
+                self._updated.add(keys)
+            return self.aggregates[keys]
+
+    def add_group_amount_features(self, features):
+        """
+        Add group totals and averages of 'amount' from the running totals of every key set.
+
+        Parameters:
+        features (list): Tuples of (column name, key columns, 'sum' or 'mean'), in column order.
+        """
+        for column, keys, statistic in features:
+            totals = self.update_aggregates(keys)
+            if len(keys) == 1:
+                index = pd.Index(self.df[keys[0]])
+            else:
+                index = pd.MultiIndex.from_frame(self.df[list(keys)])
+            rows = totals.reindex(index)
+            if statistic == 'sum':
+                values = rows['sum'].to_numpy()
+                if self.df['amount'].dtype.kind in 'iu' and not np.isnan(values).any():
+                    values = values.astype(self.df['amount'].dtype)
+            else:
+                values = (rows['sum'] / rows['count'].where(rows['count'] > 0)).to_numpy()
+            self.set_feature(column, values)
+
+    def get_state(self):
+        """
+        Return the state to carry into the next run: the new watermark, the series tails
+        including the new rows, and the running aggregate totals.
+
+        Returns:
+        dict: The state.
+        """
+        engine = self.get_lag_engine()
+        new_rows = self.new_rows
+        combined = pd.concat([self.tail, new_rows], ignore_index=True) if len(self.tail) else new_rows
+        combined = combined.iloc[engine.engine.order]
+        tail = combined.groupby(['shop', 'item'], sort=False).tail(self.tail_length).reset_index(drop=True)
+
+        watermark = new_rows['date'].max() if len(new_rows) else None
+        if self.watermark is not None and (watermark is None or watermark < self.watermark):
+            watermark = self.watermark
+        return {'watermark': watermark, 'tail': tail, 'aggregates': self.aggregates}
+
+
+class FeatureStateStore:
+    """
+    A class for keeping the incremental feature engineering state and its output in a local directory.
+
+    Attributes:
+    STATE_FILE (str): The file name of the state.
+    """
+
+    STATE_FILE = 'feature_state.joblib'
+
+    def __init__(self, directory, output_name):
+        """
+        Initialize the FeatureStateStore.
+
+        Parameters:
+        directory (str): The directory holding the state and the output.
+        output_name (str): The file name of the engineered output.
+        """
+        self.directory = directory
+        self.output_path = os.path.join(directory, os.path.basename(output_name))
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.directory, self.STATE_FILE)
+
+    def load(self):
+        """
+        Load the state of the previous run, dropping output rows that were appended after it was saved.
+
+        Returns:
+        dict: The state, or None if there is no previous run or its output is gone.
+        """
+        if not os.path.exists(self.state_path) or not os.path.exists(self.output_path):
+            return None
+        state = joblib.load(self.state_path)
+        if 'output_rows' not in state or not is_parquet(self.output_path):
+            # Output of a run that still wrote CSV; it is rebuilt as Parquet from scratch
+            logger.info(f"Discarding the CSV output in {self.directory}.")
+            self.clear()
+            return None
+        if pq.ParquetFile(self.output_path).metadata.num_rows > state['output_rows']:
+            # Rows appended by a run that did not get to save its state
+            truncate_parquet(self.output_path, state['output_rows'])
+        logger.info(f"Loaded feature state with watermark {state['watermark']}.")
+        return state
+
+    def append(self, df, state):
+        """
+        Append engineered rows to the Parquet output and save the state that covers them.
+
+        Parameters:
+        df (DataFrame): The engineered rows.
+        state (dict): The state after these rows.
+
+        Returns:
+        str: The path of the output.
+        """
+        state = dict(state, output_rows=append_parquet(self.output_path, df))
+        temporary_path = f'{self.state_path}.tmp'
+        joblib.dump(state, temporary_path)
+        os.replace(temporary_path, self.state_path)
+        logger.info(f'Appended {len(df)} rows to {self.output_path}.')
+        return self.output_path
+
+    def clear(self):
+        """
+        Remove the state and the output, so the next run starts from scratch.
+        """
+        for path in (self.state_path, self.output_path):
+            if os.path.exists(path):
+                os.remove(path)
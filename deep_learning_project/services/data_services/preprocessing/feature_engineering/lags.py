@@ -0,0 +1,162 @@
+import numpy as np
+
+
+class LagEngine:
+    """
+    A class for computing per-series lag, rolling mean and percentage change features.
+
+    The rows are sorted once by (shop, item, date). Every series then is a contiguous run of
+    the sorted arrays, so lags are plain shifted slices and rolling means are sums of shifted
+    slices. Values that would cross into the previous series are masked with NaN,
+    and results are scattered back to the original row order.
+    """
+
+    def __init__(self, shop, item, date):
+        """
+        Initialize the LagEngine with the series keys of every row.
+
+        Parameters:
+        shop (ndarray): The shop of every row.
+        item (ndarray): The item of every row.
+        date (ndarray): The date of every row, in any sortable representation.
+        """
+        shop, item = np.asarray(shop), np.asarray(item)
+        # np.lexsort is stable: rows of a series on the same date keep their file order
+        self.order = np.lexsort((np.asarray(date), item, shop))
+        self.n_rows = len(self.order)
+
+        sorted_shop, sorted_item = shop[self.order], item[self.order]
+        starts = np.ones(self.n_rows, dtype=bool)
+        starts[1:] = (sorted_shop[1:] != sorted_shop[:-1]) | (sorted_item[1:] != sorted_item[:-1])
+        indices = np.arange(self.n_rows)
+        self.position = indices - np.maximum.accumulate(np.where(starts, indices, 0))
+        self._sorted = {}
+        self._lags = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Create a LagEngine from a DataFrame with 'shop', 'item' and 'date' columns.
+
+        Parameters:
+        df (DataFrame): The data.
+
+        Returns:
+        LagEngine: The lag engine.
+        """
+        return cls(df['shop'].to_numpy(), df['item'].to_numpy(), df['date'].to_numpy())
+
+    def sorted_values(self, name, values):
+        """
+        Return the values of a column in series order, caching them by column name.
+
+        Parameters:
+        name (str): The name of the column.
+        values (ndarray): The values in original row order.
+
+        Returns:
+        ndarray: The values as float64 in series order.
+        """
+        if name not in self._sorted:
+            self._sorted[name] = np.asarray(values, dtype=np.float64)[self.order]
+        return self._sorted[name]
+
+    def unsort(self, sorted_result):
+        """
+        Scatter a result computed in series order back to the original row order.
+
+        Parameters:
+        sorted_result (ndarray): The result in series order.
+
+        Returns:
+        ndarray: The result in original row order.
+        """
+        result = np.empty(self.n_rows, dtype=sorted_result.dtype)
+        result[self.order] = sorted_result
+        return result
+
+    def _sorted_lag(self, name, values, periods):
+        key = (name, periods)
+        if key not in self._lags:
+            sorted_values = self.sorted_values(name, values)
+            lagged = np.full(self.n_rows, np.nan)
+            lagged[periods:] = sorted_values[:-periods]
+            lagged[self.position < periods] = np.nan
+            self._lags[key] = lagged
+        return self._lags[key]
+
+    def lag(self, name, values, periods):
+        """
+        Shift a column by a number of rows within each series, like `groupby(...).shift(periods)`.
+
+        Parameters:
+        name (str): The name of the column.
+        values (ndarray): The values in original row order.
+        periods (int): The number of rows to shift by.
+
+        Returns:
+        ndarray: The lagged values in original row order.
+        """
+        return self.unsort(self._sorted_lag(name, values, periods))
+
+    def rolling_mean(self, name, values, window):
+        """
+        Compute a trailing rolling mean within each series, like `groupby(...).rolling(window).mean()`.
+
+        The window sums are built from sums of blocks of 1, 2, 4, ... rows, so they only depend on
+        the values in the window; windows that are not yet full or that contain a missing value are NaN.
+
+        Parameters:
+        name (str): The name of the column.
+        values (ndarray): The values in original row order.
+        window (int): The window size in rows.
+
+        Returns:
+        ndarray: The rolling means in original row order.
+        """
+        sums = self._sorted_window_sums(name, values, window)
+        means = sums / window
+        means[self.position < window - 1] = np.nan
+        return self.unsort(means)
+
+    def _sorted_window_sums(self, name, values, window):
+        # Window sums are built from blocks of 1, 2, 4, ... consecutive values. Every sum depends
+        # only on the values in its window, so it does not change with the rows around the series.
+        sorted_values = self.sorted_values(name, values)
+        block, size = sorted_values, 1
+        sums, offset = None, 0
+        remaining = window
+        while remaining:
+            if remaining & 1:
+                part = self._shift(block, offset)
+                sums = part if sums is None else sums + part
+                offset += size
+            remaining >>= 1
+            if remaining:
+                block = block + self._shift(block, size)
+                size *= 2
+        return sums
+
+    @staticmethod
+    def _shift(values, periods):
+        if not periods:
+            return values
+        shifted = np.full(len(values), np.nan)
+        shifted[periods:] = values[:-periods]
+        return shifted
+
+    def pct_change(self, name, values, periods):
+        """
+        Compute the percentage change to the value a number of rows earlier within each series.
+
+        Parameters:
+        name (str): The name of the column.
+        values (ndarray): The values in original row order.
+        periods (int): The number of rows to compare against.
+
+        Returns:
+        ndarray: The percentage changes in original row order.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = self.sorted_values(name, values) / self._sorted_lag(name, values, periods) - 1
+        return self.unsort(change)
@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering.engineering import FeatureEngineer, SERIES
+from services.data_services.preprocessing.schema import planned_dtype
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SharedColumns:
+    """
+    A class for numpy columns in shared memory blocks.
+
+    The columns are described by picklable specs, so worker processes can attach to them
+    by name instead of receiving pickled copies of the data.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.arrays = {}
+        self.specs = {}
+
+    def add(self, name, values=None, dtype=None, length=None):
+        """
+        Add a column, copying `values` into it if given, otherwise leaving it uninitialized.
+
+        Parameters:
+        name (str): The name of the column.
+        values (ndarray, optional): The values of the column.
+        dtype (dtype, optional): The dtype of an empty column.
+        length (int, optional): The length of an empty column.
+
+        Returns:
+        ndarray: The column in shared memory.
+        """
+        dtype = np.dtype(values.dtype if values is not None else dtype)
+        length = len(values) if values is not None else length
+        block = shared_memory.SharedMemory(create=True, size=max(dtype.itemsize * length, 1))
+        self.blocks.append(block)
+        array = np.ndarray(length, dtype=dtype, buffer=block.buf)
+        if values is not None:
+            array[:] = values
+        self.arrays[name] = array
+        self.specs[name] = (block.name, dtype.str, length)
+        return array
+
+    @staticmethod
+    def attach(specs):
+        """
+        Attach to the columns described by `specs`.
+
+        Parameters:
+        specs (dict): The specs of the columns.
+
+        Returns:
+        tuple: The columns by name, and the blocks to close when done.
+        """
+        blocks, arrays = [], {}
+        for name, (block_name, dtype, length) in specs.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(length, dtype=np.dtype(dtype), buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        """
+        Release the shared memory blocks.
+        """
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def engineer_partition(stage, input_specs, output_specs, start, stop):
+    """
+    Run a stage on the rows of one partition and write its outputs to shared memory.
+
+    Parameters:
+    stage (FeatureStage): The stage.
+    input_specs (dict): The specs of the input columns and of 'rows', the row positions ordered by partition.
+    output_specs (dict): The specs of the output columns.
+    start (int): The first position of the partition in 'rows'.
+    stop (int): The end of the partition in 'rows'.
+
+    Returns:
+    float: The time spent in seconds.
+    """
+    started = time.perf_counter()
+    inputs, input_blocks = SharedColumns.attach(input_specs)
+    outputs, output_blocks = SharedColumns.attach(output_specs)
+    try:
+        rows = inputs['rows'][start:stop]
+        partition = pd.DataFrame({column: inputs[column][rows] for column in stage.inputs})
+        for column, values in FeatureEngineer(partition).compute_stage(stage).items():
+            outputs[column][rows] = np.asarray(values, dtype=outputs[column].dtype)
+    finally:
+        # The arrays on the blocks must be gone before the blocks can be closed
+        inputs = outputs = rows = None
+        for block in input_blocks + output_blocks:
+            block.close()
+    return time.perf_counter() - started
+
+
+class PartitionedFeatureEngineer(FeatureEngineer):
+    """
+    A FeatureEngineer that runs the per-series stages in worker processes, partitioned by shop.
+
+    Every (shop, item) series lies within one shop, so the lag, change rate and price stages
+    are computed per partition of shops with the same result as over the whole data. The input
+    columns are placed in shared memory once and the workers write their outputs into shared
+    memory as well. The group aggregates span all shops and are computed afterwards in this process.
+
+    Attributes:
+    PARTITIONED_STAGES (list): The names of the stages run in worker processes.
+    """
+
+    PARTITIONED_STAGES = ['lags', 'change_rates', 'price_relationships']
+
+    def __init__(self, data, cache_dir=None, max_workers=4, processes=None, cache_max_bytes=10 * 2 ** 30):
+        """
+        Initialize the PartitionedFeatureEngineer.
+
+        Parameters:
+        data (dict or DataFrame): The data to be used for feature engineering.
+        cache_dir (str, optional): The environment variable name of the local directory for the stage output cache.
+        max_workers (int, optional): The number of stages run at once. Default is 4.
+        processes (int, optional): The number of worker processes, and of partitions. Default is the number of CPUs.
+        cache_max_bytes (int, optional): The size the stage output cache is evicted down to. Default is 10 GiB.
+        """
+        super().__init__(data, cache_dir, max_workers, cache_max_bytes)
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+        self.shared = None
+        self.partitions = None
+        self._pool_lock = threading.Lock()
+
+    def partition_rows(self):
+        """
+        Assign whole shops to partitions of about the same number of rows.
+
+        Returns:
+        tuple: The row positions ordered by partition, and the (start, stop) bounds of every partition in them.
+        """
+        shops, shop_codes = np.unique(self.df['shop'].to_numpy(), return_inverse=True)
+        counts = np.bincount(shop_codes, minlength=len(shops))
+        n_partitions = min(self.processes, len(shops))
+        sizes = np.zeros(n_partitions, dtype=np.int64)
+        shop_partition = np.empty(len(shops), dtype=np.int64)
+        # Largest shops first, each to the partition with the fewest rows so far
+        for shop in np.argsort(-counts, kind='stable'):
+            partition = int(np.argmin(sizes))
+            shop_partition[shop] = partition
+            sizes[partition] += counts[shop]
+        rows = np.argsort(shop_partition[shop_codes], kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        return rows, list(zip(bounds[:-1], bounds[1:]))
+
+    def start_pool(self):
+        """
+        Start the worker processes and place the series columns in shared memory, once.
+        """
+        with self._pool_lock:
+            if self.pool is not None:
+                return
+            rows, self.partitions = self.partition_rows()
+            self.shared = SharedColumns()
+            self.shared.add('rows', rows)
+            for column in SERIES + ['amount', 'price']:
+                self.shared.add(column, self.df[column].to_numpy())
+            # Workers are not forked from this process, which runs stages on several threads
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver':
+                context.set_forkserver_preload([__name__])
+            self.pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+
+    def close_pool(self):
+        """
+        Stop the worker processes and release the shared memory.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+    def compute_stage(self, stage):
+        """
+        Run a stage, in the worker processes if it is one of the PARTITIONED_STAGES.
+
+        Parameters:
+        stage (FeatureStage): The stage.
+
+        Returns:
+        dict: The output columns.
+        """
+        if stage.name not in self.PARTITIONED_STAGES or self.processes < 2:
+            return super().compute_stage(stage)
+
+        self.start_pool()
+        outputs = SharedColumns()
+        try:
+            for column in stage.outputs:
+                outputs.add(column, dtype=planned_dtype(column, np.dtype(np.float64)), length=len(self.df))
+            input_specs = {name: spec for name, spec in self.shared.specs.items() if name == 'rows' or name in stage.inputs}
+            futures = [self.pool.submit(engineer_partition, stage, input_specs, outputs.specs, start, stop)
+                       for start, stop in self.partitions]
+            times = [future.result() for future in futures]
+            logger.info(f"Stage '{stage.name}' ran on {len(futures)} partitions, "
+                        f"the slowest in {max(times, default=0):.2f}s.")
+            return {column: outputs.arrays[column].copy() for column in stage.outputs}
+        finally:
+            outputs.close()
+
+    def run_stages(self, stages):
+        """
+        Run feature stages level by level, stopping the worker processes afterwards.
+
+        Parameters:
+        stages (list): The FeatureStages, in declaration order.
+        """
+        try:
+            super().run_stages(stages)
+        finally:
+            self.close_pool()
@@ -0,0 +1,205 @@
+import hashlib
+import inspect
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FeatureStage:
+    """
+    A feature engineering step with declared input and output columns.
+
+    Attributes:
+    name (str): The name of the stage.
+    method (str): The name of the FeatureEngineer method that runs the stage.
+    inputs (list): The columns the stage reads.
+    outputs (list): The columns the stage writes.
+    code (list): Other functions or classes whose source the outputs depend on.
+    """
+
+    def __init__(self, name, method, inputs, outputs, code=()):
+        self.name = name
+        self.method = method
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+
+    def source_hash(self, owner):
+        """
+        Hash the source code of the stage: its method on `owner` and the code it declares.
+
+        Parameters:
+        owner (type): The class the stage method is looked up on.
+
+        Returns:
+        str: The hash.
+        """
+        digest = hashlib.sha256()
+        for obj in [getattr(owner, self.method), *self.code]:
+            digest.update(inspect.getsource(getattr(owner, obj) if isinstance(obj, str) else obj).encode())
+        return digest.hexdigest()
+
+
+def stage_levels(stages, columns):
+    """
+    Group stages into levels whose stages only read columns of the source data or of earlier levels.
+
+    A stage depends on the last stage declared before it that writes one of its inputs.
+
+    Parameters:
+    stages (list): The FeatureStages in declaration order.
+    columns (Index): The columns of the source data.
+
+    Returns:
+    list: Lists of stages; the stages of a level are independent of each other.
+
+    Raises:
+    ValueError: If a stage reads a column that neither the data nor an earlier stage provides.
+    """
+    producer_level = {column: -1 for column in columns}
+    levels = []
+    for stage in stages:
+        missing = [column for column in stage.inputs if column not in producer_level]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' reads columns nobody provides: {missing}")
+        level = max([producer_level[column] for column in stage.inputs], default=-1) + 1
+        # A stage that rewrites a column must also come after the previous writers of that column
+        level = max([level] + [producer_level[column] + 1 for column in stage.outputs if column in producer_level])
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(stage)
+        for column in stage.outputs:
+            producer_level[column] = level
+    return levels
+
+
+def column_fingerprint(values):
+    """
+    Hash the contents and dtype of a column.
+
+    Parameters:
+    values (Series): The column.
+
+    Returns:
+    bytes: The digest.
+    """
+    digest = hashlib.blake2b(str(values.dtype).encode(), digest_size=16)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM':
+        digest.update(np.ascontiguousarray(values.to_numpy()).view(np.uint8))
+    else:
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().view(np.uint8))
+    return digest.digest()
+
+
+class FeatureStageCache:
+    """
+    A class for caching the output columns of feature stages on local disk.
+
+    An entry is keyed by the stage name, the hash of the stage's source code and the fingerprints
+    of its input columns. Editing a stage therefore only misses that stage; stages downstream
+    miss as well if, and only if, the edited stage's outputs changed. Every new data version
+    writes new entries, so the least recently used ones are evicted once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=10 * 2 ** 30):
+        """
+        Initialize the FeatureStageCache.
+
+        Parameters:
+        directory (str): The local folder of the cache.
+        max_bytes (int, optional): The size the entries are evicted down to. Default is 10 GiB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(stage, owner, df):
+        """
+        Build the cache key of a stage run.
+
+        Parameters:
+        stage (FeatureStage): The stage.
+        owner (type): The class the stage method is looked up on.
+        df (DataFrame): The data holding the stage's inputs.
+
+        Returns:
+        str: The cache key.
+        """
+        digest = hashlib.sha256(f'{stage.name}:{stage.source_hash(owner)}:{len(df)}'.encode())
+        for column in stage.inputs:
+            digest.update(column.encode())
+            digest.update(column_fingerprint(df[column]))
+        return f'{stage.name}-{digest.hexdigest()}'
+
+    def load(self, key):
+        """
+        Load the outputs of a stage run and mark them as recently used.
+
+        Parameters:
+        key (str): The cache key.
+
+        Returns:
+        dict: The output columns, or None on a miss.
+        """
+        path = os.path.join(self.directory, f'{key}.joblib')
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return joblib.load(path)
+
+    def store(self, key, outputs):
+        """
+        Store the outputs of a stage run, then evict the least recently used entries if the cache is too large.
+
+        Parameters:
+        key (str): The cache key.
+        outputs (dict): The output columns.
+
+        Returns:
+        None.
+        """
+        path = os.path.join(self.directory, f'{key}.joblib')
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(outputs, temporary_path)
+        os.replace(temporary_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in `max_bytes`.
+
+        Parameters:
+        keep (str, optional): The path of an entry that is never removed, e.g. the one just stored.
+
+        Returns:
+        None.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith('.joblib'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f'Evicted {os.path.basename(path)} from the feature stage cache.')
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+
+def lookup_rows(keys, dimension_keys, max_span_ratio=16):
+    """
+    Find the dimension row of every key through a lookup array indexed by key.
+
+    Parameters:
+    keys (Series): The keys of the left rows, integer or integral float, possibly missing.
+    dimension_keys (Series): The unique integer keys of the dimension.
+    max_span_ratio (int): The largest ratio of the key span to the number of dimension rows for
+        which a dense lookup array is built.
+
+    Returns:
+    numpy.ndarray: The dimension row of every left row, -1 for misses; or None if the keys
+    do not suit a lookup array.
+    """
+    if not len(dimension_keys) or dimension_keys.isna().any() or not dimension_keys.is_unique:
+        return None
+    if not pd.api.types.is_integer_dtype(dimension_keys.dtype) or not pd.api.types.is_numeric_dtype(keys.dtype):
+        return None
+    dimension_keys = dimension_keys.to_numpy(dtype=np.int64)
+    low, high = int(dimension_keys.min()), int(dimension_keys.max())
+    span = high - low + 1
+    if span > max_span_ratio * len(dimension_keys) + (1 << 16):
+        return None
+
+    positions = np.full(span + 1, -1, dtype=np.int64)
+    positions[dimension_keys - low] = np.arange(len(dimension_keys))
+
+    missing = keys.isna().to_numpy()
+    values = keys.to_numpy(dtype=np.float64 if keys.dtype.kind == 'f' else np.int64, na_value=low - 1)
+    if values.dtype.kind == 'f':
+        if not np.array_equal(values, np.floor(values)):
+            return None
+        values = values.astype(np.int64)
+    offsets = values - low
+    # Out-of-range and missing keys point at the extra -1 slot at the end
+    offsets[(offsets < 0) | (offsets >= span) | missing] = span
+    return positions.take(offsets)
+
+
+def take_column(values, rows, misses):
+    """
+    Take dimension values for the left rows, with missing values for misses.
+
+    Parameters:
+    values (Series): A dimension column.
+    rows (numpy.ndarray): The dimension row of every left row, -1 for misses.
+    misses (bool): Whether any row is a miss.
+
+    Returns:
+    numpy.ndarray or ExtensionArray: The values of the left rows.
+    """
+    if not misses:
+        return values.array.take(rows)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iu':
+        # Integers keep their width as nullable integers instead of becoming float64
+        mask = rows < 0
+        return pd.arrays.IntegerArray(values.to_numpy().take(np.where(mask, 0, rows)), mask)
+    return values.array.take(rows, allow_fill=True)
+
+
+def left_join(df, dimension, on):
+    """
+    Left join a dimension table onto a frame by an integer key, like `df.merge(dimension, on=on, how='left')`.
+
+    The dimension columns are attached to `df` in place, each with a single take through a lookup
+    array indexed by key, so the frame is never copied. Keys without a dimension row get missing
+    values; integer columns then become nullable integers of the same width. Dimensions with
+    duplicate, missing or sparse keys, or column names that would clash, fall back to `merge`.
+
+    Parameters:
+    df (DataFrame): The left frame, which gets a RangeIndex like the result of `merge`.
+    dimension (DataFrame): The dimension table.
+    on (str): The key column.
+
+    Returns:
+    DataFrame: The joined frame.
+    """
+    columns = [column for column in dimension.columns if column != on]
+    rows = None
+    if not set(columns) & set(df.columns):
+        rows = lookup_rows(df[on], dimension[on])
+    if rows is None:
+        return df.merge(dimension, on=on, how='left')
+
+    misses = bool((rows < 0).any())
+    df.index = pd.RangeIndex(len(df))
+    for column in columns:
+        df[column] = take_column(dimension[column], rows, misses)
+    return df
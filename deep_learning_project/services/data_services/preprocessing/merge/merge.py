@@ -1,8 +1,20 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.db.uploader import GoogleDriveHandler
+import pandas as pd
 
-from services.data_services.preprocessing.processing import ShopDataPreprocessor, ItemDataPreprocessing, CategoricalDataPreprocessing, TransactionDataPreprocessor
+from utils.db.uploader import get_drive_handler
+from utils.log.logger import get_logger
+from utils.memory import MemoryReport
+from utils.tables import write_parquet
+from utils.tables.parquet import PARQUET_MIMETYPE
+
+from services.data_services.preprocessing.processing import ShopDataPreprocessor, ItemDataPreprocessing, CategoricalDataPreprocessing, TransactionDataPreprocessor, CategoryEncoderRegistry, OutlierFilter
+from services.data_services.preprocessing.merge.joins import left_join
+from services.data_services.preprocessing.schema import apply_dtype_plan
+
+logger = get_logger(__name__)
 
 class DataPreparer:
     """
@@ -10,17 +22,36 @@ class DataPreparer:
 
     This class initializes with file paths to transaction, category, item, and shop data files,
     and provides a method to preprocess and merge these datasets.
+
+    Attributes:
+    MAX_WORKERS (int): The number of source files downloaded and preprocessed at once.
     """
 
-    def __init__(self, service, transaction, category, item, shop, load_data, data_name):
+    MAX_WORKERS = 4
+
+    def __init__(self, service, transaction, category, item, shop, load_data, data_name,
+                 chunk_size='TRANSACTION_CHUNK_SIZE', csv_engine='CSV_ENGINE', encoder_dir='ENCODER_DIR',
+                 aggregate_daily='AGGREGATE_DAILY', track_memory='TRACK_MEMORY_PEAKS',
+                 outlier_method='OUTLIER_METHOD', outlier_group='OUTLIER_GROUP'):
         """
         Initializes the DataPreparer with predefined file paths.
 
+        The transaction file is read in chunks of `chunk_size` rows if that variable is set,
+        otherwise in one pass with the `csv_engine` parser (e.g. 'pyarrow') if that is set.
+        String columns are label encoded with the vocabularies stored in `encoder_dir`, if it is set,
+        so their codes are stable between runs. If `aggregate_daily` is set to 'true', the transactions
+        are collapsed to one row per date, shop and item before they are merged. If `track_memory` is set
+        to 'true', the peak memory of every preprocessing stage is measured and the files are loaded one
+        after another, so the peaks do not overlap.
+
+        Transactions with an outlier price are removed with the `outlier_method`, 'zscore' (the default),
+        'mad' or 'none', computed within the groups of the `outlier_group` column, e.g. 'shop', if it is set.
+
         Returns:
         None.
         """
 
-        self.google_drive_handler = GoogleDriveHandler(service)
+        self.google_drive_handler = get_drive_handler(service)
 
         self.transaction_file_id = os.getenv(transaction)
         self.category_file_id = os.getenv(category)
@@ -28,45 +59,139 @@ class DataPreparer:
         self.shop_file_id = os.getenv(shop)
         self.load_file = os.getenv(load_data)
         self.data_name = os.getenv(data_name)
+        self.chunk_size = int(os.getenv(chunk_size)) if os.getenv(chunk_size) else None
+        self.csv_engine = os.getenv(csv_engine)
+        self.encoders = CategoryEncoderRegistry(os.getenv(encoder_dir))
+        self.aggregate_daily = os.getenv(aggregate_daily, '').lower() in ('1', 'true', 'yes')
+        self.outlier_method = os.getenv(outlier_method, 'zscore').lower()
+        self.outlier_group = os.getenv(outlier_group) or None
+        self.memory_report = MemoryReport('data', track_peaks=os.getenv(track_memory, '').lower() in ('1', 'true', 'yes'))
 
 
+    def load_source(self, name, file_id, preprocess):
+        """
+        Downloads a source file and preprocesses it, logging the time of each step.
 
-    def prepare_data(self):
+        Parameters:
+        name (str): The name of the source, used in the log lines.
+        file_id (str): The Google Drive ID of the file.
+        preprocess (callable): Turns the downloaded file into the preprocessed dataframe.
+
+        Returns:
+        pandas.DataFrame: The preprocessed dataframe.
+        """
+        start = time.perf_counter()
+        file = self.google_drive_handler.download_file_from_drive(file_id)
+        downloaded = time.perf_counter()
+        df = preprocess(file)
+        done = time.perf_counter()
+        logger.info(f'{name}: downloaded in {downloaded - start:.2f}s, preprocessed in {done - downloaded:.2f}s, '
+                    f'ready after {done - self._started:.2f}s.')
+        return df
+
+    def prepare_data(self, since=None):
         """
         Prepares and merges data from transaction, category, item, and shop files.
 
+        The four files are downloaded concurrently and each one is preprocessed as soon as it
+        arrives; the merge starts when all four are ready.
+
+        Parameters:
+        since (Timestamp): If given, only transactions dated after it are kept and merged.
+
         Returns:
         pandas.DataFrame: The merged and processed dataframe.
         """
 
-        transaction_file =  self.google_drive_handler.download_file_from_drive(self.transaction_file_id)
-        category_file =  self.google_drive_handler.download_file_from_drive(self.category_file_id)
-        shop_file =  self.google_drive_handler.download_file_from_drive(self.shop_file_id)
-        item_file =  self.google_drive_handler.download_file_from_drive(self.item_file_id)
+        def preprocess_transactions(file):
+            outlier_filter = None
+            if self.outlier_method != 'none':
+                outlier_filter = OutlierFilter(['price'], method=self.outlier_method, group=self.outlier_group)
+            df = TransactionDataPreprocessor(file, 'transaction', chunksize=self.chunk_size,
+                                             engine=self.csv_engine, encoders=self.encoders,
+                                             aggregate_daily=self.aggregate_daily,
+                                             memory_report=self.memory_report,
+                                             outlier_filter=outlier_filter).preprocess_data()
+            return self.select_new_transactions(df, since) if since is not None else df
+
+        sources = {
+            'transactions': (self.transaction_file_id, preprocess_transactions),
+            'categories': (self.category_file_id,
+                           lambda file: CategoricalDataPreprocessing(file, 'category', self.encoders,
+                                                                     self.memory_report).preprocess_data()),
+            'shops': (self.shop_file_id,
+                      lambda file: ShopDataPreprocessor(file, 'shop', self.encoders, self.memory_report).preprocess_data()),
+            'items': (self.item_file_id,
+                      lambda file: ItemDataPreprocessing(file, 'item', self.encoders, self.memory_report).preprocess_data()),
+        }
+
+        self._started = time.perf_counter()
+        max_workers = 1 if self.memory_report.track_peaks else self.MAX_WORKERS
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {name: executor.submit(self.load_source, name, file_id, preprocess)
+                           for name, (file_id, preprocess) in sources.items()}
+                transaction_list_processed_data = futures['transactions'].result()
+                category_list_processed_data = futures['categories'].result()
+                shop_list_processed_data = futures['shops'].result()
+                item_list_processed_data = futures['items'].result()
+        finally:
+            # Only the source stages are tracked, so tracing stops before the merge
+            self.memory_report.close()
+        self.encoders.save()
+
+        self.memory_report.record('transactions', transaction_list_processed_data)
+        self.memory_report.record('categories', category_list_processed_data)
+        self.memory_report.record('shops', shop_list_processed_data)
+        self.memory_report.record('items', item_list_processed_data)
+
+        # Dimension columns are attached to the transactions in place through key-indexed lookups
+        merged_data = left_join(transaction_list_processed_data, item_list_processed_data, on='item')
+        merged_data = left_join(merged_data, category_list_processed_data, on='item_category_id')
+        merged_data = left_join(merged_data, shop_list_processed_data, on='shop')
+        apply_dtype_plan(merged_data)
+        logger.info(f'Sources merged after {time.perf_counter() - self._started:.2f}s.')
+        self.memory_report.record('merged', merged_data)
+
+        return merged_data
+
+    @staticmethod
+    def select_new_transactions(transactions, since):
+        """
+        Selects the transactions dated after a watermark.
+
+        Parameters:
+        transactions (pandas.DataFrame): The processed transactions, with 'dd.mm.YYYY' dates.
+        since (Timestamp): The watermark.
 
-        transaction_list_processed_data = TransactionDataPreprocessor(transaction_file, 'transaction').preprocess_data()
-        category_list_processed_data = CategoricalDataPreprocessing(category_file, 'category').preprocess_data()
-        shop_list_processed_data = ShopDataPreprocessor(shop_file, 'shop').preprocess_data()
-        item_list_processed_data = ItemDataPreprocessing(item_file, 'item').preprocess_data()
+        Returns:
+        pandas.DataFrame: The newer transactions.
+        """
+        dates = pd.to_datetime(transactions['date'], format='%d.%m.%Y')
+        return transactions[(dates > since).to_numpy()]
 
-        merged_data = transaction_list_processed_data.merge(item_list_processed_data, on='item', how='left') \
-                                  .merge(category_list_processed_data, on='item_category_id', how='left') \
-                                  .merge(shop_list_processed_data, on='shop', how='left')
+    def upload_file(self, file_path):
+        """
+        Uploads an already saved Parquet file to the Google Drive folder of the processed data.
 
-        return merged_data
+        Args:
+        file_path (str): The path of the file to upload.
+
+        Returns:
+        None.
+        """
+        self.google_drive_handler.upload_file_to_drive(file_path, self.load_file, mimetype=PARQUET_MIMETYPE)
 
     def save_and_upload_data(self, dataframe):
         """
-        Saves the dataframe to a CSV file and uploads it to Google Drive.
+        Writes the dataframe as Parquet in memory and uploads it to Google Drive, keeping the
+        dtypes of its columns. The file is uploaded under the configured data name.
 
         Args:
         dataframe (pandas.DataFrame): The dataframe to save and upload.
-        file_path (str): The path where the CSV file will be saved.
-        folder_id (str): The ID of the folder to upload the file to.
 
         Returns:
         None.
         """
-        dataframe.to_csv(self.data_name, index=False)
-        self.google_drive_handler.upload_file_to_drive(self.data_name, self.load_file)
-        os.remove(self.data_name)
+        file = write_parquet(dataframe)
+        self.google_drive_handler.upload_file_from_memory(file, self.load_file, self.data_name, mimetype=PARQUET_MIMETYPE)
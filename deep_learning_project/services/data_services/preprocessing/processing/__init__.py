@@ -1,3 +1,5 @@
+from .encoders import CategoryEncoderRegistry
+from .outliers import OutlierFilter
 from .general import DataPreprocessing
 from .shop import ShopDataPreprocessor
 from .item import ItemDataPreprocessing
@@ -1,4 +1,6 @@
 from services.data_services.preprocessing.processing import DataPreprocessing
+from services.data_services.preprocessing.schema import read_columns
+from utils.memory import copy_on_write
 
 class CategoricalDataPreprocessing:
     """
@@ -8,18 +10,21 @@ class CategoricalDataPreprocessing:
     and provides methods to preprocess specific columns and drop unnecessary columns.
     """
 
-    def __init__(self, file_path, file_type):
+    def __init__(self, file_path, file_type, encoders=None, memory_report=None):
         """
         Initializes the CategoricalDataPreprocessing with a file path.
 
         Parameters:
         file_path (str): The path to the processing file.
+        encoders (CategoryEncoderRegistry, optional): The registry used to label encode string columns.
+        memory_report (MemoryReport, optional): The report that tracks the peak memory of every stage.
 
         Returns:
         None.
         """
         self.file_path = file_path
-        self.data_preprocessor = DataPreprocessing(file_path, file_type)
+        self.data_preprocessor = DataPreprocessing(file_path, file_type, usecols=read_columns(file_type),
+                                                   encoders=encoders, memory_report=memory_report)
         self.df = self.data_preprocessor.get_data()
 
     def preprocess_data(self):
@@ -31,15 +36,16 @@ class CategoricalDataPreprocessing:
         pandas.DataFrame: The preprocessed dataframe.
         """
         self.df = self.data_preprocessor.preprocess_data(columns=['item_category_id'])
-        self.df = self._drop_columns()
+        with copy_on_write(), self.data_preprocessor.track('drop_columns'):
+            self._drop_columns()
         return self.df
 
     def _drop_columns(self):
         """
-        Drops unnecessary columns from the dataframe.
+        Drops the category name, which the main category was taken from, in place.
 
         Returns:
         pandas.DataFrame: The dataframe with specified columns dropped.
         """
-        self.df = self.df.drop(columns=['item_category_name'])
+        self.df.drop(columns=['item_category_name'], inplace=True)
         return self.df
@@ -0,0 +1,124 @@
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.schema import code_dtype
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CategoryEncoderRegistry:
+    """
+    A registry of label encoders that keeps one vocabulary per column and persists it between runs.
+
+    A column is factorized once and only its distinct values are looked up in the vocabulary, so
+    encoding is a hash lookup plus a take over the rows. The first vocabulary of a column is its
+    sorted distinct values, which gives the same codes as sklearn's LabelEncoder. Later runs append
+    unseen values at the end, so codes already handed out never change.
+    """
+
+    FILE_NAME = 'category_encoders.joblib'
+
+    def __init__(self, directory=None):
+        """
+        Initialize the CategoryEncoderRegistry, loading the stored vocabularies if there are any.
+
+        Parameters:
+        directory (str, optional): The directory the vocabularies are stored in. Default is None,
+            which keeps them in memory only.
+        """
+        self.directory = directory
+        self.vocabularies = {}
+        self.changed = False
+        self._lock = threading.Lock()
+        if directory and os.path.exists(self.path):
+            self.vocabularies = joblib.load(self.path)
+            logger.info(f'Loaded {len(self.vocabularies)} category vocabularies from {self.path}.')
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.FILE_NAME)
+
+    def encode(self, name, values):
+        """
+        Encode the values of a column, extending its vocabulary with unseen values. Safe to call
+        from several threads at once.
+
+        Parameters:
+        name (str): The name of the vocabulary, usually the column name.
+        values (Series): The values to encode, as strings or a categorical.
+
+        Returns:
+        numpy.ndarray or pandas.arrays.IntegerArray: The codes in the smallest integer dtype, as nullable
+        integers if some values are missing.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            value_codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            value_codes, uniques = pd.factorize(values)
+
+        with self._lock:
+            vocabulary, unique_codes = self._vocabulary_codes(name, uniques, value_codes)
+
+        dtype = code_dtype(len(vocabulary))
+        codes = np.append(unique_codes, -1).take(value_codes).astype(dtype)
+        missing = value_codes < 0
+        if missing.any():
+            return pd.arrays.IntegerArray(codes, missing)
+        return codes
+
+    def decode(self, name, codes):
+        """
+        Map codes of a column back to its values.
+
+        Parameters:
+        name (str): The name of the vocabulary.
+        codes (array-like): The codes.
+
+        Returns:
+        pandas.Index: The values.
+        """
+        return self.vocabularies[name].take(np.asarray(codes))
+
+    def _vocabulary_codes(self, name, uniques, value_codes):
+        vocabulary = self.vocabularies.get(name)
+        if vocabulary is None:
+            used = np.unique(value_codes[value_codes >= 0])
+            vocabulary = pd.Index(uniques).take(used).sort_values()
+            self._update(name, vocabulary)
+        unique_codes = vocabulary.get_indexer(uniques)
+        unseen = unique_codes < 0
+        if unseen.any():
+            # Only values that occur are added, in order of first appearance
+            occurring = np.zeros(len(uniques), dtype=bool)
+            occurring[value_codes[value_codes >= 0]] = True
+            new_values = pd.Index(uniques)[unseen & occurring]
+            if len(new_values):
+                vocabulary = vocabulary.append(new_values)
+                self._update(name, vocabulary)
+                unique_codes = vocabulary.get_indexer(uniques)
+        return vocabulary, unique_codes
+
+    def _update(self, name, vocabulary):
+        self.vocabularies[name] = vocabulary
+        self.changed = True
+
+    def save(self):
+        """
+        Store the vocabularies if they changed since they were loaded.
+
+        Returns:
+        None.
+        """
+        if not self.directory or not self.changed:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = f'{self.path}.tmp'
+        joblib.dump(self.vocabularies, temporary_path)
+        os.replace(temporary_path, self.path)
+        self.changed = False
+        logger.info(f'Saved {len(self.vocabularies)} category vocabularies to {self.path}.')
@@ -1,10 +1,12 @@
-import re
-import numpy as np
 import pandas as pd
-from scipy.stats import zscore
-from sklearn.preprocessing import LabelEncoder
+from pandas.api.types import union_categoricals
 import io
 
+from services.data_services.preprocessing.processing.encoders import CategoryEncoderRegistry
+from services.data_services.preprocessing.processing.outliers import OutlierFilter
+from services.data_services.preprocessing.schema import read_dtypes, apply_dtype_plan
+from utils.memory import MemoryReport, copy_on_write
+
 class DataPreprocessing:
     """
     A class for performing data processing tasks on a dataset.
@@ -13,25 +15,118 @@ class DataPreprocessing:
     removing outliers, encoding categorical data, and processing specific columns for item category and shop name.
     """
 
-    def __init__(self, file, file_type=None):
+    def __init__(self, file, file_type=None, usecols=None, chunksize=None, engine=None, encoders=None,
+                 memory_report=None, outlier_filter=None):
         """
-        Initializes the DataPreprocessing with a file.
+        Initializes the DataPreprocessing with a file, reading known columns with their planned dtypes.
+        The file is read, and later preprocessed, under pandas Copy-on-Write.
 
         Parameters:
         file (str or io.BytesIO): The path to the data file or a BytesIO object.
         file_type (str): The type of the file, used to apply specific processing steps.
+        usecols (list, optional): The columns to read. Default is all columns.
+        chunksize (int, optional): If given, the file is read and cleaned chunk by chunk, see `read_chunks`.
+        engine (str, optional): The `read_csv` parser engine, e.g. 'pyarrow', for whole-file reads.
+            Chunked reads always use the C engine, since pyarrow does not support `chunksize`.
+        encoders (CategoryEncoderRegistry, optional): The registry used to label encode string columns.
+            Default is a new in-memory registry.
+        memory_report (MemoryReport, optional): The report that tracks the peak memory of every stage.
+            Default is a report that does not track peaks.
+        outlier_filter (OutlierFilter, optional): If given, `preprocess_data` removes the outliers it finds.
+            With chunked reads, its statistics are gathered while the chunks are read.
 
         Returns:
         None.
         """
-        if isinstance(file, str):
-            self.df = pd.read_csv(file)
-            self.file_path = file
-        else:
-            self.df = pd.read_csv(file)
-            self.file_path = None  # file_path, BytesIO olduğunda geçerli değil
         self.file_type = file_type
-        self.original_shape = self.df.shape
+        self.encoders = encoders if encoders is not None else CategoryEncoderRegistry()
+        self.memory_report = memory_report if memory_report is not None else MemoryReport(file_type or 'data')
+        self.outlier_filter = outlier_filter
+        self.chunked = chunksize is not None
+        with copy_on_write(), self.track('read'):
+            if self.chunked:
+                self.df = self.read_chunks(file, chunksize, usecols)
+            else:
+                self.df = self.read_file(file, usecols, engine)
+                self.original_shape = self.df.shape
+        self.file_path = file if isinstance(file, str) else None  # file_path, BytesIO olduğunda geçerli değil
+
+    def read_file(self, file, usecols=None, engine=None):
+        """
+        Reads the whole file with the planned dtypes. If an integer column has missing values,
+        the file is read again with nullable integers; they are narrowed once the rows are dropped.
+
+        Parameters:
+        file (str or io.BytesIO): The path to the data file or a BytesIO object.
+        usecols (list, optional): The columns to read. Default is all columns.
+        engine (str, optional): The `read_csv` parser engine.
+
+        Returns:
+        pandas.DataFrame: The data.
+        """
+        try:
+            return pd.read_csv(file, dtype=read_dtypes(self.file_type), usecols=usecols, engine=engine)
+        except ValueError:
+            if not isinstance(file, str):
+                file.seek(0)
+            return pd.read_csv(file, dtype=read_dtypes(self.file_type, nullable=True), usecols=usecols, engine=engine)
+
+    def read_chunks(self, file, chunksize, usecols=None):
+        """
+        Reads the file chunk by chunk with the planned dtypes, using nullable integers since a chunk
+        cannot be read again. Each chunk drops unnamed columns and
+        rows with missing values, narrows its dtypes and stores remaining strings as categoricals, so
+        the full table is never held in object dtype. The chunks are concatenated with the union of
+        their categories.
+
+        Parameters:
+        file (str or io.BytesIO): The path to the data file or a BytesIO object.
+        chunksize (int): The number of rows per chunk.
+        usecols (list, optional): The columns to read. Default is all columns.
+
+        Returns:
+        pandas.DataFrame: The cleaned data.
+        """
+        chunks = []
+        empty = None
+        n_rows = 0
+        dtypes = read_dtypes(self.file_type, nullable=True)
+        for chunk in pd.read_csv(file, dtype=dtypes, usecols=usecols, chunksize=chunksize):
+            n_rows += len(chunk)
+            self.df = chunk
+            self.remove_unnamed_columns()
+            self.handle_missing_values()
+            for col in self.df.select_dtypes(include=['object']).columns:
+                self.df[col] = self.df[col].astype('category')
+            if len(self.df):
+                chunks.append(apply_dtype_plan(self.df))
+                if self.outlier_filter is not None:
+                    self.outlier_filter.update(self.df)
+            else:
+                empty = self.df
+        if not chunks:
+            self.original_shape = (n_rows, self.df.shape[1])
+            return empty
+
+        self.original_shape = (n_rows, chunks[0].shape[1])
+        categorical_columns = chunks[0].select_dtypes(include=['category']).columns
+        df = pd.concat([chunk.drop(columns=categorical_columns) for chunk in chunks])
+        for col in categorical_columns:
+            values = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+            df[col] = pd.Series(values, index=df.index)
+        return df[chunks[0].columns]
+
+    def track(self, stage):
+        """
+        Track the peak memory of a preprocessing stage in the memory report.
+
+        Parameters:
+        stage (str): The name of the stage, prefixed with the file type in the report.
+
+        Returns:
+        contextmanager: The tracking context.
+        """
+        return self.memory_report.track(f'{self.file_type}.{stage}')
 
     def handle_missing_values(self):
         """
@@ -54,31 +149,34 @@ class DataPreprocessing:
 
     def remove_outliers(self, columns):
         """
-        Removes outliers from the specified columns using z-score.
+        Removes outliers from the specified columns with the outlier filter, by default with a z-score
+        threshold of 3. The statistics are computed first unless the chunked read already gathered them.
 
         Parameters:
-        columns (list): The list of columns to check for outliers.
+        columns (list): The list of columns to check for outliers, if there is no outlier filter yet.
 
         Returns:
         None.
         """
-        selected_columns = self.df[columns]
-        z_scores = np.abs(zscore(selected_columns))
-        self.df = self.df[(z_scores < 3).all(axis=1)]
+        if self.outlier_filter is None:
+            self.outlier_filter = OutlierFilter(columns)
+        if not self.outlier_filter.n_rows:
+            self.outlier_filter.update(self.df)
+        self.df = self.outlier_filter.filter(self.df)
 
     def encode_categorical_data(self):
         """
-        Encodes categorical data using label encoding.
+        Encodes categorical data using label encoding with the vocabularies of the encoder registry,
+        storing the codes in the smallest integer dtype. Missing values stay missing.
 
         Returns:
         None.
         """
         date_column = 'date'
-        categorical_columns = self.df.select_dtypes(include=['object']).columns
+        categorical_columns = self.df.select_dtypes(include=['object', 'category']).columns
         categorical_columns = [col for col in categorical_columns if col != date_column]
         for col in categorical_columns:
-            le = LabelEncoder()
-            self.df[col] = le.fit_transform(self.df[col])
+            self.df[col] = self.encoders.encode(col, self.df[col])
 
     def process_item_category(self):
         """
@@ -98,30 +196,41 @@ class DataPreprocessing:
         None.
         """
         self.df['shop_name'] = self.df['shop_name'].astype(str)
-        self.df['country_id'] = self.df['shop_name'].apply(lambda x: re.split(r'[ ,]', x)[0])
+        # The text before the first space or comma
+        self.df['country_id'] = self.df['shop_name'].str.extract(r'^([^ ,]*)', expand=False)
 
     def preprocess_data(self, columns):
         """
         Preprocesses the data by performing various processing tasks.
 
         Parameters:
-        columns (list): The list of columns to check for outliers.
+        columns (list): The list of columns to check for outliers, if outliers are removed.
 
         Returns:
         pandas.DataFrame: The preprocessed dataframe.
         """
-        self.remove_unnamed_columns()
-
-        # Special processing for specific files
-        if self.file_type == 'category':
-            self.process_item_category()
-
-        if self.file_type == 'shop':
-            self.process_shop_name()
-
-        self.encode_categorical_data()
-        self.handle_missing_values()
-        # self.remove_outliers(columns)
+        with copy_on_write():
+            with self.track('remove_unnamed_columns'):
+                self.remove_unnamed_columns()
+
+            # Special processing for specific files
+            if self.file_type == 'category':
+                with self.track('process_item_category'):
+                    self.process_item_category()
+
+            if self.file_type == 'shop':
+                with self.track('process_shop_name'):
+                    self.process_shop_name()
+
+            with self.track('encode_categorical_data'):
+                self.encode_categorical_data()
+            with self.track('handle_missing_values'):
+                self.handle_missing_values()
+            with self.track('apply_dtype_plan'):
+                apply_dtype_plan(self.df)
+            if self.outlier_filter is not None:
+                with self.track('remove_outliers'):
+                    self.remove_outliers(columns)
         return self.df
 
     def get_data(self):
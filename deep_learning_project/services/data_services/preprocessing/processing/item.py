@@ -1,4 +1,6 @@
 from services.data_services.preprocessing.processing import DataPreprocessing
+from services.data_services.preprocessing.schema import read_columns
+from utils.memory import copy_on_write
 
 class ItemDataPreprocessing:
     """
@@ -8,39 +10,43 @@ class ItemDataPreprocessing:
     and provides methods to preprocess specific columns and rename unnecessary columns.
     """
 
-    def __init__(self, file_path, file_type):
+    def __init__(self, file_path, file_type, encoders=None, memory_report=None):
         """
-        Initializes the ItemDataPreprocessing with a file path.
+        Initializes the ItemDataPreprocessing with a file path. Only the ID columns are read;
+        the item names are never loaded.
 
         Parameters:
         file_path (str): The path to the processing file.
+        encoders (CategoryEncoderRegistry, optional): The registry used to label encode string columns.
+        memory_report (MemoryReport, optional): The report that tracks the peak memory of every stage.
 
         Returns:
         None.
         """
         self.file_path = file_path
-        self.data_preprocessor = DataPreprocessing(file_path, file_type)
+        self.data_preprocessor = DataPreprocessing(file_path, file_type, usecols=read_columns(file_type),
+                                                   encoders=encoders, memory_report=memory_report)
         self.df = self.data_preprocessor.get_data()
 
     def preprocess_data(self):
         """
         Preprocesses the processing by performing necessary transformations on specified columns
-        and then renaming and dropping unnecessary columns.
+        and then renaming the item ID column.
 
         Returns:
         pandas.DataFrame: The preprocessed dataframe.
         """
         self.df = self.data_preprocessor.preprocess_data(columns=['item_id'])
-        self.df = self._rename_columns()
+        with copy_on_write(), self.data_preprocessor.track('rename_columns'):
+            self._rename_columns()
         return self.df
 
     def _rename_columns(self):
         """
-        Renames and drops unnecessary columns from the dataframe.
+        Renames the item ID column of the dataframe in place.
 
         Returns:
-        pandas.DataFrame: The dataframe with specified columns renamed and dropped.
+        pandas.DataFrame: The dataframe with the item ID column renamed.
         """
-        self.df = self.df.rename(columns={'item_id': 'item'})
-        self.df = self.df.drop(columns=['item_name'])
+        self.df.rename(columns={'item_id': 'item'}, inplace=True)
         return self.df
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Scales the median absolute deviation to the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+
+
+def group_medians(codes, values, n_groups):
+    """
+    Compute the median of every column within every group.
+
+    Parameters:
+    codes (ndarray): The group of every row, from 0 to n_groups - 1.
+    values (ndarray): The values, one column per feature, without missing values.
+    n_groups (int): The number of groups.
+
+    Returns:
+    ndarray: The medians, one row per group; NaN for groups without rows.
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_rows = counts > 0
+    lower = starts + (counts - 1) // 2
+    upper = starts + counts // 2
+    medians = np.full((n_groups, values.shape[1]), np.nan)
+    for column in range(values.shape[1]):
+        # Sorted by group, then by value: the middle of every group run is its median
+        ordered = values[np.lexsort((values[:, column], codes)), column]
+        medians[has_rows, column] = (ordered[lower[has_rows]] + ordered[upper[has_rows]]) / 2
+    return medians
+
+
+class OutlierFilter:
+    """
+    A class for removing outliers column by column, globally or within groups such as shops.
+
+    The statistics are gathered in one streaming pass, so they can be updated chunk by chunk
+    while a file is read, and rows are filtered in a second pass:
+
+    - 'zscore': rows more than `threshold` standard deviations from the mean are outliers. Counts,
+      means and sums of squared deviations of every chunk are merged into the running ones with the
+      parallel variance formula; the per-group sums are single `np.bincount` passes.
+    - 'mad': rows more than `threshold` scaled median absolute deviations from the median are
+      outliers. The medians are taken from a uniform reservoir sample of `sample_size` rows; while
+      the data is not larger than the sample, the sample holds all rows and the medians are exact.
+
+    A row is removed if any of its columns is an outlier. Columns without spread and groups
+    without statistics never mark rows as outliers.
+    """
+
+    METHODS = ('zscore', 'mad')
+
+    def __init__(self, columns, method='zscore', threshold=3.0, group=None, sample_size=1000000, seed=0):
+        """
+        Initialize the OutlierFilter.
+
+        Parameters:
+        columns (list): The columns to check for outliers.
+        method (str): 'zscore' or 'mad'. Default is 'zscore'.
+        threshold (float): The distance from the center, in standard deviations, beyond which a value is an outlier.
+        group (str, optional): The column whose values the statistics are computed within, e.g. 'shop'.
+        sample_size (int): The size of the reservoir sample of the 'mad' method.
+        seed (int): The seed of the reservoir sampling.
+
+        Raises:
+        ValueError: If the method is unknown.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown outlier method '{method}', expected one of {self.METHODS}")
+        self.columns = list(columns)
+        self.method = method
+        self.threshold = threshold
+        self.group = group
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.groups = pd.Index([])
+        self.n_rows = 0
+        # Running statistics of the 'zscore' method, one row per group
+        self.count = np.zeros((0, len(self.columns)))
+        self.mean = np.zeros((0, len(self.columns)))
+        self.m2 = np.zeros((0, len(self.columns)))
+        # Reservoir sample of the 'mad' method
+        self.sample = np.empty((0, len(self.columns)))
+        self.sample_codes = np.empty(0, dtype=np.int64)
+        self.n_sampled = 0
+        self.center = None
+        self.scale = None
+
+    def group_codes(self, df, add=False):
+        """
+        Return the group of every row, as positions in `self.groups`.
+
+        Parameters:
+        df (DataFrame): The data.
+        add (bool): Whether groups not seen before are added. Otherwise their rows get -1.
+
+        Returns:
+        ndarray: The group codes.
+        """
+        if self.group is None:
+            if add and not len(self.groups):
+                self.groups = pd.Index([0])
+            return np.zeros(len(df), dtype=np.int64)
+        values = df[self.group].to_numpy()
+        codes = self.groups.get_indexer(values)
+        if add and (codes < 0).any():
+            self.groups = self.groups.append(pd.Index(pd.unique(values[codes < 0])))
+            codes = self.groups.get_indexer(values)
+        return codes
+
+    def values(self, df):
+        return np.column_stack([df[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in self.columns])
+
+    def update(self, df):
+        """
+        Add a chunk of rows to the statistics.
+
+        Parameters:
+        df (DataFrame): The chunk.
+
+        Returns:
+        OutlierFilter: The filter itself.
+        """
+        codes = self.group_codes(df, add=True)
+        values = self.values(df)
+        n_groups = len(self.groups)
+        if self.method == 'zscore':
+            self._update_moments(codes, values, n_groups)
+        else:
+            self._update_sample(codes, values)
+        self.n_rows += len(df)
+        self.center = self.scale = None
+        return self
+
+    def _update_moments(self, codes, values, n_groups):
+        grow = n_groups - len(self.count)
+        if grow:
+            self.count, self.mean, self.m2 = (np.vstack([stat, np.zeros((grow, len(self.columns)))])
+                                              for stat in (self.count, self.mean, self.m2))
+        for column in range(len(self.columns)):
+            count, mean, m2 = self._chunk_moments(codes, values[:, column], n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # Chan et al.: merge the chunk's moments into the running ones
+                total = self.count[:, column] + count
+                delta = mean - self.mean[:, column]
+                merged_mean = self.mean[:, column] + delta * count / total
+                merged_m2 = self.m2[:, column] + m2 + delta ** 2 * self.count[:, column] * count / total
+            has_rows = count > 0
+            self.mean[has_rows, column] = merged_mean[has_rows]
+            self.m2[has_rows, column] = merged_m2[has_rows]
+            self.count[:, column] = total
+
+    def _chunk_moments(self, codes, values, n_groups):
+        valid = ~np.isnan(values)
+        if not valid.all():
+            codes, values = codes[valid], values[valid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.group is None:
+                # A single group needs no group sums
+                count = np.array([len(values)], dtype=np.float64)
+                mean = np.array([values.mean() if len(values) else np.nan])
+                m2 = np.array([np.square(values - mean[0]).sum()])
+            else:
+                count = np.bincount(codes, minlength=n_groups).astype(np.float64)
+                mean = np.bincount(codes, weights=values, minlength=n_groups) / count
+                m2 = np.bincount(codes, weights=np.square(values - mean[codes]), minlength=n_groups)
+        return count, mean, m2
+
+    def _update_sample(self, codes, values):
+        complete = ~np.isnan(values).any(axis=1)
+        codes, values = codes[complete], values[complete]
+        # The reservoir only keeps complete rows, so only those are counted
+        n_free = max(min(self.sample_size - len(self.sample_codes), len(codes)), 0)
+        if n_free:
+            self.sample = np.vstack([self.sample, values[:n_free]])
+            self.sample_codes = np.concatenate([self.sample_codes, codes[:n_free]])
+        if len(codes) > n_free:
+            # Row i of the stream replaces a random slot with probability sample_size / (i + 1)
+            positions = self.n_sampled + np.arange(n_free, len(codes))
+            slots = (self.rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            kept = slots < self.sample_size
+            self.sample[slots[kept]] = values[n_free:][kept]
+            self.sample_codes[slots[kept]] = codes[n_free:][kept]
+        self.n_sampled += len(codes)
+
+    def finalize(self):
+        """
+        Compute the center and scale of every column within every group from the statistics.
+
+        Returns:
+        tuple: The centers and the scales, one row per group.
+        """
+        if self.center is None:
+            n_groups = len(self.groups)
+            if self.method == 'zscore':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    self.center, self.scale = self.mean.copy(), np.sqrt(self.m2 / self.count)
+            else:
+                self.center = group_medians(self.sample_codes, self.sample, n_groups)
+                deviations = np.abs(self.sample - self.center[self.sample_codes])
+                self.scale = MAD_SCALE * group_medians(self.sample_codes, deviations, n_groups)
+        return self.center, self.scale
+
+    def outliers(self, df):
+        """
+        Mark the rows with an outlier in any of the columns.
+
+        Parameters:
+        df (DataFrame): The data.
+
+        Returns:
+        ndarray: True for the outlier rows.
+        """
+        center, scale = self.finalize()
+        outliers = np.zeros(len(df), dtype=bool)
+        if self.group is None:
+            rows = slice(None)
+            center, scale = center[0], scale[0]
+        else:
+            codes = self.group_codes(df)
+            rows = codes >= 0
+            center, scale = center[codes[rows]], scale[codes[rows]]
+        for column, name in enumerate(self.columns):
+            limit = self.threshold * scale[..., column]
+            distance = np.abs(df[name].to_numpy(dtype=np.float64, na_value=np.nan)[rows] - center[..., column])
+            with np.errstate(invalid='ignore'):
+                outliers[rows] |= (limit > 0) & (distance >= limit)
+        return outliers
+
+    def filter(self, df):
+        """
+        Remove the outlier rows. The frame is returned unchanged if there are none.
+
+        Parameters:
+        df (DataFrame): The data.
+
+        Returns:
+        DataFrame: The data without outliers.
+        """
+        outliers = self.outliers(df)
+        n_outliers = int(outliers.sum())
+        logger.info(f"Removed {n_outliers} of {len(df)} rows as {self.method} outliers in {self.columns}"
+                    + (f" by '{self.group}'." if self.group else '.'))
+        if not n_outliers:
+            return df
+        return df[~outliers]
@@ -1,4 +1,6 @@
 from services.data_services.preprocessing.processing import DataPreprocessing
+from services.data_services.preprocessing.schema import read_columns
+from utils.memory import copy_on_write
 
 class ShopDataPreprocessor:
     """
@@ -8,18 +10,21 @@ class ShopDataPreprocessor:
     and provides methods to preprocess specific columns and rename unnecessary columns.
     """
 
-    def __init__(self, file_path, file_type):
+    def __init__(self, file_path, file_type, encoders=None, memory_report=None):
         """
         Initializes the ShopDataPreprocessor with a file path.
 
         Parameters:
         file_path (str): The path to the processing file.
+        encoders (CategoryEncoderRegistry, optional): The registry used to label encode string columns.
+        memory_report (MemoryReport, optional): The report that tracks the peak memory of every stage.
 
         Returns:
         None.
         """
         self.file_path = file_path
-        self.data_preprocessor = DataPreprocessing(file_path, file_type)
+        self.data_preprocessor = DataPreprocessing(file_path, file_type, usecols=read_columns(file_type),
+                                                   encoders=encoders, memory_report=memory_report)
         self.df = self.data_preprocessor.get_data()
 
     def preprocess_data(self):
@@ -34,16 +39,17 @@ class ShopDataPreprocessor:
         self.df = self.data_preprocessor.preprocess_data(columns=['shop_id'])
 
         # Perform ShopDataPreprocessor steps
-        self.df = self._rename_columns()
+        with copy_on_write(), self.data_preprocessor.track('rename_columns'):
+            self._rename_columns()
         return self.df
 
     def _rename_columns(self):
         """
-        Renames and drops unnecessary columns from the dataframe.
+        Renames the shop ID column and drops the shop name, which the country ID was taken from, in place.
 
         Returns:
         pandas.DataFrame: The dataframe with specified columns renamed and dropped.
         """
-        self.df = self.df.rename(columns={'shop_id': 'shop'})
-        self.df = self.df.drop(columns=['shop_name'])
+        self.df.rename(columns={'shop_id': 'shop'}, inplace=True)
+        self.df.drop(columns=['shop_name'], inplace=True)
         return self.df
@@ -1,4 +1,12 @@
+import numpy as np
+import pandas as pd
+
 from services.data_services.preprocessing.processing import DataPreprocessing
+from services.data_services.preprocessing.schema import read_columns, cast
+from utils.log.logger import get_logger
+from utils.memory import copy_on_write
+
+logger = get_logger(__name__)
 
 class TransactionDataPreprocessor:
     """
@@ -8,19 +16,35 @@ class TransactionDataPreprocessor:
     and provides methods to calculate total sales and group the data by specific columns.
     """
 
-    def __init__(self, file, file_type=None):
+    KEYS = ['date', 'shop', 'item']
+
+    def __init__(self, file, file_type=None, chunksize=None, engine=None, encoders=None, aggregate_daily=False,
+                 memory_report=None, outlier_filter=None):
         """
         Initializes the TransactionDataPreprocessor with a file.
 
+        Only the planned transaction columns are read, with their planned dtypes.
+
         Parameters:
         file (str or io.BytesIO): The path to the data file or a BytesIO object.
         file_type (str): The type of the file, used to apply specific processing steps.
+        chunksize (int, optional): If given, the file is read and cleaned in chunks of this many rows.
+        engine (str, optional): The `read_csv` parser engine for whole-file reads, e.g. 'pyarrow'.
+        encoders (CategoryEncoderRegistry, optional): The registry used to label encode string columns.
+        aggregate_daily (bool, optional): If True, the transactions are collapsed to one row per date, shop
+            and item, see `_aggregate_daily`. Default is False.
+        memory_report (MemoryReport, optional): The report that tracks the peak memory of every stage.
+        outlier_filter (OutlierFilter, optional): If given, the outlier transactions it finds are removed
+            before the totals are calculated.
 
         Returns:
         None.
         """
         self.file = file
-        self.data_preprocessor = DataPreprocessing(file, file_type)
+        self.aggregate_daily = aggregate_daily
+        self.data_preprocessor = DataPreprocessing(file, file_type, usecols=read_columns(file_type),
+                                                   chunksize=chunksize, engine=engine, encoders=encoders,
+                                                   memory_report=memory_report, outlier_filter=outlier_filter)
         self.df = self.data_preprocessor.get_data()
 
     def preprocess_data(self):
@@ -35,7 +59,12 @@ class TransactionDataPreprocessor:
         self.df = self.data_preprocessor.preprocess_data(columns=['price'])
 
         # Perform TransactionDataPreprocessor steps
-        self.df = self._calculate_total_sales()
+        with copy_on_write():
+            with self.data_preprocessor.track('total_sales'):
+                self.df = self._calculate_total_sales()
+            if self.aggregate_daily:
+                with self.data_preprocessor.track('aggregate_daily'):
+                    self.df = self._aggregate_daily()
         return self.df
 
     def _calculate_total_sales(self):
@@ -47,3 +76,42 @@ class TransactionDataPreprocessor:
         """
         self.df['total_price'] = self.df['price'] * self.df['amount']
         return self.df
+
+    def _aggregate_daily(self):
+        """
+        Collapses the transactions to one row per date, shop and item, with the summed 'amount' and
+        'total_price', the mean 'price' and the number of transactions in 'transaction_count'.
+
+        The three keys are packed into one integer, which is factorized once; every sum is then a
+        single `np.bincount` pass. The groups keep the order of their first transaction.
+
+        Returns:
+        pandas.DataFrame: The daily dataframe.
+        """
+        n_rows = len(self.df)
+        if n_rows == 0:
+            return self.df.assign(transaction_count=np.zeros(0, dtype=np.int32))
+
+        date = self.df['date']
+        date_codes = date.cat.codes.to_numpy() if isinstance(date.dtype, pd.CategoricalDtype) else pd.factorize(date)[0]
+        shop = self.df['shop'].to_numpy().astype(np.int64)
+        item = self.df['item'].to_numpy().astype(np.int64)
+        shop, item = shop - shop.min(), item - item.min()
+        key = (date_codes.astype(np.int64) * (shop.max() + 1) + shop) * (item.max() + 1) + item
+        codes, uniques = pd.factorize(key)
+        n_groups = len(uniques)
+        counts = np.bincount(codes, minlength=n_groups)
+
+        def group_sums(column):
+            return np.bincount(codes, weights=self.df[column].to_numpy(dtype=np.float64), minlength=n_groups)
+
+        # factorize numbers the groups in order of appearance: a group starts where the running maximum grows
+        running_max = np.maximum.accumulate(codes)
+        first_rows = np.flatnonzero(np.diff(running_max, prepend=-1) > 0)
+        daily = self.df.iloc[first_rows][self.KEYS].reset_index(drop=True)
+        daily['price'] = cast('price', group_sums('price') / counts)
+        daily['amount'] = cast('amount', group_sums('amount'))
+        daily['total_price'] = cast('total_price', group_sums('total_price'))
+        daily['transaction_count'] = counts.astype(np.int32)
+        logger.info(f'Aggregated {n_rows} transactions to {len(daily)} daily rows.')
+        return daily
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# Dtypes of the raw files at read time.
+READ_DTYPES = {
+    'transaction': {'date': 'category', 'shop': 'int16', 'item': 'int32', 'price': 'float32', 'amount': 'float32'},
+    'item': {'item_id': 'int32', 'item_category_id': 'int16'},
+    'category': {'item_category_id': 'int16'},
+    'shop': {'shop_id': 'int16'},
+}
+
+# Columns read from the raw files by typed ingestion.
+READ_COLUMNS = {
+    'transaction': ['date', 'shop', 'item', 'price', 'amount'],
+    'item': ['item_id', 'item_category_id'],
+    'category': ['item_category_name', 'item_category_id'],
+    'shop': ['shop_name', 'shop_id'],
+}
+
+# Dtypes of the ID, count and calendar columns of the merged and engineered frame.
+COLUMN_DTYPES = {
+    'shop': 'int16',
+    'item': 'int32',
+    'item_category_id': 'int16',
+    'main_category': 'int16',
+    'country_id': 'int16',
+    'month': 'int16',
+    'day_of_week': 'int16',
+    'day_of_year': 'int16',
+    'day_of_month': 'int16',
+    'week_of_year': 'int16',
+    'season': 'int16',
+    'transaction_count': 'int32',
+}
+
+# Dtype of all measures: prices, amounts and engineered features.
+MEASURE_DTYPE = 'float32'
+
+
+def read_dtypes(file_type, nullable=False):
+    """
+    Return the read-time dtypes of a raw file.
+
+    Parameters:
+    file_type (str): The type of the file: 'transaction', 'item', 'category' or 'shop'.
+    nullable (bool): Whether integer columns are read as nullable integers, which allows missing
+        values until they are dropped but parses slower. Default is False.
+
+    Returns:
+    dict: The dtype of each column, or None for unknown file types.
+    """
+    dtypes = READ_DTYPES.get(file_type)
+    if dtypes is None:
+        return None
+    if nullable:
+        return {column: dtype.capitalize() if dtype.startswith('int') else dtype for column, dtype in dtypes.items()}
+    return dict(dtypes)
+
+
+def read_columns(file_type):
+    """
+    Return the columns typed ingestion reads from a raw file.
+
+    Parameters:
+    file_type (str): The type of the file.
+
+    Returns:
+    list: The column names, or None to read all columns.
+    """
+    columns = READ_COLUMNS.get(file_type)
+    return list(columns) if columns is not None else None
+
+
+def code_dtype(n_codes):
+    """
+    Return the smallest signed integer dtype holding label codes 0 .. n_codes - 1.
+
+    Parameters:
+    n_codes (int): The number of distinct labels.
+
+    Returns:
+    numpy.dtype: The dtype.
+    """
+    return np.result_type(np.min_scalar_type(-max(n_codes, 1)), np.int16)
+
+
+def planned_dtype(column, dtype):
+    """
+    Return the planned dtype of a column.
+
+    Parameters:
+    column (str): The name of the column.
+    dtype: The current dtype of the column.
+
+    Returns:
+    The planned dtype, or None if the column keeps its dtype.
+    """
+    if column in COLUMN_DTYPES:
+        return np.dtype(COLUMN_DTYPES[column])
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if pd.api.types.is_integer_dtype(dtype):
+            return dtype.numpy_dtype
+        return np.dtype(MEASURE_DTYPE) if pd.api.types.is_float_dtype(dtype) else None
+    return np.dtype(MEASURE_DTYPE) if dtype.kind == 'f' else None
+
+
+def cast(column, values):
+    """
+    Cast the values of a column to its planned dtype. Integer columns with missing values
+    become nullable integers of the planned width.
+
+    Parameters:
+    column (str): The name of the column.
+    values (Series or ndarray): The values.
+
+    Returns:
+    Series or ndarray: The values in the planned dtype.
+    """
+    dtype = planned_dtype(column, values.dtype)
+    if dtype is None or values.dtype == dtype:
+        return values
+    if dtype.kind in 'iu' and pd.isna(values).any():
+        return pd.array(values, dtype=dtype.name.capitalize())
+    return values.astype(dtype)
+
+
+def apply_dtype_plan(df, columns=None):
+    """
+    Cast the columns of a DataFrame to their planned dtypes, in place.
+
+    Parameters:
+    df (pandas.DataFrame): The frame.
+    columns (list, optional): The columns to cast. Default is all columns.
+
+    Returns:
+    pandas.DataFrame: The same frame.
+    """
+    for column in df.columns if columns is None else columns:
+        series = df[column]
+        values = cast(column, series)
+        if values is not series:
+            df[column] = values
+    return df
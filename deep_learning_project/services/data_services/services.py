@@ -1,5 +1,9 @@
+import os
+
 from services.data_services.preprocessing.merge.merge import DataPreparer
 from services.data_services.preprocessing.feature_engineering.engineering import FeatureEngineer
+from services.data_services.preprocessing.feature_engineering.incremental import IncrementalFeatureEngineer, FeatureStateStore
+from services.data_services.preprocessing.feature_engineering.partitioned import PartitionedFeatureEngineer
 from utils.log.logger import get_logger
 
 logger = get_logger(__name__)
@@ -10,6 +14,19 @@ class DataProcessingService:
     and saving/uploading processed data.
     """
 
+    def __init__(self, state_dir='FEATURE_STATE_DIR', processes='FEATURE_PROCESSES'):
+        """
+        Initializes the DataProcessingService.
+
+        Args:
+            state_dir (str): The environment variable name of the local directory for incremental
+                feature engineering state. If it is not set, every run processes the full history.
+            processes (str): The environment variable name of the number of processes for the per-series
+                features of a full run. If it is set above 1, the data is partitioned by shop.
+        """
+        self.state_dir = os.getenv(state_dir)
+        self.processes = int(os.getenv(processes)) if os.getenv(processes) else None
+
     def process_data(self):
         """
         Process data by preparing it, engineering features, and saving/uploading.
@@ -25,15 +42,22 @@ class DataProcessingService:
                                     load_data='UPLOAD_DRIVE_FOLDER',
                                     data_name='SAVED_MERGED')
 
+        if self.state_dir:
+            return self.process_data_incrementally(data_handler)
+
         # Prepare and process the data
         logger.info("Preparing data...")
         data = data_handler.prepare_data()
         logger.info("Data prepared.")
 
-        engineer = FeatureEngineer(data)
+        if self.processes and self.processes > 1:
+            engineer = PartitionedFeatureEngineer(data, cache_dir='FEATURE_CACHE_DIR', processes=self.processes)
+        else:
+            engineer = FeatureEngineer(data, cache_dir='FEATURE_CACHE_DIR')
 
         logger.info("Engineering features...")
         df = engineer.engineer_features()
+        data_handler.memory_report.record('features', df)
         logger.info("Features engineered.")
 
         logger.info(f"Saving and uploading data to Google Drive...")
@@ -41,3 +65,40 @@ class DataProcessingService:
         logger.info("Data saved and uploaded.")
 
         return "Data processing completed."
+
+    def process_data_incrementally(self, data_handler):
+        """
+        Engineer features only for the transactions newer than the stored state, append them
+        to the locally stored output and upload it.
+
+        Args:
+            data_handler (DataPreparer): The data preparer.
+
+        Returns:
+            str: Status message indicating completion.
+        """
+        store = FeatureStateStore(self.state_dir, data_handler.data_name)
+        state = store.load()
+        since = state['watermark'] if state else None
+
+        logger.info(f"Preparing transactions after {since}..." if since is not None else "Preparing data...")
+        data = data_handler.prepare_data(since=since)
+        logger.info(f"Data prepared: {len(data)} new rows.")
+
+        if state is not None and data.empty:
+            logger.info("No new transactions.")
+            return "Data processing completed."
+
+        engineer = IncrementalFeatureEngineer(data, state)
+
+        logger.info("Engineering features...")
+        df = engineer.engineer_features()
+        data_handler.memory_report.record('features', df)
+        output_path = store.append(df, engineer.get_state())
+        logger.info("Features engineered.")
+
+        logger.info(f"Uploading data to Google Drive...")
+        data_handler.upload_file(output_path)
+        logger.info("Data uploaded.")
+
+        return "Data processing completed."
@@ -1,7 +1,7 @@
 import os
 import joblib
 import pandas as pd
-from utils.db.uploader import GoogleDriveHandler
+from utils.db.uploader import get_drive_handler
 from utils.log.logger import get_logger
 
 logger = get_logger(__name__)
@@ -28,7 +28,7 @@ class AmountPredictor:
         Returns:
         None.
         """
-        self.google_drive_handler = GoogleDriveHandler(service)
+        self.google_drive_handler = get_drive_handler(service)
 
         self.file_path = file_path
         self.model_file_name = os.getenv(model_file_name)
@@ -72,6 +72,30 @@ class AmountPredictor:
         self.pca = joblib.load(pca_file)
         logger.info("Model, scaler, and PCA successfully loaded.")
 
+    def feature_columns(self):
+        """
+        Returns the features the model was trained on, as recorded by the model or else by the scaler.
+
+        Returns:
+        list: The feature names, or None if neither records them.
+        """
+        features = getattr(self.model, 'feature_columns', None)
+        if features is None:
+            features = getattr(self.scaler, 'feature_names_in_', None)
+        return None if features is None else list(features)
+
+    def required_columns(self):
+        """
+        Returns the data columns the predictions use: the shop, the item, and the features of the model.
+
+        Returns:
+        list: The column names, or None if the features are not recorded.
+        """
+        features = self.feature_columns()
+        if features is None:
+            return None
+        return list(dict.fromkeys(['shop', 'item', *features]))
+
     def get_monthly_avg(self, shop_id, item_id):
         """
         Calculates the monthly average values for the specified shop_id and item_id.
@@ -118,13 +142,16 @@ class AmountPredictor:
         Parameters:
         shop_id (int): The ID of the shop.
         item_id (int): The ID of the item.
-        features (list): The list of feature names to use for predictions.
+        features (list): The list of feature names to use for predictions, if the model does not record its own.
 
         Returns:
         float: The predicted amount.
         """
         monthly_avg = self.get_monthly_avg(shop_id, item_id)
 
+        # Only the features the model was trained on, in their training order
+        features = self.feature_columns() or features
+
         # Ensure features are numeric
         numeric_features = [feature for feature in features if feature in monthly_avg.index]
 
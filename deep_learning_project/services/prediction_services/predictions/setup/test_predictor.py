@@ -2,7 +2,8 @@ import os
 
 import pandas as pd
 
-from utils.db import GoogleDriveHandler
+from utils.db import get_drive_handler
+from utils.tables import read_table
 from services.prediction_services.predictions.setup.predict import AmountPredictor
 from utils.log.logger import get_logger
 
@@ -13,7 +14,7 @@ class TestPredictor:
     def __init__(self, data_path, test_path, service, model_file_name, scaler_file_name, pca_file_name,
                  output_path, output_id):
 
-        self.google_drive_handler = GoogleDriveHandler(service)
+        self.google_drive_handler = get_drive_handler(service)
 
         self.data_path = os.getenv(data_path)
         self.test_path = os.getenv(test_path)
@@ -27,9 +28,12 @@ class TestPredictor:
         self.df = None
         self.testdf = None
 
-    def load_data(self):
+    def load_data(self, columns=None):
         """
-        Loads the data from the CSV file.
+        Loads the data from the Parquet or CSV file, and the shops and items of the test file.
+
+        Parameters:
+        columns (list, optional): The columns of the data to read. Default is all columns.
 
         Returns:
         pandas.DataFrame: The loaded data.
@@ -38,20 +42,27 @@ class TestPredictor:
         file_id = self.google_drive_handler.search_file_by_name(self.data_path)
 
         downloaded_file = self.google_drive_handler.download_file_from_drive(file_id)
-        self.df = pd.read_csv(downloaded_file)
+        self.df = read_table(downloaded_file, columns=columns)
 
         downloaded_test_file = self.google_drive_handler.download_file_from_drive(self.test_path)
-        self.testdf = pd.read_csv(downloaded_test_file)
+        self.testdf = read_table(downloaded_test_file, columns=['shop', 'item'])
 
     def initialize_predictor(self):
         self.predictor = AmountPredictor(
             service=self.service,
-            file_path=self.df,
+            file_path=None,
             model_file_name=self.model_file_name,
             scaler_file_name=self.scaler_file_name,
             pca_file_name=self.pca_file_name
         )
-        self.predictor.run()
+        # The data file and the model bundle are resolved with one list call
+        self.google_drive_handler.warm_names([self.data_path, self.predictor.model_file_name,
+                                              self.predictor.scaler_file_name, self.predictor.pca_file_name])
+        # The scaler tells which columns the predictions use, so the data is read after it
+        self.predictor.load_model_and_scaler()
+        self.load_data(columns=self.predictor.required_columns())
+        self.predictor.file_path = self.df
+        self.predictor.load_data()
 
     def make_predictions(self):
         target = 'amount'
@@ -98,7 +109,6 @@ class TestPredictor:
 
 
     def run(self):
-        self.load_data()
         self.initialize_predictor()
         # predictions = self.make_predictions()
         # self.save_predictions(predictions)
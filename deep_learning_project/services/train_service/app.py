@@ -42,7 +42,14 @@ def train_app(request: TrainRequest):
             train_ratio=request.train_ratio,
             learning_rate=request.learning_rate,
             epochs=request.epochs,
-            n_components=request.n_components
+            n_components=request.n_components,
+            checkpoint_every=request.checkpoint_every,
+            warm_start=request.warm_start,
+            warm_start_epochs=request.warm_start_epochs,
+            replay_ratio=request.replay_ratio,
+            validation_ratio=request.validation_ratio,
+            patience=request.patience,
+            streaming=request.streaming
         )
         training_service.train_model()
         return {"status": "training completed"}
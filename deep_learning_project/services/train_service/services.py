@@ -11,7 +11,9 @@ class TrainingService:
     Service for training a deep learning model.
     """
 
-    def __init__(self, layer_architecture, batch_size, time_step, train_ratio, learning_rate, epochs, n_components):
+    def __init__(self, layer_architecture, batch_size, time_step, train_ratio, learning_rate, epochs, n_components,
+                 checkpoint_every=10, warm_start=False, warm_start_epochs=5, replay_ratio=0.0,
+                 validation_ratio=0.1, patience=None, streaming=False):
         """
         Initialize the TrainingService with the given parameters.
 
@@ -23,6 +25,13 @@ class TrainingService:
             learning_rate (float): Learning rate for the optimizer.
             epochs (int): Number of training epochs.
             n_components (int): Number of PCA components.
+            checkpoint_every (int): Number of epochs between training checkpoints.
+            warm_start (bool): Whether to fine-tune the deployed model on the new rows only.
+            warm_start_epochs (int): Number of epochs for a warm-start run.
+            replay_ratio (float): Number of replayed old (row, next row) pairs per new row in a warm-start run.
+            validation_ratio (float): Share of the training window used for validation.
+            patience (int): Epochs without validation improvement before stopping early, None to disable.
+            streaming (bool): Whether to preprocess the training data chunk by chunk from disk.
         """
         self.layer_architecture = layer_architecture
         self.batch_size = batch_size
@@ -31,6 +40,13 @@ class TrainingService:
         self.learning_rate = learning_rate
         self.epochs = epochs
         self.n_components = n_components
+        self.checkpoint_every = checkpoint_every
+        self.warm_start = warm_start
+        self.warm_start_epochs = warm_start_epochs
+        self.replay_ratio = replay_ratio
+        self.validation_ratio = validation_ratio
+        self.patience = patience
+        self.streaming = streaming
 
     def train_model(self):
         """
@@ -54,6 +70,15 @@ class TrainingService:
             learning_rate=self.learning_rate,
             epochs=self.epochs,
             n_components=self.n_components,
+            checkpoint_dir='CHECKPOINT_DIR',
+            cache_dir='PREPROCESSING_CACHE_DIR',
+            checkpoint_every=self.checkpoint_every,
+            warm_start=self.warm_start,
+            warm_start_epochs=self.warm_start_epochs,
+            replay_ratio=self.replay_ratio,
+            validation_ratio=self.validation_ratio,
+            patience=self.patience,
+            streaming=self.streaming,
         )
 
         logger.info("Training started")
@@ -1,3 +1,8 @@
 from .dataset import DatasetCreator
 from .train_test_split import DatasetProcessor
-from .trainer import ModelTrainer
\ No newline at end of file
+from .evaluator import ModelEvaluator
+from .trainer import ModelTrainer
+from .early_stopping import EarlyStopping
+from .streaming import StreamingPreprocessor
+from .cache import PreprocessingCache
+from .selection import FeatureSelector, subset_scaler
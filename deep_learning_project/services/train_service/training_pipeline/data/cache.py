@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PreprocessingCache:
+    """
+    A class for caching scaled and PCA-transformed training matrices on local disk.
+
+    Every entry is a folder named after a content hash of the source file and of the
+    preprocessing configuration. It holds the transformed matrix as `.npy`, the fitted scaler
+    and PCA, and the resolved feature list, so a run with the same key can skip downloading,
+    parsing and fitting altogether. Every new data version adds an entry, so the least recently
+    used entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=10 * 2 ** 30):
+        """
+        Initializes the PreprocessingCache.
+
+        Parameters:
+        directory (str): The local folder of the cache.
+        max_bytes (int, optional): The size the entries are evicted down to. Default is 10 GiB.
+
+        Returns:
+        None.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(source_hash, features, n_components, **options):
+        """
+        Builds the cache key of a preprocessing run.
+
+        Parameters:
+        source_hash (str): The content hash of the source file.
+        features (list or dict): The feature list, or the rule the feature list is derived with.
+        n_components (int): The number of principal components.
+        **options: Any other setting that changes the transformed matrix.
+
+        Returns:
+        str: The cache key.
+        """
+        description = json.dumps({'source': source_hash, 'features': features,
+                                   'n_components': n_components, **options}, sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def load(self, key):
+        """
+        Loads a cache entry.
+
+        Parameters:
+        key (str): The cache key.
+
+        Returns:
+        dict: The memory-mapped matrix, scaler, PCA, features and trained_until, or None on a miss.
+        """
+        entry = os.path.join(self.directory, key)
+        if not os.path.exists(os.path.join(entry, 'meta.json')):
+            logger.info(f"Preprocessing cache miss for key {key[:12]}.")
+            return None
+
+        with open(os.path.join(entry, 'meta.json')) as file:
+            meta = json.load(file)
+        # Marks the entry as recently used
+        os.utime(entry)
+        logger.info(f"Preprocessing cache hit for key {key[:12]}.")
+        return {
+            'scaled_data': np.load(os.path.join(entry, 'scaled_data.npy'), mmap_mode='r'),
+            'scaler': joblib.load(os.path.join(entry, 'scaler.joblib')),
+            'pca': joblib.load(os.path.join(entry, 'pca.joblib')),
+            'features': meta['features'],
+            'trained_until': meta['trained_until'],
+        }
+
+    def store(self, key, scaled_data, scaler, pca, features, trained_until):
+        """
+        Stores a cache entry.
+
+        The entry is written to a temporary folder and renamed once complete, so concurrent
+        or interrupted runs never see a partial entry. The least recently used entries are
+        evicted afterwards if the cache is too large.
+
+        Parameters:
+        key (str): The cache key.
+        scaled_data (numpy.ndarray): The scaled and PCA-transformed matrix.
+        scaler (MinMaxScaler): The fitted scaler.
+        pca (PCA or IncrementalPCA): The fitted PCA.
+        features (list): The feature columns the scaler was fitted on.
+        trained_until (str): The last date covered by the data.
+
+        Returns:
+        None.
+        """
+        entry = os.path.join(self.directory, key)
+        if os.path.exists(entry):
+            return
+
+        tmp_entry = f'{entry}.{os.getpid()}.tmp'
+        os.makedirs(tmp_entry, exist_ok=True)
+        try:
+            np.save(os.path.join(tmp_entry, 'scaled_data.npy'), scaled_data)
+            joblib.dump(scaler, os.path.join(tmp_entry, 'scaler.joblib'))
+            joblib.dump(pca, os.path.join(tmp_entry, 'pca.joblib'))
+            with open(os.path.join(tmp_entry, 'meta.json'), 'w') as file:
+                json.dump({'features': features, 'trained_until': trained_until}, file)
+        except BaseException:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            raise
+
+        try:
+            os.rename(tmp_entry, entry)
+            logger.info(f"Preprocessing results cached under key {key[:12]}.")
+        except OSError:
+            # Another run stored the same entry first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict(keep=entry)
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits in `max_bytes`.
+
+        Parameters:
+        keep (str, optional): The path of an entry that is never removed, e.g. the one just stored.
+
+        Returns:
+        None.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            # Folders still being written are not entries yet
+            if entry.is_dir() and not entry.name.endswith('.tmp'):
+                size = sum(file.stat().st_size for file in os.scandir(entry.path) if file.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logger.info(f"Evicted {os.path.basename(path)[:12]} from the preprocessing cache.")
@@ -28,8 +28,6 @@ class DatasetCreator:
                - X (numpy.ndarray): The input processing.
                - Y (numpy.ndarray): The output processing, which is the input processing shifted by one time step.
         """
-        X, Y = [], []
-        for i in range(len(data) - 1):
-            X.append(data[i])
-            Y.append(data[i + 1])
-        return np.array(X), np.array(Y)
+        # Slicing keeps memory-mapped data on disk instead of copying it row by row
+        data = np.asarray(data)
+        return data[:-1], data[1:]
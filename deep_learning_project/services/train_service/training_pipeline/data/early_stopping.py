@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EarlyStopping:
+    """
+    A class for stopping training once the validation loss stops improving.
+
+    After every epoch the validation loss is computed; the weights of the best epoch are kept
+    and restored when training ends. Training stops after `patience` epochs without an
+    improvement of at least `min_delta`.
+    """
+
+    def __init__(self, X_val, Y_val, evaluate_loss, patience=5, min_delta=0.0):
+        """
+        Initializes the EarlyStopping with a validation set.
+
+        Parameters:
+        X_val (numpy.ndarray): The validation input data.
+        Y_val (numpy.ndarray): The validation output data.
+        evaluate_loss (callable): Computes the loss of a model on a dataset, called as `evaluate_loss(model, X, Y)`.
+        patience (int, optional): Number of epochs without improvement before stopping. Default is 5.
+        min_delta (float, optional): Minimum decrease of the validation loss counted as an improvement. Default is 0.0.
+
+        Returns:
+        None.
+        """
+        self.X_val = X_val
+        self.Y_val = Y_val
+        self.evaluate_loss = evaluate_loss
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_loss = np.inf
+        self.best_epoch = None
+        self.best_state = None
+        self.wait = 0
+        self.first_epoch = None
+        self.last_epoch = None
+        self.epoch_times = []
+        self._last_time = time.perf_counter()
+
+    def on_epoch_end(self, model, epoch, loss):
+        """
+        Evaluates the validation loss and decides whether training should stop.
+
+        Parameters:
+        model (DPModel): The model being trained.
+        epoch (int): The index of the epoch that just finished.
+        loss (float): The training loss of the epoch.
+
+        Returns:
+        bool: True if training should stop.
+        """
+        if self.first_epoch is None:
+            self.first_epoch = epoch
+        self.last_epoch = epoch
+
+        val_loss = self.evaluate_loss(model, self.X_val, self.Y_val)
+        now = time.perf_counter()
+        self.epoch_times.append(now - self._last_time)
+        self._last_time = now
+        logger.info(f'Epoch {epoch + 1}, Validation Loss: {val_loss}, Validation RMSE: {np.sqrt(val_loss)}')
+
+        if val_loss < self.best_loss - self.min_delta:
+            self.best_loss = val_loss
+            self.best_epoch = epoch
+            self.best_state = model.get_state()
+            self.wait = 0
+            return False
+
+        self.wait += 1
+        return self.wait >= self.patience
+
+    def restore_best(self, model):
+        """
+        Restores the weights of the epoch with the lowest validation loss.
+
+        Parameters:
+        model (DPModel): The trained model.
+
+        Returns:
+        DPModel: The model with the best weights.
+        """
+        if self.best_state is not None:
+            model.set_state(self.best_state)
+            logger.info(f'Restored the weights of epoch {self.best_epoch + 1} '
+                        f'(validation RMSE: {np.sqrt(self.best_loss)}).')
+        return model
+
+    def summary(self, epochs):
+        """
+        Summarizes the run compared to training for every requested epoch.
+
+        Parameters:
+        epochs (int): The number of epochs that were requested.
+
+        Returns:
+        dict: The epochs run, the best epoch, and the epochs and estimated wall time saved.
+        """
+        epochs_run = 0 if self.last_epoch is None else self.last_epoch + 1
+        epochs_saved = max(epochs - epochs_run, 0)
+        mean_epoch_time = float(np.mean(self.epoch_times)) if self.epoch_times else 0.0
+        return {
+            'epochs_requested': epochs,
+            'epochs_run': epochs_run,
+            'best_epoch': None if self.best_epoch is None else self.best_epoch + 1,
+            'best_val_rmse': float(np.sqrt(self.best_loss)),
+            'epochs_saved': epochs_saved,
+            'wall_time_saved': epochs_saved * mean_epoch_time,
+        }
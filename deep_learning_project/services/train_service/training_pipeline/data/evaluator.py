@@ -0,0 +1,127 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class ModelEvaluator:
+    """
+    A class for evaluating a model on large datasets in chunks.
+
+    Predictions are written into a preallocated array, and RMSE, MAE, MAPE and R² are
+    accumulated in a single streaming pass, so memory stays bounded by the chunk size
+    and no Python-level list of per-row predictions is ever built.
+    """
+
+    def __init__(self, chunk_size=65536, max_workers=2):
+        """
+        Initializes the ModelEvaluator.
+
+        Parameters:
+        chunk_size (int, optional): Number of rows predicted at once. Default is 65536.
+        max_workers (int, optional): Number of datasets evaluated concurrently by `evaluate_many`. Default is 2.
+
+        Returns:
+        None.
+        """
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def predict(self, model, X, out=None):
+        """
+        Predicts the output for the given input data in chunks.
+
+        Parameters:
+        model (DPModel): The trained deep learning model.
+        X (numpy.ndarray): The input data to predict.
+        out (numpy.ndarray, optional): A preallocated array to write the predictions to.
+
+        Returns:
+        numpy.ndarray: The predicted output data.
+        """
+        if out is None:
+            out = np.empty((X.shape[0], model.layers[-1].weights.shape[1]))
+        for start in range(0, X.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            out[start:end] = model.predict(X[start:end])
+        return out
+
+    def evaluate(self, model, X, Y, out=None):
+        """
+        Evaluates the model on a dataset in a single streaming pass.
+
+        The mean and the sum of squared deviations of the targets, needed for R², are
+        combined chunk by chunk with Chan's parallel update, which stays numerically stable
+        for large datasets.
+
+        Parameters:
+        model (DPModel): The trained deep learning model.
+        X (numpy.ndarray): The input data.
+        Y (numpy.ndarray): The output data.
+        out (numpy.ndarray, optional): A preallocated array to keep the predictions in.
+
+        Returns:
+        dict: The MSE, RMSE, MAE, MAPE (in percent, over non-zero targets) and R² of the model.
+        """
+        n = 0
+        y_mean = 0.0
+        y_m2 = 0.0
+        squared_error = 0.0
+        absolute_error = 0.0
+        percentage_error = 0.0
+        n_nonzero = 0
+
+        for start in range(0, X.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            y_true = np.asarray(Y[start:end], dtype=np.float64)
+            y_pred = model.predict(X[start:end])
+            if out is not None:
+                out[start:end] = y_pred
+
+            error = y_pred - y_true
+            squared_error += np.dot(error.ravel(), error.ravel())
+            absolute_error += np.abs(error).sum()
+            nonzero = y_true != 0
+            percentage_error += np.abs(error[nonzero] / y_true[nonzero]).sum()
+            n_nonzero += np.count_nonzero(nonzero)
+
+            chunk_n = y_true.size
+            chunk_mean = y_true.mean()
+            chunk_m2 = np.sum((y_true - chunk_mean) ** 2)
+            delta = chunk_mean - y_mean
+            total = n + chunk_n
+            y_mean += delta * chunk_n / total
+            y_m2 += chunk_m2 + delta ** 2 * n * chunk_n / total
+            n = total
+
+        if n == 0:
+            raise ValueError("Cannot evaluate a model on an empty dataset.")
+
+        mse = squared_error / n
+        return {
+            'mse': float(mse),
+            'rmse': float(np.sqrt(mse)),
+            'mae': float(absolute_error / n),
+            'mape': float(percentage_error / n_nonzero * 100) if n_nonzero else float('nan'),
+            'r2': float(1 - squared_error / y_m2) if y_m2 > 0 else float('nan'),
+        }
+
+    def evaluate_many(self, model, datasets):
+        """
+        Evaluates the model on several datasets concurrently.
+
+        The layers keep their last inputs and outputs as attributes, so every task works on
+        its own copy of the model. NumPy releases the GIL in the matrix products, which makes
+        the evaluations overlap.
+
+        Parameters:
+        model (DPModel): The trained deep learning model.
+        datasets (dict): Mapping of dataset names to (X, Y) tuples.
+
+        Returns:
+        dict: Mapping of dataset names to their metrics.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {name: executor.submit(self.evaluate, copy.deepcopy(model), X, Y)
+                       for name, (X, Y) in datasets.items()}
+            return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,175 @@
+import copy
+
+import numpy as np
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FeatureSelector:
+    """
+    A class for dropping near-constant and redundant feature columns before scaling and PCA.
+
+    The column ranges, sums and the cross-product matrix XᵀX are accumulated chunk by chunk,
+    so the variances and the whole correlation matrix come out of one vectorized pass over the
+    data. The values are shifted by the column means of the first chunk before the products are
+    summed, which keeps the sums small and the variances accurate.
+
+    - Near-constant: the variance of the column after min-max scaling, the scaling the features
+      get next, is at most `variance_threshold`.
+    - Redundant: the absolute correlation with a column kept before it is at least
+      `correlation_threshold`. Columns are visited in their original order.
+
+    Missing values count as the shift, i.e. as the column mean of the first chunk.
+    """
+
+    def __init__(self, variance_threshold=1e-4, correlation_threshold=0.95, min_features=1, chunk_size=100000):
+        """
+        Initializes the FeatureSelector.
+
+        Parameters:
+        variance_threshold (float, optional): The largest min-max scaled variance of a near-constant column.
+                                              Default is 1e-4.
+        correlation_threshold (float, optional): The smallest absolute correlation of a redundant column.
+                                                 None keeps all correlated columns. Default is 0.95.
+        min_features (int, optional): The fewest columns to keep, e.g. the number of principal components.
+                                      The least correlated redundant columns are kept back to reach it. Default is 1.
+        chunk_size (int, optional): The number of rows `fit` processes at once. Default is 100000.
+
+        Returns:
+        None.
+        """
+        self.variance_threshold = variance_threshold
+        self.correlation_threshold = correlation_threshold
+        self.min_features = min_features
+        self.chunk_size = chunk_size
+        self.columns = None
+        self.n_rows = 0
+        self.shift = None
+        self.sums = None
+        self.products = None
+        self.data_min = None
+        self.data_max = None
+        self.selected = None
+
+    def partial_fit(self, chunk):
+        """
+        Adds a chunk of rows to the sums.
+
+        Parameters:
+        chunk (pandas.DataFrame): The feature columns of the chunk.
+
+        Returns:
+        FeatureSelector: The selector itself.
+        """
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        values = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if not len(values):
+            return self
+
+        with np.errstate(invalid='ignore'):
+            chunk_min, chunk_max = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        if self.shift is None:
+            self.shift = np.nansum(values, axis=0) / np.maximum((~np.isnan(values)).sum(axis=0), 1)
+            self.sums = np.zeros(len(self.columns))
+            self.products = np.zeros((len(self.columns), len(self.columns)))
+            self.data_min, self.data_max = chunk_min, chunk_max
+        else:
+            self.data_min, self.data_max = np.fmin(self.data_min, chunk_min), np.fmax(self.data_max, chunk_max)
+
+        # A new array: the frame's own data may be read-only under Copy-on-Write
+        values = np.nan_to_num(values - self.shift, copy=False)
+        self.sums += values.sum(axis=0)
+        self.products += values.T @ values
+        self.n_rows += len(values)
+        self.selected = None
+        return self
+
+    def fit(self, df):
+        """
+        Accumulates the sums over a DataFrame chunk by chunk and selects the columns.
+
+        Parameters:
+        df (pandas.DataFrame): The feature columns.
+
+        Returns:
+        list: The selected columns.
+        """
+        for start in range(0, len(df), self.chunk_size):
+            self.partial_fit(df.iloc[start:start + self.chunk_size])
+        return self.select()
+
+    def statistics(self):
+        """
+        Computes the min-max scaled variances and the correlation matrix from the sums.
+
+        Returns:
+        tuple: The scaled variance of every column, and the correlation matrix.
+        """
+        mean = self.sums / self.n_rows
+        covariance = self.products / self.n_rows - np.outer(mean, mean)
+        variance = np.clip(np.diag(covariance), 0, None)
+        data_range = np.nan_to_num(self.data_max - self.data_min)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled_variance = np.where(data_range > 0, variance / data_range ** 2, 0.0)
+            std = np.sqrt(variance)
+            correlation = covariance / np.outer(std, std)
+        return scaled_variance, np.nan_to_num(correlation)
+
+    def select(self):
+        """
+        Selects the columns from the sums.
+
+        Returns:
+        list: The selected columns, in their original order.
+
+        Raises:
+        ValueError: If no rows were added.
+        """
+        if self.selected is not None:
+            return self.selected
+        if not self.n_rows:
+            raise ValueError("FeatureSelector has no rows to select features from.")
+
+        scaled_variance, correlation = self.statistics()
+        varying = np.flatnonzero(scaled_variance > self.variance_threshold)
+        kept, redundant = [], []
+        for column in varying:
+            if (self.correlation_threshold is not None and kept
+                    and np.abs(correlation[column, kept]).max() >= self.correlation_threshold):
+                redundant.append(column)
+            else:
+                kept.append(column)
+
+        n_missing = self.min_features - len(kept)
+        if n_missing > 0 and redundant:
+            # Keep back the redundant columns least correlated with the kept ones
+            overlap = np.abs(correlation[np.ix_(redundant, kept)]).max(axis=1) if kept else np.zeros(len(redundant))
+            kept += [redundant[i] for i in np.argsort(overlap, kind='stable')[:n_missing]]
+
+        self.selected = [self.columns[column] for column in sorted(kept)]
+        logger.info(f"Selected {len(self.selected)} of {len(self.columns)} features: "
+                    f"{len(self.columns) - len(varying)} near-constant and "
+                    f"{len(varying) - len(self.selected)} redundant columns dropped.")
+        return self.selected
+
+
+def subset_scaler(scaler, columns):
+    """
+    Returns a copy of a fitted MinMaxScaler restricted to some of its columns.
+
+    Parameters:
+    scaler (MinMaxScaler): The scaler, fitted with feature names.
+    columns (list): The columns to keep.
+
+    Returns:
+    MinMaxScaler: The scaler of the columns.
+    """
+    positions = [list(scaler.feature_names_in_).index(column) for column in columns]
+    subset = copy.deepcopy(scaler)
+    for attribute in ('data_min_', 'data_max_', 'data_range_', 'scale_', 'min_', 'feature_names_in_'):
+        setattr(subset, attribute, getattr(scaler, attribute)[positions])
+    subset.n_features_in_ = len(columns)
+    return subset
@@ -0,0 +1,152 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.log.logger import get_logger
+from utils.tables import iter_table_batches, table_columns
+from .selection import subset_scaler
+
+logger = get_logger(__name__)
+
+
+class StreamingPreprocessor:
+    """
+    A class for scaling and projecting a large Parquet or CSV file without loading it into memory.
+
+    The file is read in chunks twice. The first pass fits the MinMaxScaler with `partial_fit`,
+    and the FeatureSelector if one is given. The second pass reads only the selected features,
+    scales each chunk, fits an IncrementalPCA on it and writes it to a memory-mapped matrix.
+    The scaled matrix is then projected chunk by chunk into a second memory-mapped matrix, so
+    peak memory is bounded by the chunk size.
+    """
+
+    def __init__(self, n_components, target='amount', chunk_size=100000, work_dir=None, selector=None):
+        """
+        Initializes the StreamingPreprocessor.
+
+        Parameters:
+        n_components (int): The number of principal components.
+        target (str, optional): The target column, excluded from the features. Default is 'amount'.
+        chunk_size (int, optional): The number of rows read at once. Default is 100000.
+        work_dir (str, optional): The folder of the memory-mapped matrices. A temporary folder is used by default.
+        selector (FeatureSelector, optional): Drops near-constant and redundant features after the first pass.
+
+        Returns:
+        None.
+        """
+        self.n_components = n_components
+        self.target = target
+        self.chunk_size = max(chunk_size, n_components)
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='streaming_')
+        self.scaler = MinMaxScaler()
+        self.pca = IncrementalPCA(n_components=n_components)
+        self.selector = selector
+        self.features = None
+        self.n_rows = 0
+        self.trained_until = None
+
+    def _read_chunks(self, file_path, columns):
+        return iter_table_batches(file_path, columns, self.chunk_size)
+
+    def fit_scaler(self, file_path):
+        """
+        First pass: fits the scaler and the feature selector, and counts the rows and the covered dates.
+
+        Parameters:
+        file_path (str): The path to the Parquet or CSV file.
+
+        Returns:
+        MinMaxScaler: The fitted scaler.
+        """
+        columns = table_columns(file_path)
+        self.features = [col for col in columns if col not in (self.target, 'date')]
+        if self.n_components > len(self.features):
+            raise ValueError(f"n_components cannot be greater than the number of features ({len(self.features)}).")
+
+        last_date = None
+        for chunk in self._read_chunks(file_path, self.features + ['date']):
+            self.scaler.partial_fit(chunk[self.features])
+            if self.selector is not None:
+                self.selector.partial_fit(chunk[self.features])
+            self.n_rows += len(chunk)
+            chunk_last_date = pd.to_datetime(chunk['date']).max()
+            last_date = chunk_last_date if last_date is None else max(last_date, chunk_last_date)
+
+        if self.n_rows < self.n_components:
+            raise ValueError(f"n_components cannot be greater than the number of rows ({self.n_rows}).")
+        self.trained_until = str(last_date.date())
+        if self.selector is not None:
+            # The scaler of the kept columns is the same as one fitted on them alone
+            self.features = self.selector.select()
+            self.scaler = subset_scaler(self.scaler, self.features)
+        logger.info(f"Scaler fitted on {self.n_rows} rows in chunks of {self.chunk_size}.")
+        return self.scaler
+
+    def fit_pca(self, file_path):
+        """
+        Second pass: scales every chunk, fits the IncrementalPCA on it and stores it in a memory-mapped matrix.
+
+        Parameters:
+        file_path (str): The path to the Parquet or CSV file.
+
+        Returns:
+        numpy.memmap: The scaled data.
+        """
+        scaled_data = np.lib.format.open_memmap(os.path.join(self.work_dir, 'scaled.npy'), mode='w+',
+                                                dtype=np.float32, shape=(self.n_rows, len(self.features)))
+        # IncrementalPCA needs at least n_components rows per batch, so the rows of a chunk are
+        # fitted only once the next chunk shows they are not followed by a short remainder.
+        start = batch_start = 0
+        for chunk in self._read_chunks(file_path, self.features):
+            scaled_chunk = self.scaler.transform(chunk[self.features])
+            scaled_chunk[np.isnan(scaled_chunk)] = 0
+            end = start + len(scaled_chunk)
+            scaled_data[start:end] = scaled_chunk
+
+            if len(scaled_chunk) >= self.n_components and start - batch_start >= self.n_components:
+                self.pca.partial_fit(scaled_data[batch_start:start])
+                batch_start = start
+            start = end
+        self.pca.partial_fit(scaled_data[batch_start:start])
+
+        scaled_data.flush()
+        return scaled_data
+
+    def transform(self, scaled_data):
+        """
+        Projects the scaled data chunk by chunk into a memory-mapped matrix.
+
+        Parameters:
+        scaled_data (numpy.ndarray): The scaled data.
+
+        Returns:
+        numpy.memmap: The projected data.
+        """
+        projected = np.lib.format.open_memmap(os.path.join(self.work_dir, 'projected.npy'), mode='w+',
+                                              dtype=np.float32, shape=(self.n_rows, self.n_components))
+        for start in range(0, self.n_rows, self.chunk_size):
+            end = start + self.chunk_size
+            projected[start:end] = self.pca.transform(scaled_data[start:end])
+        projected.flush()
+        return projected
+
+    def fit_transform(self, file_path):
+        """
+        Runs both passes over the file and projects the data.
+
+        Parameters:
+        file_path (str): The path to the Parquet or CSV file.
+
+        Returns:
+        numpy.memmap: The scaled and PCA-transformed data.
+        """
+        self.fit_scaler(file_path)
+        scaled_data = self.fit_pca(file_path)
+        projected = self.transform(scaled_data)
+        del scaled_data
+        os.remove(os.path.join(self.work_dir, 'scaled.npy'))
+        return projected
@@ -1,5 +1,6 @@
-import numpy as np
 from utils.log.logger import get_logger
+from services.train_service.training_pipeline.data.early_stopping import EarlyStopping
+from services.train_service.training_pipeline.data.evaluator import ModelEvaluator
 
 logger = get_logger(__name__)
 
@@ -14,7 +15,8 @@ class ModelTrainer():
     """
 
     def __init__(self, learning_rate, epochs, layer_architecture, batch_size,
-                 current_model, current_loss, current_optimizer):
+                 current_model, current_loss, current_optimizer,
+                 validation_ratio=0.1, patience=None, min_delta=0.0, eval_chunk_size=65536):
         """
         Initializes the ModelTrainer with specified learning rate, number of epochs, and layer architecture.
 
@@ -22,6 +24,12 @@ class ModelTrainer():
         learning_rate (float): The learning rate for the optimizer.
         epochs (int): The number of epochs to train the model.
         layer_architecture (list): The architecture of the layers.
+        validation_ratio (float, optional): The share of the training window held out for validation
+                                            when early stopping is enabled. Default is 0.1.
+        patience (int, optional): Number of epochs without validation improvement before training stops.
+                                  Early stopping is disabled when None. Default is None.
+        min_delta (float, optional): Minimum decrease of the validation loss counted as an improvement. Default is 0.0.
+        eval_chunk_size (int, optional): Number of rows predicted at once during evaluation. Default is 65536.
 
         Returns:
         None.
@@ -33,6 +41,12 @@ class ModelTrainer():
         self.current_model = current_model
         self.current_loss = current_loss
         self.current_optimizer = current_optimizer
+        self.validation_ratio = validation_ratio
+        self.patience = patience
+        self.min_delta = min_delta
+        self.evaluator = ModelEvaluator(chunk_size=eval_chunk_size)
+        self.summary = None
+        self.metrics = None
 
 
     def build_model(self, input_size):
@@ -51,6 +65,27 @@ class ModelTrainer():
         self.current_model.set_optimizer(self.current_optimizer(learning_rate=self.learning_rate))
         return self.current_model
 
+    def prepare_warm_model(self, model):
+        """
+        Prepares an already trained model for fine-tuning.
+
+        The loss and a fresh optimizer are attached, and the optimizer state left on the
+        layers by the previous run is dropped so the new learning rate takes effect cleanly.
+
+        Parameters:
+        model (DPModel): The previously trained model.
+
+        Returns:
+        DPModel: The model ready for further training.
+        """
+        for layer in model.layers:
+            for name in ('weight_momentums', 'weight_cache', 'bias_momentums', 'bias_cache'):
+                if hasattr(layer, name):
+                    delattr(layer, name)
+        model.set_loss(self.current_loss)
+        model.set_optimizer(self.current_optimizer(learning_rate=self.learning_rate))
+        return model
+
     def add_layers(self, model, input_size):
         """
         Adds layers to the model.
@@ -71,29 +106,21 @@ class ModelTrainer():
 
 
 
-    def batch_predict(self, model, X, batch_size=32):
+    def evaluate_loss(self, model, X, Y):
         """
-        Predicts the output for the given input processing in batches.
+        Computes the mean squared error of the model on a dataset in large chunks.
 
         Parameters:
-        model (DPModel): The trained deep learning model.
-        X (numpy.ndarray): The input processing to predict.
-        batch_size (int): The size of the batches to use for predictions.
+        model (DPModel): The model to evaluate.
+        X (numpy.ndarray): The input data.
+        Y (numpy.ndarray): The output data.
 
         Returns:
-        numpy.ndarray: The predicted output processing.
+        float: The mean squared error.
         """
-        n_samples = X.shape[0]
-        predictions = []
-
-        for start in range(0, n_samples, batch_size):
-            end = min(start + batch_size, n_samples)
-            batch_predictions = model.predict(X[start:end])
-            predictions.extend(batch_predictions)
-
-        return np.array(predictions)
+        return self.evaluator.evaluate(model, X, Y)['mse']
 
-    def fit(self, X_train, Y_train, X_test, Y_test):
+    def fit(self, X_train, Y_train, X_test, Y_test, checkpoints=None, model=None):
         """
         Trains the model on the training processing and evaluates it on the testing processing.
 
@@ -102,24 +129,53 @@ class ModelTrainer():
         Y_train (numpy.ndarray): The training output processing.
         X_test (numpy.ndarray): The testing input processing.
         Y_test (numpy.ndarray): The testing output processing.
+        checkpoints (CheckpointManager, optional): Saves the training state periodically and
+                                                   resumes from the latest checkpoint if one exists.
+        model (DPModel, optional): A previously trained model to fine-tune instead of building a new one.
 
         Returns:
         DPModel: The trained deep learning model.
         """
-        model = self.build_model(X_train.shape[1])
-        model.train(X_train, Y_train, epochs=self.epochs, batch_size=self.batch_size)
-
-        # Performance on training processing
-        train_predictions = self.batch_predict(model, X_train)
-        train_loss = model.loss.forward(y_pred=train_predictions, y_true=Y_train)
-        train_rmse = np.sqrt(train_loss)
-        logger.info(f'Train RMSE: {train_rmse}')
-
-        # Performance on testing processing
-        test_predictions = self.batch_predict(model, X_test)
-        test_loss = model.loss.forward(y_pred=test_predictions, y_true=Y_test)
-        test_rmse = np.sqrt(test_loss)
-        logger.info(f'Test RMSE: {test_rmse}')
+        if model is not None:
+            model = self.prepare_warm_model(model)
+        else:
+            model = self.build_model(X_train.shape[1])
+
+        start_epoch = 0
+        callbacks = []
+        if checkpoints is not None:
+            start_epoch = checkpoints.restore(model)
+            callbacks.append(checkpoints)
+
+        early_stopping = None
+        X_fit, Y_fit = X_train, Y_train
+        # Hold out the most recent part of the training window for validation
+        split = int(len(X_train) * (1 - self.validation_ratio))
+        if self.patience is not None and not 0 < split < len(X_train):
+            logger.warning(f"Early stopping skipped: a validation ratio of {self.validation_ratio} leaves "
+                           f"{split} of {len(X_train)} training rows to fit on and {len(X_train) - split} to validate on.")
+        elif self.patience is not None:
+            X_fit, Y_fit = X_train[:split], Y_train[:split]
+            early_stopping = EarlyStopping(X_train[split:], Y_train[split:], self.evaluate_loss,
+                                           patience=self.patience, min_delta=self.min_delta)
+            callbacks.append(early_stopping)
+
+        model.train(X_fit, Y_fit, epochs=self.epochs, batch_size=self.batch_size,
+                    start_epoch=start_epoch, callbacks=callbacks)
+
+        if early_stopping is not None:
+            early_stopping.restore_best(model)
+            self.summary = early_stopping.summary(self.epochs)
+            logger.info(f"Training summary: ran {self.summary['epochs_run']} of {self.summary['epochs_requested']} epochs, "
+                        f"best epoch {self.summary['best_epoch']}, saved {self.summary['epochs_saved']} epochs "
+                        f"and about {self.summary['wall_time_saved']:.1f}s of wall time.")
+
+        # Performance on training and testing processing, evaluated concurrently
+        self.metrics = self.evaluator.evaluate_many(model, {'train': (X_train, Y_train),
+                                                            'test': (X_test, Y_test)})
+        for name, metrics in self.metrics.items():
+            logger.info(f"{name.capitalize()} RMSE: {metrics['rmse']}, MAE: {metrics['mae']}, "
+                        f"MAPE: {metrics['mape']}, R2: {metrics['r2']}")
 
         return model
 
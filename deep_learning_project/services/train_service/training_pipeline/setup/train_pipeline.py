@@ -1,4 +1,7 @@
+import json
 import os
+import shutil
+import tempfile
 from io import BytesIO
 
 import joblib
@@ -7,9 +10,12 @@ import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import MinMaxScaler
 
-from utils.db import GoogleDriveHandler
-from services.train_service.training_pipeline.data import ModelTrainer, DatasetProcessor
+from utils.db import get_drive_handler
+from utils.networks.dlmodel import CheckpointManager
+from services.train_service.training_pipeline.data import (ModelTrainer, DatasetProcessor, StreamingPreprocessor,
+                                                           PreprocessingCache, FeatureSelector)
 from utils.log.logger import get_logger
+from utils.tables import read_table
 
 logger = get_logger(__name__)
 
@@ -17,15 +23,21 @@ class TrainingPipeline():
     """
     A class for building and running a training pipeline for a machine learning model.
 
-    This class loads data, scales it, applies PCA, prepares datasets for training and testing,
-    trains a model, and saves the model along with the scaler and PCA.
+    This class loads data, drops near-constant and redundant features, scales it, applies PCA,
+    prepares datasets for training and testing, trains a model, and saves the model along with
+    the scaler and PCA.
     """
 
     def __init__(self, file_path, layer_architecture,
                  current_model, current_loss, current_optimizer,
                  batch_size, service, model_path, model_name, scaler_name,
                  pca_name, time_step=10, train_ratio=0.8,
-                 learning_rate=0.01, epochs=100, n_components=30):
+                 learning_rate=0.01, epochs=100, n_components=30,
+                 checkpoint_dir=None, checkpoint_every=10,
+                 warm_start=False, warm_start_epochs=5, replay_ratio=0.0, replay_seed=0,
+                 validation_ratio=0.1, patience=None, eval_chunk_size=65536,
+                 streaming=False, chunk_size=100000, cache_dir=None,
+                 feature_selection=True, variance_threshold=1e-4, correlation_threshold=0.95):
         """
         Initializes the TrainingPipeline with specified parameters.
 
@@ -39,11 +51,25 @@ class TrainingPipeline():
         learning_rate (float, optional): The learning rate for the optimizer. Default is 0.01.
         epochs (int, optional): The number of epochs to train the model. Default is 100.
         n_components (int, optional): The number of principal components for PCA. Default is 30.
+        checkpoint_dir (str, optional): The environment variable holding the local checkpoint folder.
+                                        Checkpointing is disabled when it is not set.
+        checkpoint_every (int, optional): Number of epochs between two checkpoints. Default is 10.
+        warm_start (bool, optional): Fine-tune the deployed model on the rows added since it was trained,
+                                     keeping its scaler and PCA frozen. Default is False.
+        warm_start_epochs (int, optional): The number of epochs of a warm-start run. Default is 5.
+        replay_ratio (float, optional): Size of the sample of already seen (row, next row) pairs replayed during
+                                        a warm-start run, relative to the number of new rows. Default is 0.0.
+        replay_seed (int, optional): The seed of the replay sample. Default is 0.
+        feature_selection (bool, optional): Drop near-constant and redundant features before scaling. Default is True.
+        variance_threshold (float, optional): The largest min-max scaled variance of a dropped near-constant feature.
+                                              Default is 1e-4.
+        correlation_threshold (float, optional): The smallest absolute correlation of a dropped redundant feature
+                                                 with a kept one. Default is 0.95.
 
         Returns:
         None.
         """
-        self.google_drive_handler = GoogleDriveHandler(service)
+        self.google_drive_handler = get_drive_handler(service)
 
         self.file_path = os.getenv(file_path)
         self.features = None
@@ -62,6 +88,30 @@ class TrainingPipeline():
         self.model_name = os.getenv(model_name)
         self.scaler_name = os.getenv(scaler_name)
         self.pca_name = os.getenv(pca_name)
+        self.checkpoint_dir = os.getenv(checkpoint_dir) if checkpoint_dir else None
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = None
+        self.warm_start = warm_start
+        self.warm_start_epochs = warm_start_epochs
+        self.replay_ratio = replay_ratio
+        self.replay_seed = replay_seed
+        self.replay_data = None
+        self.replay_pairs = None
+        self.validation_ratio = validation_ratio
+        self.patience = patience
+        self.eval_chunk_size = eval_chunk_size
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.work_dir = None
+        cache_dir = os.getenv(cache_dir) if cache_dir else None
+        self.cache = PreprocessingCache(cache_dir) if cache_dir else None
+        self.cache_key = None
+        self.feature_selection = feature_selection
+        self.variance_threshold = variance_threshold
+        self.correlation_threshold = correlation_threshold
+        self.training_summary = None
+        self.trained_until = None
+        self.file_id = None
         self.data = None
         self.scaled_data = None
         self.X_train = None
@@ -72,21 +122,24 @@ class TrainingPipeline():
         self.scaler = MinMaxScaler()
         self.pca = PCA(n_components=self.n_components)
 
-    def load_data(self):
+    def load_data(self, columns=None):
         """
-        Loads the data from the CSV file.
+        Loads the data from the Parquet or CSV file.
+
+        Parameters:
+        columns (list, optional): The columns to read. Default is all columns.
 
         Returns:
         pandas.DataFrame: The loaded data.
         """
 
-        file_id = self.google_drive_handler.search_file_by_name(self.file_path)
+        file_id = self.file_id or self.google_drive_handler.search_file_by_name(self.file_path)
 
         if file_id:
             # Dosyayı indir
             downloaded_file = self.google_drive_handler.download_file_from_drive(file_id)
 
-            self.data = pd.read_csv(downloaded_file)
+            self.data = read_table(downloaded_file, columns=columns)
             return self.data
 
     def create_features(self):
@@ -94,6 +147,34 @@ class TrainingPipeline():
         self.target = 'amount'
         self.features = [col for col in self.data.columns if col != self.target]
         self.features.remove('date')
+        self.trained_until = str(pd.to_datetime(self.data['date']).max().date())
+
+    def make_feature_selector(self):
+        """
+        Creates the feature selector of this run.
+
+        Returns:
+        FeatureSelector: The feature selector, or None when feature selection is disabled.
+        """
+        if not self.feature_selection:
+            return None
+        return FeatureSelector(variance_threshold=self.variance_threshold,
+                               correlation_threshold=self.correlation_threshold,
+                               min_features=self.n_components, chunk_size=self.chunk_size)
+
+    def select_features(self):
+        """
+        Drops the near-constant and redundant features.
+
+        Returns:
+        list: The selected features.
+        """
+        selector = self.make_feature_selector()
+        if selector is not None:
+            self.features = selector.fit(self.data[self.features])
+            # The dropped columns are not needed anymore
+            self.data = self.data[self.features + [self.target]]
+        return self.features
 
     def scale_data(self):
         """
@@ -120,6 +201,33 @@ class TrainingPipeline():
         self.scaled_data = self.pca.fit_transform(self.scaled_data)
         return self.scaled_data
 
+    def preprocess_streaming(self):
+        """
+        Downloads the data to local disk and scales and projects it chunk by chunk.
+
+        Replaces `load_data`, `create_features`, `scale_data` and `apply_pca` for training sets
+        too large to hold several in-memory copies of.
+
+        Returns:
+        numpy.memmap: The scaled and PCA-transformed data.
+        """
+        file_id = self.file_id or self.google_drive_handler.search_file_by_name(self.file_path)
+        self.work_dir = tempfile.mkdtemp(prefix='training_')
+        file_path = self.google_drive_handler.download_file_to_disk(
+            file_id, os.path.join(self.work_dir, os.path.basename(self.file_path)))
+
+        preprocessor = StreamingPreprocessor(n_components=self.n_components, chunk_size=self.chunk_size,
+                                             work_dir=self.work_dir, selector=self.make_feature_selector())
+        self.scaled_data = preprocessor.fit_transform(file_path)
+        os.remove(file_path)
+
+        self.target = preprocessor.target
+        self.features = preprocessor.features
+        self.trained_until = preprocessor.trained_until
+        self.scaler = preprocessor.scaler
+        self.pca = preprocessor.pca
+        return self.scaled_data
+
     def prepare_datasets(self):
         """
         Prepares the training and testing datasets from the scaled data.
@@ -129,6 +237,11 @@ class TrainingPipeline():
         """
         processor = DatasetProcessor(time_step=self.time_step, train_ratio=self.train_ratio)
         self.X_train, self.X_test, self.Y_train, self.Y_test = processor.create_train_test_sets(self.scaled_data)
+        if self.replay_pairs is not None:
+            # Replayed pairs go before the new ones, so validation holds out the most recent new rows
+            X_replay, Y_replay = self.replay_pairs
+            self.X_train = np.concatenate([X_replay, self.X_train])
+            self.Y_train = np.concatenate([Y_replay[:, :1], self.Y_train])
         return self.X_train, self.X_test, self.Y_train, self.Y_test
 
     def train_model(self):
@@ -138,11 +251,269 @@ class TrainingPipeline():
         Returns:
         None.
         """
-        trainer = ModelTrainer(learning_rate=self.learning_rate, epochs=self.epochs,
+        warm_model = self.model if self.warm_start else None
+        trainer = ModelTrainer(learning_rate=self.learning_rate,
+                               epochs=self.warm_start_epochs if warm_model is not None else self.epochs,
                                layer_architecture=self.layer_architecture, batch_size=self.batch_size,
                                current_model=self.current_model, current_loss=self.current_loss,
-                               current_optimizer=self.current_optimizer)
-        self.model = trainer.fit(self.X_train, self.Y_train, self.X_test, self.Y_test)
+                               current_optimizer=self.current_optimizer,
+                               validation_ratio=self.validation_ratio, patience=self.patience,
+                               eval_chunk_size=self.eval_chunk_size)
+        self.model = trainer.fit(self.X_train, self.Y_train, self.X_test, self.Y_test,
+                                 checkpoints=self.checkpoints, model=warm_model)
+        self.training_summary = trainer.summary
+        self.model.trained_until = self.trained_until
+        # The features the model was trained on, so inference builds only those
+        self.model.feature_columns = list(self.features)
+
+    def load_deployed_bundle(self):
+        """
+        Loads the currently deployed model, scaler, and PCA from Google Drive.
+
+        Returns:
+        bool: True if the whole bundle was found and the model records the last date it was trained on.
+        """
+        # The bundle and the data file are resolved with one list call
+        self.google_drive_handler.warm_names([self.model_name, self.scaler_name, self.pca_name, self.file_path])
+        file_ids = [self.google_drive_handler.search_file_by_name(name)
+                    for name in (self.model_name, self.scaler_name, self.pca_name)]
+        if not all(file_ids):
+            logger.info("No deployed model bundle found, falling back to a full training run.")
+            return False
+
+        model, scaler, pca = [joblib.load(self.google_drive_handler.download_file_from_drive(file_id))
+                              for file_id in file_ids]
+        if getattr(model, 'trained_until', None) is None:
+            logger.info("Deployed model does not record its training window, falling back to a full training run.")
+            return False
+
+        self.model, self.scaler, self.pca = model, scaler, pca
+        self.features = getattr(self.model, 'feature_columns', None) or list(self.scaler.feature_names_in_)
+        self.target = 'amount'
+        logger.info(f"Deployed model bundle loaded, trained until {self.model.trained_until}.")
+        return True
+
+    def select_delta(self):
+        """
+        Keeps only the rows added after the deployed model's training window, in their original
+        order, plus an optional random replay sample of already seen (row, next row) pairs.
+
+        The replayed pairs are kept apart in `replay_data`, so every pair is a transition that
+        took place and none is formed between an old and a new row.
+
+        Returns:
+        pandas.DataFrame: The new rows, or None if there are none.
+        """
+        dates = pd.to_datetime(self.data['date'])
+        is_new = (dates > pd.Timestamp(self.model.trained_until)).to_numpy()
+        new_rows = np.flatnonzero(is_new)
+        if len(new_rows) == 0:
+            logger.info(f"No rows newer than {self.model.trained_until}, nothing to train on.")
+            return None
+
+        old_rows = np.flatnonzero(~is_new)
+        n_replay = min(int(len(new_rows) * self.replay_ratio), max(len(old_rows) - 1, 0))
+        self.replay_data = None
+        if n_replay:
+            # A pair starts at any old row but the last and ends at the old row right after it
+            rng = np.random.default_rng(self.replay_seed)
+            starts = np.sort(rng.choice(len(old_rows) - 1, size=n_replay, replace=False))
+            self.replay_data = (self.data.iloc[old_rows[starts]], self.data.iloc[old_rows[starts + 1]])
+
+        self.trained_until = str(dates.iloc[new_rows].max().date())
+        self.data = self.data.iloc[new_rows]
+        logger.info(f"Warm start on {len(new_rows)} new rows and {n_replay} replayed pairs.")
+        return self.data
+
+    def has_enough_rows(self):
+        """
+        Checks whether the new rows give at least one training and one testing pair.
+
+        Returns:
+        bool: True if they do.
+        """
+        n_pairs = len(self.data) - 1
+        train_size = int(n_pairs * self.train_ratio)
+        if train_size < 1 or n_pairs - train_size < 1:
+            logger.info(f"Only {len(self.data)} new rows, too few for a training and a testing pair; skipping.")
+            return False
+        return True
+
+    def transform_frame(self, frame):
+        scaled = self.scaler.transform(frame[self.features])
+        scaled[np.isnan(scaled)] = 0
+        return self.pca.transform(scaled)
+
+    def transform_data(self):
+        """
+        Scales and projects the data, and the replayed pairs, with the frozen scaler and PCA of the deployed model.
+
+        Returns:
+        numpy.ndarray: The transformed data.
+        """
+        self.scaled_data = self.transform_frame(self.data)
+        if self.replay_data is not None:
+            self.replay_pairs = tuple(self.transform_frame(frame) for frame in self.replay_data)
+        return self.scaled_data
+
+    def run_warm_start(self):
+        """
+        Fine-tunes the deployed model on the new rows only.
+
+        Returns:
+        bool: True if the warm-start run took place, False if a full training run is needed instead.
+        """
+        if not self.load_deployed_bundle():
+            return False
+
+        # The frozen scaler fixes the features, so only those are read
+        self.load_data(columns=self.features + [self.target, 'date'])
+        if self.select_delta() is None or not self.has_enough_rows():
+            return True
+        self.transform_data()
+        self.prepare_datasets()
+        self.train_model()
+        self.save_model_and_scaler()
+        return True
+
+    def setup_checkpoints(self):
+        """
+        Creates the checkpoint manager for this run.
+
+        The checkpoints are tagged with the source file and every hyperparameter that changes
+        the trained weights, so only an identical run resumes from them. The number of epochs
+        is left out on purpose: a longer run may continue from a shorter one.
+
+        Returns:
+        CheckpointManager: The checkpoint manager, or None when checkpointing is disabled.
+        """
+        if self.checkpoint_dir is None or self.warm_start:
+            return None
+
+        self.file_id = self.google_drive_handler.search_file_by_name(self.file_path)
+        fingerprint = {
+            'file_id': self.file_id,
+            'layer_architecture': [
+                {'output_size': layer['output_size'],
+                 'activation': getattr(layer.get('activation'), '__name__', None)}
+                for layer in self.layer_architecture
+            ],
+            'loss': type(self.current_loss).__name__,
+            'optimizer': getattr(self.current_optimizer, '__name__', str(self.current_optimizer)),
+            'batch_size': self.batch_size,
+            'time_step': self.time_step,
+            'train_ratio': self.train_ratio,
+            'learning_rate': self.learning_rate,
+            'n_components': self.n_components,
+            'validation_ratio': self.validation_ratio,
+            'patience': self.patience,
+            'streaming': self.streaming,
+            'feature_selection': self.selection_settings(),
+        }
+        self.checkpoints = CheckpointManager(self.checkpoint_dir, every=self.checkpoint_every,
+                                             fingerprint=fingerprint)
+        return self.checkpoints
+
+    def selection_settings(self):
+        """
+        Returns the settings of the feature selection, or None when it is disabled.
+
+        Returns:
+        dict: The thresholds and the minimum number of features.
+        """
+        if not self.feature_selection:
+            return None
+        return {'variance_threshold': self.variance_threshold, 'correlation_threshold': self.correlation_threshold,
+                'min_features': self.n_components}
+
+    def preprocessing_cache_key(self):
+        """
+        Builds the key of the preprocessing cache from the source file's content hash and
+        the settings that change the transformed matrix.
+
+        Returns:
+        str: The cache key.
+        """
+        self.file_id = self.file_id or self.google_drive_handler.search_file_by_name(self.file_path)
+        metadata = self.google_drive_handler.get_file_metadata(self.file_id)
+        source_hash = metadata.get('md5Checksum') or f"{self.file_id}@{metadata.get('modifiedTime')}"
+        return PreprocessingCache.make_key(source_hash, {'target': 'amount', 'exclude': ['date']},
+                                           self.n_components, streaming=self.streaming,
+                                           feature_selection=self.selection_settings())
+
+    def load_cached_preprocessing(self):
+        """
+        Restores the scaled and PCA-transformed data, the scaler, and the PCA from the local cache.
+
+        Returns:
+        bool: True on a cache hit, in which case loading, scaling and PCA can be skipped.
+        """
+        if self.cache is None:
+            return False
+
+        self.cache_key = self.preprocessing_cache_key()
+        entry = self.cache.load(self.cache_key)
+        if entry is None:
+            return False
+
+        self.scaled_data = entry['scaled_data']
+        self.scaler = entry['scaler']
+        self.pca = entry['pca']
+        self.features = entry['features']
+        self.trained_until = entry['trained_until']
+        self.target = 'amount'
+        return True
+
+    def store_cached_preprocessing(self):
+        """
+        Stores the preprocessing results in the local cache.
+
+        Returns:
+        None.
+        """
+        if self.cache is not None:
+            self.cache.store(self.cache_key, self.scaled_data, self.scaler, self.pca,
+                             self.features, self.trained_until)
+
+    def save_preprocessing(self):
+        """
+        Stores the scaled and PCA-transformed data, the fitted scaler and PCA next to the
+        checkpoints, so a resumed run does not have to download and preprocess the data again.
+
+        Returns:
+        None.
+        """
+        # The preprocessing cache already makes a resumed run skip the preprocessing
+        if self.checkpoints is None or self.cache is not None:
+            return
+
+        np.save(self.checkpoints.artifact_path('scaled_data.npy'), self.scaled_data)
+        joblib.dump(self.scaler, self.checkpoints.artifact_path('scaler.joblib'))
+        joblib.dump(self.pca, self.checkpoints.artifact_path('pca.joblib'))
+        # The feature list is written last and marks the artifacts as complete
+        with open(self.checkpoints.artifact_path('features.json'), 'w') as file:
+            json.dump({'features': self.features, 'trained_until': self.trained_until}, file)
+
+    def restore_preprocessing(self):
+        """
+        Restores the preprocessing results of an interrupted run.
+
+        Returns:
+        bool: True if the data was restored and loading, scaling and PCA can be skipped.
+        """
+        if self.checkpoints is None or not os.path.exists(self.checkpoints.artifact_path('features.json')):
+            return False
+
+        self.scaled_data = np.load(self.checkpoints.artifact_path('scaled_data.npy'), mmap_mode='r')
+        self.scaler = joblib.load(self.checkpoints.artifact_path('scaler.joblib'))
+        self.pca = joblib.load(self.checkpoints.artifact_path('pca.joblib'))
+        with open(self.checkpoints.artifact_path('features.json')) as file:
+            run_info = json.load(file)
+        self.features = run_info['features']
+        self.trained_until = run_info['trained_until']
+        self.target = 'amount'
+        logger.info("Preprocessed data restored from checkpoint, skipping download and preprocessing.")
+        return True
 
     def save_model_and_scaler(self):
         """
@@ -185,10 +556,30 @@ class TrainingPipeline():
         Returns:
         None.
         """
-        self.load_data()
-        self.create_features()
-        self.scale_data()
-        self.apply_pca()
-        self.prepare_datasets()
-        self.train_model()
-        self.save_model_and_scaler()
+        if self.warm_start and self.run_warm_start():
+            return
+
+        self.setup_checkpoints()
+        try:
+            if not self.restore_preprocessing() and not self.load_cached_preprocessing():
+                if self.streaming:
+                    self.preprocess_streaming()
+                else:
+                    self.load_data()
+                    self.create_features()
+                    self.select_features()
+                    self.scale_data()
+                    self.apply_pca()
+                self.store_cached_preprocessing()
+                self.save_preprocessing()
+            self.prepare_datasets()
+            self.train_model()
+            self.save_model_and_scaler()
+
+            if self.checkpoints is not None:
+                self.checkpoints.clear()
+        finally:
+            # The downloaded file and the memory-mapped matrices are removed even if the run fails
+            if self.work_dir is not None:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+                self.work_dir = None
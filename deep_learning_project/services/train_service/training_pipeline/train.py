@@ -35,6 +35,9 @@ if __name__ == '__main__':
         learning_rate=0.1,
         epochs=100,
         n_components=10,
+        checkpoint_dir='CHECKPOINT_DIR',
+        checkpoint_every=10,
+        cache_dir='PREPROCESSING_CACHE_DIR',
     )
 
     # Run the training pipeline
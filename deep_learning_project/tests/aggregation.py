@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import GroupAggregator
+
+df = pd.DataFrame({
+    'season': [1, 1, 2, 2, 3, 3, 1, 4],
+    'country_id': [5.0, np.nan, 5.0, 7.0, 7.0, 5.0, 5.0, 7.0],
+    'main_category': ['a', 'b', 'a', 'b', 'a', 'b', 'a', 'b'],
+    'amount': [1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0, 8.0],
+})
+
+
+def test_sum_and_mean_match_groupby_transform():
+    aggregator = GroupAggregator(df)
+
+    for keys in (['season'], ['country_id'], ['main_category'], ['season', 'country_id'],
+                 ['country_id', 'main_category']):
+        sums, means = aggregator.sum_and_mean(keys, 'amount')
+
+        np.testing.assert_allclose(sums, df.groupby(keys)['amount'].transform('sum'))
+        np.testing.assert_allclose(means, df.groupby(keys)['amount'].transform('mean'))
+
+
+def test_integer_sums_keep_their_dtype():
+    integers = pd.DataFrame({'month': [1, 2, 1, 3], 'amount': [1, 2, 3, 4]})
+
+    sums, _ = GroupAggregator(integers).sum_and_mean(['month'], 'amount')
+
+    pd.testing.assert_series_equal(pd.Series(sums), integers.groupby('month')['amount'].transform('sum'),
+                                   check_names=False)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from utils.networks.dlmodel import DPModel, LossMSE, Sigmoid, CheckpointManager
+from utils.networks.dlmodel.optimizers import OptimizerAdam
+from services.train_service.training_pipeline.data import ModelTrainer
+
+layer_architecture = [
+    {'output_size': 8, 'activation': Sigmoid},
+    {'output_size': 1, 'activation': None}
+]
+
+X = np.random.RandomState(0).rand(300, 5)
+Y = X[:, :1] * 2
+
+
+def fit(epochs, checkpoints=None):
+    np.random.seed(1)
+    trainer = ModelTrainer(learning_rate=0.01, epochs=epochs, layer_architecture=layer_architecture,
+                           batch_size=64, current_model=DPModel(), current_loss=LossMSE(),
+                           current_optimizer=OptimizerAdam)
+    return trainer.fit(X, Y, X, Y, checkpoints=checkpoints)
+
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    reference = fit(epochs=6)
+
+    fit(epochs=3, checkpoints=CheckpointManager(str(tmp_path), every=1, fingerprint={'run': 1}))
+    resumed = fit(epochs=6, checkpoints=CheckpointManager(str(tmp_path), every=1, fingerprint={'run': 1}))
+
+    for expected, actual in zip(reference.layers, resumed.layers):
+        assert np.array_equal(expected.weights, actual.weights)
+        assert np.array_equal(expected.biases, actual.biases)
+
+
+def test_changed_configuration_discards_checkpoints(tmp_path):
+    fit(epochs=2, checkpoints=CheckpointManager(str(tmp_path), every=1, fingerprint={'run': 1}))
+
+    checkpoints = CheckpointManager(str(tmp_path), every=1, fingerprint={'run': 2})
+    assert checkpoints.restore(fit(epochs=1)) == 0
@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.merge.merge import DataPreparer
+
+rng = np.random.default_rng(0)
+days = pd.date_range('2013-01-01', periods=60).strftime('%d.%m.%Y').to_numpy()
+SOURCES = {
+    'transaction': pd.DataFrame({'date': days[np.sort(rng.integers(0, 60, 2000))],
+                                 'shop': rng.integers(99, 112, 2000), 'item': rng.integers(100000, 100200, 2000),
+                                 'price': rng.gamma(2, 400, 2000).round(2),
+                                 'amount': rng.integers(1, 5, 2000).astype(float)}),
+    'category': pd.DataFrame({'item_category_name': [f'Main{c % 7} - Sub{c}' for c in range(20)],
+                              'item_category_id': np.arange(20)}),
+    'item': pd.DataFrame({'item_name': [f'item {i}' for i in range(190)], 'item_id': 100000 + np.arange(190),
+                          'item_category_id': rng.integers(0, 22, 190)}),
+    'shop': pd.DataFrame({'shop_name': [f'C{s % 4}, shop {s}' if s % 3 else f'C{s % 4} shop {s}' for s in range(99, 110)],
+                          'shop_id': np.arange(99, 110)}),
+}
+FILES = {name: source.to_csv().encode() for name, source in SOURCES.items()}
+
+
+class InMemoryDrive:
+    def download_file_from_drive(self, file_id):
+        return io.BytesIO(FILES[file_id])
+
+
+def load(monkeypatch, max_workers):
+    for name in FILES:
+        monkeypatch.setenv(f'{name.upper()}_FILE_ID', name)
+    # Vocabularies kept in memory, and peak tracking off since it forces one worker
+    monkeypatch.delenv('ENCODER_DIR', raising=False)
+    monkeypatch.delenv('TRACK_MEMORY_PEAKS', raising=False)
+    monkeypatch.setattr(DataPreparer, 'MAX_WORKERS', max_workers)
+    preparer = DataPreparer('SERVICE_ACCOUNT_FILE', 'TRANSACTION_FILE_ID', 'CATEGORY_FILE_ID', 'ITEM_FILE_ID',
+                            'SHOP_FILE_ID', 'LOAD_DATA', 'DATA_NAME')
+    preparer.google_drive_handler = InMemoryDrive()
+    return preparer.prepare_data(), preparer.encoders.vocabularies
+
+
+def test_concurrent_load_matches_a_sequential_load(monkeypatch):
+    sequential, sequential_vocabularies = load(monkeypatch, max_workers=1)
+
+    concurrent, concurrent_vocabularies = load(monkeypatch, max_workers=4)
+
+    pd.testing.assert_frame_equal(concurrent, sequential)
+    assert sequential_vocabularies and sequential_vocabularies.keys() == concurrent_vocabularies.keys()
+    for name, vocabulary in sequential_vocabularies.items():
+        pd.testing.assert_index_equal(concurrent_vocabularies[name], vocabulary)
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import CalendarTable
+
+dates = pd.Series(['31.12.2014', '01.01.2015', np.nan, '31.12.2014', '15.06.2015'])
+
+
+def test_fields_match_per_row_accessors():
+    calendar = CalendarTable(dates)
+    parsed = pd.to_datetime(dates, format='%d.%m.%Y')
+
+    pd.testing.assert_series_equal(calendar.date_column(), parsed.rename('date'), check_names=False)
+    expected = CalendarTable.derive(parsed)
+    for field in CalendarTable.FIELDS:
+        pd.testing.assert_series_equal(calendar.field(field), expected[field])
@@ -0,0 +1,93 @@
+import json
+import mmap
+import os
+import re
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+from googleapiclient.discovery import build
+
+from utils.db import GoogleDriveHandler, DriveFileCache
+
+
+class FakeDriveHttp:
+    """
+    Serves Drive file listings, metadata and content from dicts and records the requests.
+    """
+
+    def __init__(self, files, names=None):
+        self.files = files
+        self.names = names or {}
+        self.requests = []
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        url = urlparse(uri)
+        file_id = url.path.rsplit('/', 1)[-1]
+        query = parse_qs(url.query)
+        if file_id == 'files':
+            names = re.findall(r"name='([^']*)'", query['q'][0])
+            self.requests.append(('list', tuple(names)))
+            listed = [{'id': self.names[name], 'name': name, 'md5Checksum': self.files[self.names[name]][1]}
+                      for name in names if name in self.names]
+            return httplib2.Response({'status': '200'}), json.dumps({'files': listed}).encode()
+        media = query.get('alt') == ['media']
+        self.requests.append(('media' if media else 'metadata', file_id))
+        content, md5 = self.files[file_id]
+        if media:
+            return httplib2.Response({'status': '200', 'content-length': str(len(content))}), content
+        return httplib2.Response({'status': '200'}), json.dumps({'id': file_id, 'md5Checksum': md5}).encode()
+
+
+def make_handler(monkeypatch, tmp_path, files, names=None, **kwargs):
+    monkeypatch.setenv('TEST_DRIVE_CACHE_DIR', str(tmp_path / 'cache'))
+    http = FakeDriveHttp(files, names)
+    client = build('drive', 'v3', http=http, static_discovery=True)
+    return GoogleDriveHandler('SERVICE_ACCOUNT_FILE', client=client, http=http, cache_dir='TEST_DRIVE_CACHE_DIR', **kwargs), http
+
+
+def test_second_download_is_served_from_cache(monkeypatch, tmp_path):
+    handler, http = make_handler(monkeypatch, tmp_path, {'a': (b'shop,item\n1,2\n', 'v1')})
+
+    assert handler.download_file_from_drive('a').read() == b'shop,item\n1,2\n'
+    cached = handler.download_file_from_drive('a')
+
+    assert isinstance(cached, mmap.mmap)
+    assert cached.read() == b'shop,item\n1,2\n'
+    assert http.requests == [('metadata', 'a'), ('media', 'a'), ('metadata', 'a')]
+    assert (handler.cache.hits, handler.cache.misses) == (1, 1)
+
+
+def test_changed_file_is_downloaded_again(monkeypatch, tmp_path):
+    files = {'a': (b'old', 'v1')}
+    handler, http = make_handler(monkeypatch, tmp_path, files)
+    handler.download_file_from_drive('a')
+
+    files['a'] = (b'new', 'v2')
+
+    assert handler.download_file_from_drive('a').read() == b'new'
+    assert http.requests.count(('media', 'a')) == 2
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch, tmp_path):
+    files = {'a': (b'a' * 10, 'v1'), 'b': (b'b' * 10, 'v1'), 'c': (b'c' * 10, 'v1')}
+    handler, http = make_handler(monkeypatch, tmp_path, files, cache_max_bytes=25)
+    handler.download_file_from_drive('a')
+    handler.download_file_from_drive('b')
+    os.utime(os.path.join(handler.cache.directory, DriveFileCache.make_key('a', {'md5Checksum': 'v1'})), (0, 0))
+    handler.download_file_from_drive('b')
+
+    handler.download_file_from_drive('c')
+
+    cached = set(os.listdir(handler.cache.directory))
+    assert cached == {DriveFileCache.make_key(file_id, {'md5Checksum': 'v1'}) for file_id in ('b', 'c')}
+
+
+def test_download_to_disk_uses_cache(monkeypatch, tmp_path):
+    handler, http = make_handler(monkeypatch, tmp_path, {'a': (b'content', 'v1')})
+    handler.download_file_from_drive('a')
+
+    path = handler.download_file_to_disk('a', str(tmp_path / 'local.csv'))
+
+    with open(path, 'rb') as file:
+        assert file.read() == b'content'
+    assert http.requests.count(('media', 'a')) == 1
@@ -0,0 +1,38 @@
+import threading
+
+from utils.db import uploader, get_drive_handler
+
+
+def test_handler_is_shared_and_built_lazily(monkeypatch):
+    calls = []
+    monkeypatch.setattr(uploader.service_account.Credentials, 'from_service_account_file',
+                        lambda path, scopes: calls.append('credentials') or object())
+    monkeypatch.setattr(uploader, 'build', lambda *args, **kwargs: calls.append('build') or object())
+    monkeypatch.setattr(uploader, '_handlers', {})
+
+    handler = get_drive_handler('TEST_SERVICE_ACCOUNT_FILE')
+
+    assert get_drive_handler('TEST_SERVICE_ACCOUNT_FILE') is handler
+    assert calls == []
+
+    threads = [threading.Thread(target=lambda: handler.service) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['credentials', 'build']
+
+
+def test_threads_get_their_own_persistent_http(monkeypatch):
+    monkeypatch.setattr(uploader.service_account.Credentials, 'from_service_account_file', lambda path, scopes: object())
+    monkeypatch.setattr(uploader, 'build', lambda *args, **kwargs: object())
+    monkeypatch.setattr(uploader, 'AuthorizedHttp', lambda credentials, http: object())
+    handler = uploader.GoogleDriveHandler('TEST_SERVICE_ACCOUNT_FILE')
+    other = []
+    thread = threading.Thread(target=lambda: other.append(handler.thread_http()))
+    thread.start()
+    thread.join()
+
+    assert handler.thread_http() is handler.thread_http()
+    assert other[0] is not handler.thread_http()
@@ -0,0 +1,39 @@
+from utils.db import DriveNameIndex
+from tests.drive_cache import make_handler
+
+files = {'id-model': (b'model', 'm1'), 'id-scaler': (b'scaler', 's1'), 'id-data': (b'data', 'd1')}
+names = {'model.joblib': 'id-model', 'scaler.joblib': 'id-scaler', 'last.csv': 'id-data'}
+
+
+def test_warm_names_resolves_all_names_with_one_call(monkeypatch, tmp_path):
+    handler, http = make_handler(monkeypatch, tmp_path, files, names)
+
+    resolved = handler.warm_names(['model.joblib', 'scaler.joblib', 'pca.joblib'])
+    ids = [handler.search_file_by_name(name) for name in ('model.joblib', 'scaler.joblib', 'model.joblib')]
+
+    assert resolved == {'model.joblib': 'id-model', 'scaler.joblib': 'id-scaler', 'pca.joblib': None}
+    assert ids == ['id-model', 'id-scaler', 'id-model']
+    assert http.requests == [('list', ('model.joblib', 'scaler.joblib', 'pca.joblib'))]
+
+
+def test_listed_version_keys_the_download_cache(monkeypatch, tmp_path):
+    handler, http = make_handler(monkeypatch, tmp_path, files, names)
+    handler.download_file_from_drive(handler.search_file_by_name('last.csv'))
+
+    assert handler.download_file_from_drive(handler.search_file_by_name('last.csv')).read() == b'data'
+    assert http.requests == [('list', ('last.csv',)), ('media', 'id-data')]
+
+
+def test_entries_expire_and_can_be_invalidated():
+    now = [0.0]
+    index = DriveNameIndex(ttl=10, clock=lambda: now[0])
+    index.put({'id': 'a', 'name': 'model.joblib'})
+    index.put({'id': 'b', 'name': 'scaler.joblib'})
+
+    index.invalidate('scaler.joblib')
+    assert index.get('model.joblib')['id'] == 'a'
+    assert index.get('scaler.joblib') is None
+
+    now[0] = 10.0
+    assert index.get('model.joblib') is None
+    assert index.get_by_id('a') is None
@@ -0,0 +1,82 @@
+import numpy as np
+
+from utils.networks.dlmodel import DPModel, LossMSE, Sigmoid
+from utils.networks.dlmodel.optimizers import OptimizerAdam
+from services.train_service.training_pipeline.data import ModelTrainer
+
+# The validation loss improves for three epochs, then plateaus above its best
+VALIDATION_LOSSES = [5.0, 3.0, 2.0, 2.5, 2.4, 2.6, 2.7, 2.8, 2.9, 3.0]
+
+
+def make_trainer(patience, epochs=10):
+    np.random.seed(0)
+    return ModelTrainer(learning_rate=0.01, epochs=epochs,
+                        layer_architecture=[{'output_size': 4, 'activation': Sigmoid}, {'output_size': 1}],
+                        batch_size=16, current_model=DPModel(), current_loss=LossMSE(),
+                        current_optimizer=OptimizerAdam, patience=patience)
+
+
+def make_data():
+    rng = np.random.RandomState(1)
+    X, Y = rng.rand(100, 3), rng.rand(100, 1)
+    return X[:80], Y[:80], X[80:], Y[80:]
+
+
+def plateauing_loss(trainer, states, validation_sizes):
+    def evaluate_loss(model, X, Y):
+        validation_sizes.append(len(X))
+        states.append(model.get_state())
+        return VALIDATION_LOSSES[len(states) - 1]
+    # EarlyStopping calls it once per epoch on the validation holdout
+    trainer.evaluate_loss = evaluate_loss
+
+
+def test_training_stops_after_patience_and_restores_best_weights():
+    trainer = make_trainer(patience=3)
+    states, validation_sizes = [], []
+    plateauing_loss(trainer, states, validation_sizes)
+
+    model = trainer.fit(*make_data())
+
+    # Best at epoch 3, then three epochs without improvement
+    assert len(states) == 6
+    assert validation_sizes == [8] * 6
+    for name, values in model.get_state().items():
+        np.testing.assert_array_equal(values, states[2][name])
+    assert trainer.summary['epochs_run'] == 6
+    assert trainer.summary['best_epoch'] == 3
+    assert trainer.summary['epochs_saved'] == 4
+
+
+def test_no_patience_trains_all_epochs_without_holdout(monkeypatch):
+    trainer = make_trainer(patience=None, epochs=4)
+    trained = []
+    train = DPModel.train
+
+    def record_train(model, X, y, **kwargs):
+        trained.append((len(X), kwargs['epochs'], kwargs['callbacks']))
+        return train(model, X, y, **kwargs)
+
+    monkeypatch.setattr(DPModel, 'train', record_train)
+    trainer.fit(*make_data())
+
+    assert trained == [(80, 4, [])]
+    assert trainer.summary is None
+
+
+def test_window_too_small_to_split_trains_without_early_stopping(monkeypatch):
+    trainer = make_trainer(patience=3, epochs=4)
+    trained = []
+    train = DPModel.train
+
+    def record_train(model, X, y, **kwargs):
+        trained.append((len(X), kwargs['callbacks']))
+        return train(model, X, y, **kwargs)
+
+    monkeypatch.setattr(DPModel, 'train', record_train)
+    X_train, Y_train, X_test, Y_test = make_data()
+    # Holding out a tenth of one row leaves no row to fit on
+    trainer.fit(X_train[:1], Y_train[:1], X_test, Y_test)
+
+    assert trained == [(1, [])]
+    assert trainer.summary is None
@@ -0,0 +1,38 @@
+import re
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from services.data_services.preprocessing.processing import CategoryEncoderRegistry, DataPreprocessing
+
+values = pd.Series(['b', 'a', 'c', 'a', 'b'])
+
+
+def test_first_vocabulary_matches_label_encoder():
+    codes = CategoryEncoderRegistry().encode('column', values)
+
+    np.testing.assert_array_equal(codes, LabelEncoder().fit_transform(values))
+
+
+def test_stored_codes_are_stable_and_unseen_values_are_appended(tmp_path):
+    registry = CategoryEncoderRegistry(str(tmp_path))
+    registry.encode('column', values)
+    registry.save()
+
+    reloaded = CategoryEncoderRegistry(str(tmp_path))
+    codes = reloaded.encode('column', pd.Series(['d', 'c', 'a']).astype('category'))
+
+    np.testing.assert_array_equal(codes, [3, 2, 0])
+    assert list(reloaded.decode('column', codes)) == ['d', 'c', 'a']
+
+
+def test_country_is_the_text_before_the_first_space_or_comma(tmp_path):
+    names = ['Moscow shop', 'Kazan, Mega', 'Online', ' leading']
+    path = tmp_path / 'shops.csv'
+    pd.DataFrame({'shop_name': names, 'shop_id': range(4)}).to_csv(path, index=False)
+
+    preprocessor = DataPreprocessing(str(path), 'shop')
+    preprocessor.process_shop_name()
+
+    assert list(preprocessor.df['country_id']) == [re.split(r'[ ,]', name)[0] for name in names]
@@ -0,0 +1,50 @@
+import numpy as np
+from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error, r2_score
+
+from utils.networks.dlmodel import DPModel, Sigmoid
+from services.train_service.training_pipeline.data import ModelEvaluator
+
+
+def build_model():
+    np.random.seed(0)
+    model = DPModel()
+    model.add_layer(input_size=4, output_size=8, activation=Sigmoid)
+    model.add_layer(input_size=8, output_size=1)
+    return model
+
+
+def test_streaming_metrics_match_full_pass():
+    X = np.random.RandomState(1).rand(1000, 4)
+    Y = np.random.RandomState(2).rand(1000, 1) + 5
+    model = build_model()
+    predictions = model.predict(X)
+
+    metrics = ModelEvaluator(chunk_size=128).evaluate(model, X, Y)
+
+    assert np.isclose(metrics['rmse'], np.sqrt(np.mean((predictions - Y) ** 2)))
+    assert np.isclose(metrics['mae'], mean_absolute_error(Y, predictions))
+    assert np.isclose(metrics['mape'], mean_absolute_percentage_error(Y, predictions) * 100)
+    assert np.isclose(metrics['r2'], r2_score(Y, predictions))
+
+
+def test_predict_fills_preallocated_output():
+    X = np.random.RandomState(1).rand(1000, 4)
+    model = build_model()
+    out = np.empty((1000, 1))
+
+    result = ModelEvaluator(chunk_size=300).predict(model, X, out=out)
+
+    assert result is out
+    assert np.allclose(out, model.predict(X))
+
+
+def test_evaluate_many_matches_sequential_evaluation():
+    X = np.random.RandomState(1).rand(1000, 4)
+    Y = np.random.RandomState(2).rand(1000, 1)
+    model = build_model()
+    evaluator = ModelEvaluator(chunk_size=100)
+
+    results = evaluator.evaluate_many(model, {'train': (X[:800], Y[:800]), 'test': (X[800:], Y[800:])})
+
+    assert results['train'] == evaluator.evaluate(model, X[:800], Y[:800])
+    assert results['test'] == evaluator.evaluate(model, X[800:], Y[800:])
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from benchmarks.synthetic import make_transactions
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer, IncrementalFeatureEngineer, FeatureStateStore
+from utils.tables import append_parquet
+from utils.tables.parquet import is_parquet
+
+data = make_transactions(5000, n_shops=3, n_items=20, n_days=60, seed=1)
+dates = pd.to_datetime(data['date'], format='%d.%m.%Y')
+watermark = dates.sort_values().iloc[4000]
+
+
+def test_new_rows_match_a_full_recompute():
+    full = FeatureEngineer(data.copy()).engineer_features()[(dates > watermark).to_numpy()].reset_index(drop=True)
+
+    first = IncrementalFeatureEngineer(data[(dates <= watermark).to_numpy()].copy())
+    first.engineer_features()
+    state = first.get_state()
+    second = IncrementalFeatureEngineer(data[(dates > watermark).to_numpy()].copy(), state)
+    new_rows = second.engineer_features().reset_index(drop=True)
+
+    assert state['watermark'] == watermark
+    assert list(new_rows.columns) == list(full.columns)
+    pd.testing.assert_frame_equal(new_rows, full, check_dtype=False)
+
+
+def test_state_store_appends_typed_parquet_and_drops_rows_of_unsaved_runs(tmp_path):
+    rows = FeatureEngineer(data.copy()).engineer_features()
+    store = FeatureStateStore(str(tmp_path), 'features.parquet')
+    store.append(rows.iloc[:3000], {'watermark': watermark})
+    store.append(rows.iloc[3000:4000], {'watermark': watermark})
+    # A run that appended its rows but did not get to save its state
+    append_parquet(store.output_path, rows.iloc[4000:])
+
+    state = store.load()
+
+    output = pd.read_parquet(store.output_path)
+    assert is_parquet(store.output_path) and state['output_rows'] == 4000
+    pd.testing.assert_frame_equal(output, rows.iloc[:4000].reset_index(drop=True))
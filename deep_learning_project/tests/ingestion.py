@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+
+from services.data_services.preprocessing.processing import TransactionDataPreprocessor
+
+csv = (b',date,shop,item,price,amount\n'
+       b'0,02.01.2013,100,100001,1.5,1\n'
+       b'1,01.01.2013,,100002,2.5,1\n'
+       b'2,03.01.2013,101,100003,,2\n'
+       b'3,01.01.2013,102,100004,4.0,3\n')
+
+
+def test_chunked_ingestion_matches_a_whole_file_read():
+    whole = TransactionDataPreprocessor(io.BytesIO(csv), 'transaction').preprocess_data()
+    chunked = TransactionDataPreprocessor(io.BytesIO(csv), 'transaction', chunksize=2).preprocess_data()
+
+    assert list(whole.columns) == ['date', 'shop', 'item', 'price', 'amount', 'total_price']
+    assert whole['shop'].dtype == 'int16' and whole['price'].dtype == 'float32'
+    pd.testing.assert_frame_equal(chunked, whole, check_categorical=False)
+
+
+def test_daily_aggregation_matches_groupby():
+    daily_csv = (b'date,shop,item,price,amount\n'
+                 b'01.01.2013,1,5,2.0,1\n'
+                 b'02.01.2013,1,5,3.0,2\n'
+                 b'01.01.2013,1,5,4.0,3\n'
+                 b'01.01.2013,2,5,5.0,1\n'
+                 b'02.01.2013,1,5,1.0,-1\n')
+    rows = TransactionDataPreprocessor(io.BytesIO(daily_csv), 'transaction').preprocess_data()
+    expected = rows.groupby(['date', 'shop', 'item'], sort=False, observed=True).agg(
+        price=('price', 'mean'), amount=('amount', 'sum'), total_price=('total_price', 'sum'),
+        transaction_count=('amount', 'size')).reset_index()
+
+    daily = TransactionDataPreprocessor(io.BytesIO(daily_csv), 'transaction', aggregate_daily=True).preprocess_data()
+
+    pd.testing.assert_frame_equal(daily, expected, check_dtype=False, check_categorical=False)
+    assert daily['transaction_count'].tolist() == [2, 2, 1]
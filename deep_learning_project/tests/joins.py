@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.merge.joins import left_join
+
+transactions = pd.DataFrame({'item': np.array([3, 1, 7, 1, 2], dtype=np.int32), 'amount': [1.0, 2.0, 3.0, 4.0, 5.0]},
+                            index=[4, 8, 15, 16, 23])
+items = pd.DataFrame({'item': np.array([1, 2, 3], dtype=np.int32),
+                      'item_category_id': np.array([10, 20, 30], dtype=np.int16),
+                      'weight': [0.5, 1.5, 2.5]})
+
+
+def test_lookup_join_matches_merge():
+    expected = transactions.merge(items, on='item', how='left')
+
+    joined = left_join(transactions.copy(), items, on='item')
+
+    pd.testing.assert_frame_equal(joined, expected, check_dtype=False)
+    assert joined['item_category_id'].dtype == 'Int16'
+
+
+def test_duplicate_dimension_keys_fall_back_to_merge():
+    duplicated = pd.concat([items, items.iloc[:1]])
+
+    joined = left_join(transactions.copy(), duplicated, on='item')
+
+    pd.testing.assert_frame_equal(joined, transactions.merge(duplicated, on='item', how='left'))
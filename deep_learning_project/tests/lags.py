@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import LagEngine
+
+rng = np.random.default_rng(0)
+df = pd.DataFrame({
+    'shop': rng.integers(0, 3, 500),
+    'item': rng.integers(0, 10, 500),
+    'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 60, 500), unit='D'),
+    'amount': rng.integers(1, 10, 500).astype(float),
+})
+series = df.sort_values(['shop', 'item', 'date'], kind='stable').groupby(['shop', 'item'])['amount']
+
+
+def test_lags_and_pct_changes_stay_within_each_series():
+    engine = LagEngine.from_frame(df)
+    amount = df['amount'].to_numpy()
+
+    for periods in (1, 7):
+        lagged = series.shift(periods).reindex(df.index)
+        np.testing.assert_allclose(engine.lag('amount', amount, periods), lagged)
+        np.testing.assert_allclose(engine.pct_change('amount', amount, periods),
+                                   df['amount'] / lagged - 1)
+
+
+def test_rolling_means_match_grouped_rolling():
+    engine = LagEngine.from_frame(df)
+
+    for window in (3, 7):
+        expected = series.rolling(window).mean().reset_index(level=[0, 1], drop=True).reindex(df.index)
+        np.testing.assert_allclose(engine.rolling_mean('amount', df['amount'].to_numpy(), window), expected)
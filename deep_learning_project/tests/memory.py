@@ -0,0 +1,55 @@
+import io
+import tracemalloc
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer
+from services.data_services.preprocessing.processing import ItemDataPreprocessing
+from utils.memory import MemoryReport
+
+n_items = 200000
+items_csv = pd.DataFrame({
+    'item_name': [f'item number {i}' for i in range(n_items)],
+    'item_id': np.arange(n_items),
+    'item_category_id': np.arange(n_items) % 80,
+}).to_csv(index=False).encode()
+
+
+def test_item_names_are_never_loaded_and_renames_do_not_copy():
+    with closing(MemoryReport('items', track_peaks=True)) as report:
+        df = ItemDataPreprocessing(io.BytesIO(items_csv), 'item', memory_report=report).preprocess_data()
+
+    assert list(df.columns) == ['item', 'item_category_id']
+    assert report.peak('item.read') < 10 * df.memory_usage(deep=True).sum()
+    assert report.peak('item.rename_columns') < 64 * 1024
+
+
+def test_rounding_allocates_one_column_at_a_time():
+    # The report traces the columns from their allocation on, so the frees of replaced columns count
+    with closing(MemoryReport('features', track_peaks=True)) as report:
+        rng = np.random.default_rng(0)
+        engineer = FeatureEngineer({'shop': np.zeros(n_items, dtype=np.int16)})
+        # Features are added column by column, as the feature stages do
+        for i in range(20):
+            engineer.set_feature(f'feature_{i}', rng.random(n_items, dtype=np.float32))
+        df = engineer.df.copy(deep=True)
+
+        with report.track('round'):
+            engineer.round_decimal_values()
+
+    assert report.peak('round') < 0.25 * df.memory_usage().sum()
+    np.testing.assert_array_equal(engineer.df['feature_0'], df['feature_0'].round(2))
+
+
+def test_close_stops_only_the_tracing_the_report_started():
+    was_tracing = tracemalloc.is_tracing()
+    report = MemoryReport('data', track_peaks=True)
+    nested = MemoryReport('nested', track_peaks=True)
+
+    nested.close()
+    assert tracemalloc.is_tracing()
+    report.close()
+
+    assert tracemalloc.is_tracing() == was_tracing
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pandas as pd
+from scipy.stats import zscore
+
+from services.data_services.preprocessing.processing import OutlierFilter, TransactionDataPreprocessor
+
+rng = np.random.default_rng(0)
+n_rows = 5000
+df = pd.DataFrame({
+    'shop': rng.integers(0, 4, n_rows).astype(np.int16),
+    'price': rng.normal(100, 10, n_rows).astype(np.float32),
+    'amount': rng.normal(1, 0.5, n_rows).astype(np.float32),
+})
+df.loc[rng.choice(n_rows, 20, replace=False), 'price'] *= 5
+
+
+def test_zscore_filter_matches_scipy():
+    expected = df[(np.abs(zscore(df[['price', 'amount']])) < 3).all(axis=1)]
+
+    filtered = OutlierFilter(['price', 'amount']).update(df).filter(df)
+
+    pd.testing.assert_frame_equal(filtered, expected)
+
+
+def test_chunked_statistics_match_a_single_pass():
+    whole = OutlierFilter(['price'], group='shop').update(df)
+    chunked = OutlierFilter(['price'], group='shop')
+    for start in range(0, n_rows, 777):
+        chunked.update(df.iloc[start:start + 777])
+
+    np.testing.assert_allclose(chunked.finalize()[0], whole.finalize()[0])
+    np.testing.assert_allclose(chunked.finalize()[1], whole.finalize()[1])
+
+
+def test_group_statistics_match_groupby():
+    outlier_filter = OutlierFilter(['price'], method='mad', group='shop').update(df)
+    center, scale = outlier_filter.finalize()
+    grouped = df.groupby('shop')['price']
+    medians = grouped.median()
+    mads = df['price'].sub(df['shop'].map(medians)).abs().groupby(df['shop']).median()
+
+    order = outlier_filter.groups.get_indexer(medians.index)
+    np.testing.assert_allclose(center[order, 0], medians.to_numpy(), rtol=1e-6)
+    np.testing.assert_allclose(scale[order, 0], 1.4826 * mads.to_numpy(), rtol=1e-5)
+    assert 15 <= n_rows - len(outlier_filter.filter(df)) <= 60
+
+
+def test_chunked_transactions_are_filtered_like_whole_files():
+    csv = df.assign(date='01.01.2013', item=1)[['date', 'shop', 'item', 'price', 'amount']].to_csv(index=False).encode()
+
+    whole = TransactionDataPreprocessor(io.BytesIO(csv), 'transaction',
+                                        outlier_filter=OutlierFilter(['price'])).preprocess_data()
+    chunked = TransactionDataPreprocessor(io.BytesIO(csv), 'transaction', chunksize=1000,
+                                          outlier_filter=OutlierFilter(['price'])).preprocess_data()
+
+    assert len(whole) < n_rows
+    pd.testing.assert_frame_equal(chunked, whole, check_categorical=False)
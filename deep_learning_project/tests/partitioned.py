@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer, PartitionedFeatureEngineer
+
+rng = np.random.default_rng(0)
+n_rows = 2000
+transactions = pd.DataFrame({
+    'date': (pd.Timestamp('2013-01-01') + pd.to_timedelta(rng.integers(0, 90, n_rows), unit='D')).strftime('%d.%m.%Y'),
+    'shop': rng.integers(0, 7, n_rows).astype(np.int16),
+    'item': rng.integers(0, 20, n_rows).astype(np.int32),
+    'price': rng.uniform(1, 100, n_rows).astype(np.float32),
+    'amount': rng.integers(1, 5, n_rows).astype(np.float32),
+    'item_category_id': rng.integers(0, 5, n_rows).astype(np.int16),
+    'main_category': rng.integers(0, 3, n_rows).astype(np.int16),
+    'country_id': rng.integers(0, 2, n_rows).astype(np.int16),
+})
+
+
+def test_partitioned_features_match_single_process():
+    expected = FeatureEngineer(transactions.copy()).engineer_features()
+
+    engineered = PartitionedFeatureEngineer(transactions.copy(), processes=3).engineer_features()
+
+    pd.testing.assert_frame_equal(engineered, expected)
+
+
+def test_partitions_hold_whole_shops():
+    engineer = PartitionedFeatureEngineer(transactions.copy(), processes=3)
+
+    rows, partitions = engineer.partition_rows()
+
+    assert sorted(rows) == list(range(n_rows))
+    shops = [set(transactions['shop'].to_numpy()[rows[start:stop]]) for start, stop in partitions]
+    assert sum(len(partition) for partition in shops) == len(set().union(*shops)) == 7
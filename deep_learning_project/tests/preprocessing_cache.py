@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import MinMaxScaler
+
+from services.train_service.training_pipeline.data import PreprocessingCache
+from services.train_service.training_pipeline.data import cache as cache_module
+
+FEATURES = {'target': 'amount', 'exclude': ['date']}
+data = np.random.RandomState(0).rand(50, 4)
+scaler, pca = MinMaxScaler().fit(data), PCA(n_components=2).fit(data)
+
+
+def store(cache, key, rows=50):
+    cache.store(key, data[:rows], scaler, pca, ['a', 'b', 'c', 'd'], '2013-10-31')
+
+
+def test_stored_entry_is_a_hit(tmp_path):
+    cache = PreprocessingCache(str(tmp_path))
+    key = PreprocessingCache.make_key('md5-1', FEATURES, 2, streaming=False)
+    store(cache, key)
+
+    entry = cache.load(key)
+
+    np.testing.assert_array_equal(entry['scaled_data'], data)
+    np.testing.assert_array_equal(entry['pca'].components_, pca.components_)
+    assert entry['features'] == ['a', 'b', 'c', 'd'] and entry['trained_until'] == '2013-10-31'
+
+
+def test_changed_key_field_is_a_miss(tmp_path):
+    cache = PreprocessingCache(str(tmp_path))
+    store(cache, PreprocessingCache.make_key('md5-1', FEATURES, 2, streaming=False))
+
+    for key in (PreprocessingCache.make_key('md5-2', FEATURES, 2, streaming=False),
+                PreprocessingCache.make_key('md5-1', FEATURES, 3, streaming=False),
+                PreprocessingCache.make_key('md5-1', FEATURES, 2, streaming=True)):
+        assert cache.load(key) is None
+
+
+def test_partial_write_is_never_served(tmp_path, monkeypatch):
+    cache = PreprocessingCache(str(tmp_path))
+    key = PreprocessingCache.make_key('md5-1', FEATURES, 2)
+    dump = cache_module.joblib.dump
+
+    def failing_dump(value, path):
+        if value is pca:
+            raise OSError('disk full')
+        dump(value, path)
+
+    monkeypatch.setattr(cache_module.joblib, 'dump', failing_dump)
+    with pytest.raises(OSError):
+        store(cache, key)
+
+    assert cache.load(key) is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PreprocessingCache(str(tmp_path))
+    keys = [PreprocessingCache.make_key(f'md5-{i}', FEATURES, 2) for i in range(3)]
+    store(cache, keys[0])
+    store(cache, keys[1])
+    os.utime(os.path.join(str(tmp_path), keys[0]), (0, 0))
+    cache.load(keys[0])
+    os.utime(os.path.join(str(tmp_path), keys[1]), (1, 1))
+    # Room for two entries
+    entry_size = sum(file.stat().st_size for file in os.scandir(os.path.join(str(tmp_path), keys[0])))
+    cache.max_bytes = 2 * entry_size
+
+    store(cache, keys[2])
+
+    assert sorted(os.listdir(str(tmp_path))) == sorted([keys[0], keys[2]])
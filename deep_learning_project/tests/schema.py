@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer
+from services.data_services.preprocessing.schema import cast, apply_dtype_plan
+from utils.memory import MemoryReport
+
+
+def test_fill_missing_values_restores_planned_dtypes():
+    # Left joins leave float64 and nullable ID columns with missing values behind
+    df = pd.DataFrame({
+        'shop': [1.0, np.nan, 3.0],
+        'item': [10.0, 20.0, np.nan],
+        'item_category_id': pd.array([1, None, 2], dtype='Int64'),
+        'main_category': pd.array([1, 2, None], dtype='Int16'),
+        'country_id': [1.0, 2.0, 3.0],
+        'season': np.array([1, 2, 3], dtype=np.int64),
+        'day_of_week': np.array([1, 2, 3], dtype=np.int64),
+        'day_of_year': np.array([1, 2, 3], dtype=np.int64),
+        'day_of_month': np.array([1, 2, 3], dtype=np.int64),
+        'week_of_year': np.array([1, 2, 3], dtype=np.int64),
+        'price': np.array([1.5, np.nan, 2.0], dtype=np.float32),
+    })
+    engineer = FeatureEngineer(df)
+
+    engineer.fill_missing_values()
+
+    dtypes = engineer.df.dtypes
+    assert dtypes['shop'] == np.int16 and dtypes['item'] == np.int32
+    for column in ('item_category_id', 'main_category', 'country_id', 'season', 'day_of_week',
+                   'day_of_year', 'day_of_month', 'week_of_year'):
+        assert dtypes[column] == np.int16, column
+    assert dtypes['price'] == np.float32
+    assert engineer.df['shop'].tolist() == [1, 0, 3]
+    assert engineer.df['price'].tolist() == [1.5, 0.0, 2.0]
+
+
+def test_id_columns_with_missing_values_become_nullable_of_planned_width():
+    df = pd.DataFrame({'shop': [1.0, np.nan], 'item': [1.0, 2.0], 'amount': [1.0, 2.0]})
+
+    apply_dtype_plan(df)
+
+    assert df['shop'].dtype == 'Int16' and df['shop'].isna().tolist() == [False, True]
+    assert df['item'].dtype == np.int32 and df['amount'].dtype == np.float32
+    assert cast('item', pd.Series([1, None], dtype='Int64')).dtype == 'Int32'
+
+
+def test_unplanned_bytes_counts_numbers_as_64_bit():
+    df = pd.DataFrame({
+        'shop': np.arange(1000, dtype=np.int64),
+        'price': np.ones(1000, dtype=np.float64),
+        'name': [f'shop {i}' for i in range(1000)],
+    })
+
+    assert MemoryReport.unplanned_bytes(df) == df.memory_usage(deep=True).sum()
+
+    planned = apply_dtype_plan(df.copy())
+    assert planned.memory_usage(deep=True).sum() == df.memory_usage(deep=True).sum() - 6 * 1000 - 4 * 1000
+    assert MemoryReport.unplanned_bytes(planned) == df.memory_usage(deep=True).sum()
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from services.train_service.training_pipeline.data import FeatureSelector, subset_scaler
+
+rng = np.random.default_rng(0)
+base = rng.normal(size=1000)
+df = pd.DataFrame({
+    'base': base,
+    'constant': np.full(1000, 7.0),
+    'copy': 3 * base + 1e-3 * rng.normal(size=1000),
+    'other': rng.normal(size=1000),
+    'negated': -base,
+})
+
+
+def test_constant_and_correlated_columns_are_dropped():
+    assert FeatureSelector().fit(df) == ['base', 'other']
+
+
+def test_chunked_sums_match_one_pass():
+    chunked = FeatureSelector(chunk_size=64)
+    chunked.fit(df)
+    whole = FeatureSelector(chunk_size=len(df))
+    whole.fit(df)
+
+    np.testing.assert_allclose(chunked.statistics()[1], whole.statistics()[1], atol=1e-10)
+    np.testing.assert_allclose(whole.statistics()[1], np.nan_to_num(df.corr().to_numpy()), atol=1e-10)
+
+
+def test_min_features_keeps_back_redundant_columns():
+    assert FeatureSelector(min_features=3).fit(df) == ['base', 'copy', 'other']
+
+
+def test_subset_scaler_matches_scaler_fitted_on_subset():
+    columns = ['other', 'base']
+    subset = subset_scaler(MinMaxScaler().fit(df), columns)
+
+    np.testing.assert_allclose(subset.transform(df[columns]), MinMaxScaler().fit_transform(df[columns]))
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.data_services.preprocessing.feature_engineering import FeatureEngineer
+from services.data_services.preprocessing.feature_engineering.stages import FeatureStage, FeatureStageCache, stage_levels
+
+transactions = pd.DataFrame({'date': ['02.01.2013', '01.01.2013', '03.01.2013', '01.01.2013', '02.01.2013'],
+                             'shop': np.array([0, 0, 0, 1, 1], dtype=np.int16),
+                             'item': np.array([5, 5, 5, 5, 5], dtype=np.int32),
+                             'price': np.array([10.0, 10.0, 12.0, 9.0, 9.5], dtype=np.float32),
+                             'amount': np.array([1.0, 2.0, 3.0, 4.0, 5.0], dtype=np.float32),
+                             'country_id': np.array([1, 1, 1, 2, 2], dtype=np.int16),
+                             'item_category_id': np.array([7, 7, 7, 7, 7], dtype=np.int16),
+                             'main_category': np.array([3, 3, 3, 3, 3], dtype=np.int16)})
+
+
+def test_stages_are_leveled_by_their_inputs():
+    levels = stage_levels(FeatureEngineer.STAGES, transactions.columns)
+
+    assert [[stage.name for stage in level] for level in levels] == [
+        ['date'], ['time', 'lags', 'change_rates', 'price_relationships'], ['aggregates', 'season_country_category']]
+
+
+def test_cached_stages_give_the_same_features(tmp_path, monkeypatch):
+    monkeypatch.setenv('FEATURE_CACHE_DIR', str(tmp_path))
+    computed = FeatureEngineer(transactions.copy(), cache_dir='FEATURE_CACHE_DIR').engineer_features()
+    stored = len(list(tmp_path.iterdir()))
+
+    cached = FeatureEngineer(transactions.copy(), cache_dir='FEATURE_CACHE_DIR').engineer_features()
+
+    pd.testing.assert_frame_equal(cached, computed)
+    assert stored == len(FeatureEngineer.STAGES) == len(list(tmp_path.iterdir()))
+
+
+def test_cache_key_changes_with_the_stage_inputs():
+    stage = FeatureStage('lags', 'add_lag_features', ['amount'], ['amount_lag_1'])
+    changed = transactions.assign(amount=transactions['amount'] + 1)
+
+    assert FeatureStageCache.make_key(stage, FeatureEngineer, transactions) == \
+        FeatureStageCache.make_key(stage, FeatureEngineer, transactions.copy())
+    assert FeatureStageCache.make_key(stage, FeatureEngineer, transactions) != \
+        FeatureStageCache.make_key(stage, FeatureEngineer, changed)
+
+
+def test_least_recently_used_stage_outputs_are_evicted(tmp_path):
+    cache = FeatureStageCache(str(tmp_path))
+    outputs = {'amount_lag_1': np.zeros(1000, dtype=np.float32)}
+    cache.store('old', outputs)
+    cache.store('used', outputs)
+    os.utime(tmp_path / 'old.joblib', (0, 0))
+    os.utime(tmp_path / 'used.joblib', (0, 0))
+    cache.load('used')
+    # Room for two entries
+    cache.max_bytes = 2 * (tmp_path / 'old.joblib').stat().st_size
+
+    cache.store('new', outputs)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['new.joblib', 'used.joblib']
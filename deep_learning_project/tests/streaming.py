@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.preprocessing import MinMaxScaler
+
+from services.train_service.training_pipeline.data import StreamingPreprocessor
+from utils.tables import write_parquet
+
+rng = np.random.RandomState(0)
+latent = rng.normal(size=(101, 3)) * [4.0, 2.0, 1.0]
+df = pd.DataFrame(latent @ rng.normal(size=(3, 5)) + 0.01 * rng.normal(size=(101, 5)),
+                  columns=[f'feature_{i}' for i in range(5)])
+df['date'] = pd.date_range('2013-01-01', periods=101).astype(str)
+df['amount'] = rng.rand(101)
+FEATURES = [f'feature_{i}' for i in range(5)]
+
+
+@pytest.fixture(params=['parquet', 'csv'])
+def data_file(request, tmp_path):
+    path = str(tmp_path / 'data')
+    with open(path, 'wb') as file:
+        file.write(write_parquet(df).getvalue() if request.param == 'parquet' else df.to_csv(index=False).encode())
+    return path
+
+
+def test_streaming_matches_in_memory_preprocessing(data_file, tmp_path):
+    # Chunks of 20 rows leave a last chunk of 1 row, shorter than n_components
+    preprocessor = StreamingPreprocessor(n_components=3, chunk_size=20, work_dir=str(tmp_path))
+
+    projected = preprocessor.fit_transform(data_file)
+
+    scaler = MinMaxScaler().fit(df[FEATURES])
+    assert preprocessor.features == FEATURES
+    np.testing.assert_allclose(preprocessor.scaler.data_min_, scaler.data_min_)
+    np.testing.assert_allclose(preprocessor.scaler.data_max_, scaler.data_max_)
+    assert projected.shape == (101, 3)
+    assert preprocessor.trained_until == '2013-04-11'
+
+    pca = PCA(n_components=3).fit(scaler.transform(df[FEATURES]))
+    # Components match up to their sign
+    similarity = np.abs(np.sum(preprocessor.pca.components_ * pca.components_, axis=1))
+    assert (similarity > 0.95).all()
+
+
+def test_short_last_chunk_is_fitted_once(data_file, tmp_path):
+    preprocessor = StreamingPreprocessor(n_components=3, chunk_size=20, work_dir=str(tmp_path))
+
+    preprocessor.fit_transform(data_file)
+
+    scaled = MinMaxScaler().fit_transform(df[FEATURES])
+    one_pass = IncrementalPCA(n_components=3).fit(scaled)
+    assert preprocessor.pca.n_samples_seen_ == one_pass.n_samples_seen_ == 101
+    np.testing.assert_allclose(preprocessor.pca.mean_, one_pass.mean_, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(preprocessor.pca.var_, one_pass.var_, rtol=1e-4, atol=1e-6)
+
+
+def test_fewer_rows_than_components_is_rejected(tmp_path):
+    path = str(tmp_path / 'data')
+    df.head(2).to_csv(path, index=False)
+
+    with pytest.raises(ValueError, match='number of rows'):
+        StreamingPreprocessor(n_components=3, work_dir=str(tmp_path)).fit_transform(path)
@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from utils.tables import write_parquet, read_table, table_columns, iter_table_batches
+
+df = pd.DataFrame({
+    'date': pd.to_datetime(['2013-01-01', '2013-01-02', '2013-01-03']),
+    'shop': np.array([1, 2, 3], dtype=np.int16),
+    'item': np.array([10, 20, 30], dtype=np.int32),
+    'amount': np.array([1.5, 2.5, 3.5], dtype=np.float32),
+})
+
+
+def test_parquet_round_trip_keeps_dtypes():
+    pd.testing.assert_frame_equal(read_table(write_parquet(df)), df, check_dtype=False)
+    assert read_table(write_parquet(df)).dtypes.to_dict() == df.dtypes.to_dict()
+
+
+def test_projection_returns_columns_in_file_order():
+    for file in (write_parquet(df), io.BytesIO(df.to_csv(index=False).encode())):
+        assert list(read_table(file, columns=['amount', 'shop']).columns) == ['shop', 'amount']
+
+
+def test_csv_files_are_still_read():
+    file = io.BytesIO(df.to_csv(index=False).encode())
+
+    assert table_columns(file) == list(df.columns)
+    assert read_table(file)['amount'].tolist() == df['amount'].tolist()
+
+
+def test_batches_cover_all_rows(tmp_path):
+    path = str(tmp_path / 'data')
+    with open(path, 'wb') as file:
+        file.write(write_parquet(df).getvalue())
+
+    batches = list(iter_table_batches(path, ['shop', 'amount'], 2))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert pd.concat(batches)['shop'].tolist() == [1, 2, 3]
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer, MinMaxScaler
+
+from services.train_service.training_pipeline.setup.train_pipeline import TrainingPipeline
+
+
+STEP = 1 / 79
+
+
+class DeployedModel:
+    trained_until = '2013-02-19'
+
+
+def make_pipeline(monkeypatch, n_old, n_new, replay_ratio=0.0):
+    # Row i has feature value i, so after scaling a pair is a real transition exactly when Y = X + STEP
+    data = pd.DataFrame({
+        'date': pd.date_range('2013-01-01', periods=n_old + n_new).astype(str),
+        'f': np.arange(n_old + n_new, dtype=np.float64),
+        'g': np.zeros(n_old + n_new),
+        'amount': np.ones(n_old + n_new),
+    })
+    pipeline = TrainingPipeline(file_path='LAST_FILE_NAME', layer_architecture=[], current_model=None,
+                                current_loss=None, current_optimizer=None, batch_size=8,
+                                service='SERVICE_ACCOUNT_FILE', model_path='MODEL_SAVED', model_name='MODEL_NAME',
+                                scaler_name='SCALER_NAME', pca_name='PCA_NAME', warm_start=True,
+                                replay_ratio=replay_ratio)
+    DeployedModel.trained_until = str(data['date'].iloc[n_old - 1])
+
+    def load_deployed_bundle():
+        pipeline.model = DeployedModel()
+        pipeline.scaler = MinMaxScaler().fit(data[['f', 'g']])
+        pipeline.pca = FunctionTransformer(validate=True).fit(data[['f', 'g']].to_numpy())
+        pipeline.features, pipeline.target = ['f', 'g'], 'amount'
+        return True
+
+    trained = []
+    monkeypatch.setattr(pipeline, 'load_deployed_bundle', load_deployed_bundle)
+    monkeypatch.setattr(pipeline, 'load_data', lambda columns=None: setattr(pipeline, 'data', data))
+    monkeypatch.setattr(pipeline, 'train_model', lambda: trained.append((pipeline.X_train, pipeline.Y_train)))
+    monkeypatch.setattr(pipeline, 'save_model_and_scaler', lambda: None)
+    return pipeline, trained
+
+
+def test_no_new_rows_trains_nothing(monkeypatch):
+    pipeline, trained = make_pipeline(monkeypatch, n_old=20, n_new=0)
+
+    assert pipeline.run_warm_start()
+    assert trained == []
+
+
+def test_tiny_delta_is_skipped(monkeypatch):
+    pipeline, trained = make_pipeline(monkeypatch, n_old=20, n_new=2)
+
+    assert pipeline.run_warm_start()
+    assert trained == []
+
+
+def test_replayed_pairs_are_real_transitions(monkeypatch):
+    pipeline, trained = make_pipeline(monkeypatch, n_old=50, n_new=30, replay_ratio=0.5)
+
+    assert pipeline.run_warm_start()
+    (X_train, Y_train), = trained
+
+    n_new_train = int(29 * pipeline.train_ratio)
+    assert len(X_train) == 15 + n_new_train
+    np.testing.assert_allclose(Y_train[:, 0], X_train[:, 0] + STEP)
+    # The replayed block comes first and only holds old rows
+    assert (X_train[:15, 0] < 49 * STEP).all() and (X_train[15:, 0] >= 50 * STEP - 1e-9).all()
+    np.testing.assert_allclose(pipeline.Y_test[:, 0], pipeline.X_test[:, 0] + STEP)
+
+
+def test_replay_sample_is_reproducible(monkeypatch):
+    runs = []
+    for _ in range(2):
+        pipeline, trained = make_pipeline(monkeypatch, n_old=50, n_new=30, replay_ratio=0.5)
+        pipeline.run_warm_start()
+        runs.append(trained[0][0])
+
+    np.testing.assert_array_equal(runs[0], runs[1])
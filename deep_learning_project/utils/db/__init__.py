@@ -1 +1,3 @@
-from.uploader import GoogleDriveHandler
\ No newline at end of file
+from .uploader import GoogleDriveHandler, get_drive_handler
+from .cache import DriveFileCache
+from .index import DriveNameIndex
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import mmap
+import os
+import threading
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DriveFileCache:
+    """
+    A class for caching downloaded Google Drive files on local disk.
+
+    Every entry is a file named after a hash of the Drive file id and of its version, the
+    `md5Checksum`, or the `modifiedTime` for files without one. A changed file on Drive gets a
+    new key, so entries never need to be invalidated. Hits are served memory-mapped, and the
+    least recently used entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 2 ** 30):
+        """
+        Initializes the DriveFileCache.
+
+        Args:
+        directory (str): The local folder of the cache.
+        max_bytes (int): The size the entries are evicted down to. Default is 2 GiB.
+
+        Returns:
+        None.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_id, metadata):
+        """
+        Builds the cache key of a Drive file version.
+
+        Args:
+        file_id (str): The ID of the file.
+        metadata (dict): The file's metadata, with its md5Checksum or modifiedTime.
+
+        Returns:
+        str: The cache key, or None if the metadata does not identify the version.
+        """
+        version = metadata.get('md5Checksum') or metadata.get('modifiedTime')
+        if not version:
+            return None
+        return hashlib.sha256(f'{file_id}@{version}'.encode()).hexdigest()
+
+    def lookup(self, key):
+        """
+        Looks an entry up and marks it as recently used.
+
+        Args:
+        key (str): The cache key.
+
+        Returns:
+        str: The local path of the entry, or None on a miss.
+        """
+        path = os.path.join(self.directory, key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            logger.info(f'Drive cache miss for key {key[:12]}.')
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.info(f'Drive cache hit for key {key[:12]}.')
+        return path
+
+    def add(self, key, write):
+        """
+        Adds an entry, then evicts the least recently used ones if the cache is too large.
+
+        The entry is written to a temporary file and renamed once complete, so concurrent or
+        interrupted downloads never leave a partial entry.
+
+        Args:
+        key (str): The cache key.
+        write (callable): Writes the content to the binary file object it is given.
+
+        Returns:
+        str: The local path of the entry.
+        """
+        path = os.path.join(self.directory, key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                write(file)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits in `max_bytes`.
+
+        Args:
+        keep (str, optional): The path of an entry that is never removed, e.g. the one just added.
+
+        Returns:
+        None.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f'Evicted {os.path.basename(path)[:12]} from the Drive cache.')
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def open(path):
+        """
+        Opens an entry memory-mapped, so it is paged in from disk as it is read.
+
+        Args:
+        path (str): The local path of the entry.
+
+        Returns:
+        mmap.mmap: The read-only file content, or an empty io.BytesIO for an empty file.
+        """
+        with open(path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return io.BytesIO()
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
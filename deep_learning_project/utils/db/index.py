@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class DriveNameIndex:
+    """
+    A class for remembering which Drive file a name resolves to, for a limited time.
+
+    Every entry holds the file's id, name, modifiedTime and md5Checksum as listed by Drive, and
+    expires `ttl` seconds after it was stored. Names are invalidated explicitly when a file of
+    that name is uploaded, since the upload may change which file the name resolves to.
+    """
+
+    def __init__(self, ttl=300, clock=time.monotonic):
+        """
+        Initializes the DriveNameIndex.
+
+        Args:
+        ttl (float): The number of seconds an entry stays valid. Default is 300.
+        clock (callable): Returns the current time in seconds. Default is time.monotonic.
+
+        Returns:
+        None.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, file):
+        """
+        Stores the file a name resolves to.
+
+        Args:
+        file (dict): The file as listed by Drive, with at least its id and name.
+
+        Returns:
+        None.
+        """
+        with self._lock:
+            self._entries[file['name']] = (self.clock() + self.ttl, file)
+
+    def get(self, name):
+        """
+        Returns the file a name resolves to, if it is known and has not expired.
+
+        Args:
+        name (str): The file name.
+
+        Returns:
+        dict: The file, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[name]
+                return None
+            return entry[1]
+
+    def get_by_id(self, file_id):
+        """
+        Returns a file of the index by its id, if its entry has not expired.
+
+        Args:
+        file_id (str): The ID of the file.
+
+        Returns:
+        dict: The file, or None.
+        """
+        with self._lock:
+            now = self.clock()
+            for expires, file in self._entries.values():
+                if file['id'] == file_id and expires > now:
+                    return file
+        return None
+
+    def invalidate(self, name=None):
+        """
+        Forgets a name, or every name.
+
+        Args:
+        name (str, optional): The file name. Default is every name.
+
+        Returns:
+        None.
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
@@ -1,63 +1,241 @@
 import os
+import shutil
+import threading
 
+import httplib2
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload, MediaIoBaseUpload
 import io
 
+from utils.db.cache import DriveFileCache
+from utils.db.index import DriveNameIndex
 from utils.log.logger import get_logger
 
 logger = get_logger(__name__)
 
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly', 'https://www.googleapis.com/auth/drive.file']
+FILE_FIELDS = 'id, name, md5Checksum, modifiedTime'
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def get_drive_handler(service):
+    """
+    Returns the process-wide GoogleDriveHandler of a service account, creating it on first use.
+
+    Sharing the handler shares its credentials, whose access token is refreshed only when it
+    expires, its Drive client, and the HTTP connections its threads keep open.
+
+    Args:
+    service (str): The environment variable name of the service account file.
+
+    Returns:
+    GoogleDriveHandler: The shared handler.
+    """
+    with _handlers_lock:
+        if service not in _handlers:
+            _handlers[service] = GoogleDriveHandler(service)
+        return _handlers[service]
+
+
 class GoogleDriveHandler:
     """
     A class for handling Google Drive file upload and download.
+
+    The credentials and the Drive client are built on first use, from the discovery document
+    bundled with the client library, so creating a handler costs next to nothing. Requests are
+    sent through a persistent HTTP connection owned by the calling thread, so one handler can
+    be used from several threads at once; `get_drive_handler` shares one per service account.
+
+    Downloads go through a local DriveFileCache when the DRIVE_CACHE_DIR environment variable
+    names a folder for it. Names resolved by `search_file_by_name` or `warm_names` are kept in
+    a DriveNameIndex for `name_ttl` seconds; within that time the listed version of a file also
+    keys the download cache without a metadata call.
     """
 
-    def __init__(self, service):
+    def __init__(self, service, client=None, http=None, cache_dir='DRIVE_CACHE_DIR', cache_max_bytes=2 * 2 ** 30,
+                 name_ttl=300):
+        """
+        Initializes the GoogleDriveHandler.
+
+        Args:
+        service (str): The environment variable name of the service account file.
+        client (googleapiclient.discovery.Resource, optional): An already built Drive client, e.g. one
+                                                                backed by a fake HTTP layer in tests. The
+                                                                service account is not read then.
+        http (httplib2.Http, optional): The HTTP layer the injected client was built with, which its
+                                        requests are sent through. Required with `client`.
+        cache_dir (str, optional): The environment variable name of the local download cache folder.
+                                   Downloads are not cached when it is not set.
+        cache_max_bytes (int, optional): The size the download cache is evicted down to. Default is 2 GiB.
+        name_ttl (float, optional): The number of seconds a resolved file name is remembered. Default is 300.
+
+        Returns:
+        None.
 
+        Raises:
+        ValueError: If a client is given without its HTTP layer.
+        """
+        if client is not None and http is None:
+            raise ValueError('An injected Drive client needs the http it was built with.')
         load_dotenv()
 
         self.service_account_file = os.getenv(service)
 
-        self.credentials = service_account.Credentials.from_service_account_file(
-            self.service_account_file, scopes=['https://www.googleapis.com/auth/drive.readonly', 'https://www.googleapis.com/auth/drive.file'])
+        self._client = client
+        self._client_http = http
+        self._credentials = None
+        self._client_lock = threading.Lock()
+        self._local = threading.local()
+
+        cache_dir = os.getenv(cache_dir) if cache_dir else None
+        self.cache = DriveFileCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.names = DriveNameIndex(ttl=name_ttl)
+
+    def _build_client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    self.service_account_file, scopes=SCOPES)
+                self._client = build('drive', 'v3', credentials=self._credentials, static_discovery=True)
+
+    @property
+    def service(self):
+        """
+        The Drive client, built on first use.
 
-        self.service = build('drive', 'v3', credentials=self.credentials)
+        Returns:
+        googleapiclient.discovery.Resource: The Drive client.
+        """
+        if self._client is None:
+            self._build_client()
+        return self._client
 
-    def download_file_from_drive(self, file_id):
+    @property
+    def credentials(self):
         """
-        Downloads a file from Google Drive.
+        The service account credentials, built on first use. None for an injected client.
 
-        Args:
-        file_id (str): The ID of the file to download.
+        Returns:
+        google.oauth2.service_account.Credentials: The credentials.
+        """
+        if self._client is None:
+            self._build_client()
+        return self._credentials
+
+    def thread_http(self):
+        """
+        Returns an authorized HTTP client owned by the calling thread.
+
+        httplib2 connections are not thread-safe, so requests made from worker threads
+        must not share the client the service was built with. The thread keeps its connection
+        open between requests, and all threads share the credentials and their access token.
 
         Returns:
-        io.BytesIO: The downloaded file as a BytesIO object.
+        google_auth_httplib2.AuthorizedHttp: The thread's HTTP client.
         """
+        if self._client_http is not None:
+            # An injected client brings its own HTTP layer
+            return self._client_http
+        if not hasattr(self._local, 'http'):
+            self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return self._local.http
+
+    def _download(self, file_id, file):
         request = self.service.files().get_media(fileId=file_id)
-        file = io.BytesIO()
-
+        request.http = self.thread_http()
         downloader = MediaIoBaseDownload(file, request)
         done = False
         while done is False:
             status, done = downloader.next_chunk()
             logger.info(f'Download {int(status.progress() * 100)}%.')
 
+    def cached_file_path(self, file_id):
+        """
+        Returns the local path of a file in the download cache, downloading it into the cache on a miss.
+
+        Whether the cached version is current is checked with a single metadata call, unless the
+        file was listed by name within the name TTL.
+
+        Args:
+        file_id (str): The ID of the file.
+
+        Returns:
+        str: The local path, or None if downloads are not cached or the file has no version to key it by.
+        """
+        if self.cache is None:
+            return None
+        metadata = self.names.get_by_id(file_id) or self.get_file_metadata(file_id)
+        key = DriveFileCache.make_key(file_id, metadata)
+        if key is None:
+            return None
+        path = self.cache.lookup(key)
+        if path is None:
+            path = self.cache.add(key, lambda file: self._download(file_id, file))
+            logger.info(f'File {file_id} downloaded successfully into the Drive cache.')
+        return path
+
+    def download_file_from_drive(self, file_id):
+        """
+        Downloads a file from Google Drive. Safe to call from several threads at once.
+
+        Args:
+        file_id (str): The ID of the file to download.
+
+        Returns:
+        io.BytesIO or mmap.mmap: The downloaded file, memory-mapped from the download cache if it is enabled.
+        """
+        cached_path = self.cached_file_path(file_id)
+        if cached_path is not None:
+            return DriveFileCache.open(cached_path)
+
+        file = io.BytesIO()
+        self._download(file_id, file)
+
         logger.info(f'File downloaded successfully to folder ID {file_id}.')
 
 
         file.seek(0)
         return file
 
-    def upload_file_to_drive(self, file_path, folder_id):
+    def download_file_to_disk(self, file_id, file_path):
+        """
+        Downloads a file from Google Drive straight to local disk, chunk by chunk.
+
+        Args:
+        file_id (str): The ID of the file to download.
+        file_path (str): The local path to write the file to.
+
+        Returns:
+        str: The local path of the downloaded file.
+        """
+        cached_path = self.cached_file_path(file_id)
+        if cached_path is not None:
+            # A hard link shares the cached content; the cache may evict its own link later
+            try:
+                os.link(cached_path, file_path)
+            except OSError:
+                shutil.copyfile(cached_path, file_path)
+            return file_path
+
+        with open(file_path, 'wb') as file:
+            self._download(file_id, file)
+
+        logger.info(f'File {file_id} downloaded successfully to {file_path}.')
+        return file_path
+
+    def upload_file_to_drive(self, file_path, folder_id, mimetype='text/csv'):
         """
         Uploads a file to Google Drive.
 
         Args:
         file_path (str): The path to the file to upload.
         folder_id (str): The ID of the folder to upload the file to.
+        mimetype (str): The MIME type of the file. Defaults to 'text/csv'.
 
         Returns:
         None.
@@ -66,15 +244,17 @@ class GoogleDriveHandler:
             'name': os.path.basename(file_path),
             'parents': [folder_id]
         }
-        media = MediaFileUpload(file_path, mimetype='text/csv', resumable=True)
+        media = MediaFileUpload(file_path, mimetype=mimetype, resumable=True)
         request = self.service.files().create(body=file_metadata, media_body=media, fields='id')
 
         response = None
         while response is None:
-            status, response = request.next_chunk()
+            status, response = request.next_chunk(http=self.thread_http())
             if status:
                 logger.info(f'Upload {int(status.progress() * 100)}% complete.')
 
+        # The name may resolve to the new file now
+        self.names.invalidate(file_metadata['name'])
         logger.info(f'File {file_path} uploaded successfully to folder ID {folder_id}.')
 
 
@@ -100,16 +280,89 @@ class GoogleDriveHandler:
         request = self.service.files().create(body=file_metadata, media_body=media, fields='id')
         response = None
         while response is None:
-            status, response = request.next_chunk()
+            status, response = request.next_chunk(http=self.thread_http())
             if status:
                 logger.info(f'Upload {int(status.progress() * 100)}% complete.')
 
+        # The name may resolve to the new file now
+        self.names.invalidate(file_metadata['name'])
         logger.info(f'File {filename} uploaded successfully to folder ID {folder_id}.')
 
 
+    def get_file_metadata(self, file_id):
+        """
+        Fetches the metadata of a file without downloading its content.
+
+        Args:
+        file_id (str): The ID of the file.
+
+        Returns:
+        dict: The file's id, name, md5Checksum, modifiedTime and size.
+        """
+        return self.service.files().get(fileId=file_id, fields='id, name, md5Checksum, modifiedTime, size').execute(
+            http=self.thread_http())
+
+    def list_files(self, query):
+        """
+        Lists the files matching a Drive query, following all result pages.
+
+        Args:
+        query (str): The Drive query.
+
+        Returns:
+        list: The files, with their id, name, md5Checksum and modifiedTime.
+        """
+        files, page_token = [], None
+        while True:
+            results = self.service.files().list(q=query, spaces='drive', pageToken=page_token,
+                                                fields=f'nextPageToken, files({FILE_FIELDS})').execute(
+                http=self.thread_http())
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+
+    @staticmethod
+    def name_query(names):
+        """
+        Builds the Drive query matching any of the names.
+
+        Args:
+        names (list): The file names.
+
+        Returns:
+        str: The query.
+        """
+        quoted = (name.replace('\\', '\\\\').replace("'", "\\'") for name in names)
+        return ' or '.join(f"name='{name}'" for name in quoted)
+
+    def warm_names(self, names):
+        """
+        Resolves several file names with a single list call and remembers them.
+
+        Names that are already known are not listed again.
+
+        Args:
+        names (list): The file names.
+
+        Returns:
+        dict: The ID of every name, None for names without a file.
+        """
+        names = list(dict.fromkeys(name for name in names if name))
+        missing = [name for name in names if self.names.get(name) is None]
+        if missing:
+            listed = {}
+            for file in self.list_files(self.name_query(missing)):
+                # Like a single search, the first listed file of a name wins
+                listed.setdefault(file['name'], file)
+            for file in listed.values():
+                self.names.put(file)
+            logger.info(f'Resolved {len(listed)} of {len(missing)} file names with one list call.')
+        return {name: (self.names.get(name) or {}).get('id') for name in names}
+
     def search_file_by_name(self, file_name):
         """
-        Searches for a file by name in Google Drive.
+        Searches for a file by name in Google Drive. Names resolved within the name TTL are not searched again.
 
         Args:
         file_name (str): The name of the file to search for.
@@ -117,13 +370,15 @@ class GoogleDriveHandler:
         Returns:
         str: The ID of the file if found, else None.
         """
-        results = self.service.files().list(q=f"name='{file_name}'", spaces='drive', fields='files(id, name)').execute()
-        items = results.get('files', [])
+        item = self.names.get(file_name)
+        if item is not None:
+            return item['id']
+
+        items = self.list_files(self.name_query([file_name]))
         if not items:
             logger.info(f'No file found with name: {file_name}')
             return None
         for item in items:
             logger.info(f'Found file: {item["name"]} (ID: {item["id"]})')
+            self.names.put(item)
             return item['id']
-
-
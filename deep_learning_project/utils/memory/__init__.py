@@ -0,0 +1,2 @@
+from .report import MemoryReport
+from .cow import copy_on_write
\ No newline at end of file
@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Copy-on-Write is always on from pandas 3.0, where the option is deprecated
+ALWAYS_ON = int(pd.__version__.split('.')[0]) >= 3
+
+_lock = threading.Lock()
+_depth = 0
+_previous = None
+
+
+@contextmanager
+def copy_on_write():
+    """
+    Run a block under pandas Copy-on-Write, so selections, renames and drops share the data
+    of their source until one of them is modified.
+
+    The pandas option is process-wide. The context may be entered from several threads at
+    once: the option is switched on by the first one to enter and restored by the last one to leave.
+    """
+    global _depth, _previous
+    if ALWAYS_ON:
+        yield
+        return
+    with _lock:
+        if _depth == 0:
+            _previous = pd.get_option('mode.copy_on_write')
+            pd.set_option('mode.copy_on_write', True)
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0:
+                pd.set_option('mode.copy_on_write', _previous)
@@ -0,0 +1,138 @@
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryReport:
+    """
+    A class for reporting the memory footprint of DataFrames at each pipeline stage.
+
+    For every stage it logs the deep memory usage of the frame next to the size the same
+    frame would have with 64-bit numeric columns and object strings, i.e. without a dtype plan.
+    With `track_peaks`, it also measures the peak memory every tracked stage allocates, until
+    it is closed.
+    """
+
+    def __init__(self, name, track_peaks=False):
+        """
+        Initialize the MemoryReport.
+
+        Args:
+            name (str): The name of the pipeline, used in the log lines.
+            track_peaks (bool): Whether `track` measures the stages with tracemalloc, which slows
+                allocations down. Tracing starts here, since memory freed by a stage only counts if it
+                was allocated while tracing. `close` stops it again. Default is False.
+        """
+        self.name = name
+        self.track_peaks = track_peaks
+        self.stages = []
+        self.peaks = []
+        self._started_tracing = False
+        if track_peaks and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def close(self):
+        """
+        Stop tracemalloc if this report started it. Stages tracked afterwards are not measured.
+
+        Returns:
+            None.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @staticmethod
+    def unplanned_bytes(df):
+        """
+        Estimate the memory usage of a DataFrame with 64-bit numbers and object strings.
+
+        Args:
+            df (pandas.DataFrame): The frame.
+
+        Returns:
+            int: The estimated number of bytes.
+        """
+        total = df.index.memory_usage()
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_bool_dtype(series.dtype):
+                total += series.memory_usage(deep=True, index=False)
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                total += series.astype(object).memory_usage(deep=True, index=False)
+            elif series.dtype.kind in 'biufcmM' or pd.api.types.is_numeric_dtype(series.dtype):
+                total += len(series) * np.dtype(np.int64).itemsize
+            else:
+                total += series.memory_usage(deep=True, index=False)
+        return total
+
+    def record(self, stage, df):
+        """
+        Record and log the memory usage of a DataFrame after a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            df (pandas.DataFrame): The frame after the stage.
+
+        Returns:
+            dict: The stage, its number of rows, its bytes and the unplanned bytes.
+        """
+        entry = {
+            'stage': stage,
+            'rows': len(df),
+            'bytes': int(df.memory_usage(deep=True).sum()),
+            'unplanned_bytes': int(self.unplanned_bytes(df)),
+        }
+        self.stages.append(entry)
+        reduction = 1 - entry['bytes'] / entry['unplanned_bytes'] if entry['unplanned_bytes'] else 0.0
+        logger.info(f"[{self.name}] {stage}: {entry['rows']} rows, {entry['bytes'] / 2 ** 20:.1f} MiB "
+                    f"(vs {entry['unplanned_bytes'] / 2 ** 20:.1f} MiB unplanned, {reduction:.0%} smaller)")
+        return entry
+
+    @contextmanager
+    def track(self, stage):
+        """
+        Measure the peak memory allocated while a stage runs, above what was allocated before it,
+        and the memory it retains.
+
+        tracemalloc is process-wide, so stages tracked at the same time, from other threads or
+        nested in each other, distort each other's peaks.
+
+        Args:
+            stage (str): The name of the stage.
+        """
+        if not self.track_peaks or not tracemalloc.is_tracing():
+            yield
+            return
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            entry = {'stage': stage, 'peak_bytes': peak - baseline, 'retained_bytes': current - baseline}
+            self.peaks.append(entry)
+            logger.info(f"[{self.name}] {stage}: peak {entry['peak_bytes'] / 2 ** 20:.1f} MiB allocated, "
+                        f"{entry['retained_bytes'] / 2 ** 20:.1f} MiB retained")
+
+    def peak(self, stage):
+        """
+        Return the peak bytes of the last run of a tracked stage.
+
+        Args:
+            stage (str): The name of the stage.
+
+        Returns:
+            int: The peak bytes, or None if the stage was not tracked.
+        """
+        for entry in reversed(self.peaks):
+            if entry['stage'] == stage:
+                return entry['peak_bytes']
+        return None
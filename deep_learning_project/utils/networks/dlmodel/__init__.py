@@ -2,4 +2,5 @@ from .Activations import ReLU, Sigmoid, Tanh
 from .layers import Layer
 from .losses import LossMSE
 from .optimizers import OptimizerSGD
-from .dlmodel import DPModel
\ No newline at end of file
+from .dlmodel import DPModel
+from .checkpoints import CheckpointManager
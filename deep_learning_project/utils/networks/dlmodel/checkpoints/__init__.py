@@ -0,0 +1 @@
+from .checkpoint import CheckpointManager
\ No newline at end of file
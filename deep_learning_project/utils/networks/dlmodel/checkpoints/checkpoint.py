@@ -0,0 +1,159 @@
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CheckpointManager:
+    """
+    A class for periodically saving and restoring the training state of a DPModel.
+
+    A checkpoint is a single compressed `.npz` file holding the layer weights and biases,
+    the Adam momentums and caches, the optimizer iteration count, the NumPy RNG state and
+    the index of the last finished epoch. Checkpoints are tagged with a fingerprint of the
+    training configuration so that a run is only ever resumed by an identical run.
+    """
+
+    FILE_PATTERN = 'checkpoint_*.npz'
+
+    def __init__(self, directory, every=10, fingerprint=None, keep=2):
+        """
+        Initializes the CheckpointManager.
+
+        Parameters:
+        directory (str): The local folder the checkpoints are written to.
+        every (int, optional): Number of epochs between two checkpoints. Default is 10.
+        fingerprint (dict, optional): The training configuration the checkpoints belong to.
+        keep (int, optional): Number of most recent checkpoints kept on disk. Default is 2.
+
+        Returns:
+        None.
+        """
+        self.directory = directory
+        self.every = every
+        self.fingerprint = json.dumps(fingerprint or {}, sort_keys=True, default=str)
+        self.keep = keep
+        os.makedirs(self.directory, exist_ok=True)
+
+        # The artifacts of a run with another configuration can never be resumed.
+        fingerprint_path = os.path.join(self.directory, 'fingerprint.json')
+        if os.path.exists(fingerprint_path):
+            with open(fingerprint_path) as file:
+                if file.read() != self.fingerprint:
+                    self.clear()
+        with open(fingerprint_path, 'w') as file:
+            file.write(self.fingerprint)
+
+    def artifact_path(self, name):
+        """
+        Returns the path of an auxiliary file stored next to the checkpoints.
+
+        Auxiliary files share the lifetime of the checkpoints: they are removed together with
+        them, and whenever the manager is created for a different training configuration.
+
+        Parameters:
+        name (str): The file name.
+
+        Returns:
+        str: The full path of the file.
+        """
+        os.makedirs(os.path.join(self.directory, 'artifacts'), exist_ok=True)
+        return os.path.join(self.directory, 'artifacts', name)
+
+    def on_epoch_end(self, model, epoch, loss):
+        """
+        Saves a checkpoint every `every` epochs.
+
+        Parameters:
+        model (DPModel): The model being trained.
+        epoch (int): The index of the epoch that just finished.
+        loss (float): The training loss of the epoch.
+
+        Returns:
+        bool: Always False, checkpointing never stops training.
+        """
+        if (epoch + 1) % self.every == 0:
+            self.save(model, epoch)
+        return False
+
+    def save(self, model, epoch):
+        """
+        Writes a checkpoint for the given model and epoch.
+
+        The file is written under a temporary name and then renamed, so a crash while
+        saving never leaves a truncated checkpoint behind.
+
+        Parameters:
+        model (DPModel): The model to save.
+        epoch (int): The index of the last finished epoch.
+
+        Returns:
+        str: The path of the written checkpoint.
+        """
+        rng_name, rng_keys, rng_pos, has_gauss, cached_gaussian = np.random.get_state()
+        meta = {
+            'fingerprint': self.fingerprint,
+            'epoch': int(epoch),
+            'iterations': getattr(model.optimizer, 'iterations', None),
+            'rng': [rng_name, int(rng_pos), int(has_gauss), float(cached_gaussian)],
+        }
+
+        path = os.path.join(self.directory, f'checkpoint_{epoch + 1:04d}.npz')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.savez_compressed(file, meta=np.array(json.dumps(meta)), rng_keys=rng_keys, **model.get_state())
+        os.replace(tmp_path, path)
+        logger.info(f'Checkpoint saved: {path}')
+
+        for old_path in self._checkpoint_paths()[:-self.keep]:
+            os.remove(old_path)
+        return path
+
+    def restore(self, model):
+        """
+        Restores the latest compatible checkpoint into the given model.
+
+        Parameters:
+        model (DPModel): A model built with the same architecture, loss and optimizer.
+
+        Returns:
+        int: The index of the epoch training should continue from, 0 if nothing was restored.
+        """
+        for path in reversed(self._checkpoint_paths()):
+            with np.load(path) as checkpoint:
+                meta = json.loads(str(checkpoint['meta']))
+                if meta['fingerprint'] != self.fingerprint:
+                    logger.info(f'Ignoring checkpoint {path}: training configuration changed.')
+                    continue
+
+                model.set_state({key: checkpoint[key] for key in checkpoint.files if key.startswith('layer_')})
+                if meta['iterations'] is not None:
+                    model.optimizer.iterations = meta['iterations']
+                rng_name, rng_pos, has_gauss, cached_gaussian = meta['rng']
+                np.random.set_state((rng_name, checkpoint['rng_keys'], rng_pos, has_gauss, cached_gaussian))
+
+            logger.info(f'Resuming training from {path} (epoch {meta["epoch"] + 1}).')
+            return meta['epoch'] + 1
+        return 0
+
+    def clear(self):
+        """
+        Removes all checkpoints and auxiliary files once a run has completed.
+
+        Returns:
+        None.
+        """
+        for path in self._checkpoint_paths() + [os.path.join(self.directory, 'fingerprint.json')]:
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(os.path.join(self.directory, 'artifacts'), ignore_errors=True)
+        logger.info(f'Checkpoints cleared from {self.directory}.')
+
+    def _checkpoint_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, self.FILE_PATTERN)))
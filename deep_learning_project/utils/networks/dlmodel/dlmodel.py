@@ -9,6 +9,8 @@ logger = get_logger(__name__)
 
 
 class DPModel:
+    LAYER_STATE = ('weights', 'biases', 'weight_momentums', 'weight_cache', 'bias_momentums', 'bias_cache')
+
     def __init__(self):
         """
         Initialize the DPModel with empty lists for layers and activations,
@@ -18,6 +20,7 @@ class DPModel:
         self.activations = []
         self.loss = None
         self.optimizer = None
+        self.trained_until = None
 
     def add_layer(self, input_size, output_size, activation=None):
         """
@@ -110,7 +113,35 @@ class DPModel:
         ]
         return batches
 
-    def train(self, X, y, epochs=1, batch_size=1):
+    def get_state(self):
+        """
+        Collect the trainable parameters and the optimizer state of every layer.
+
+        Returns:
+        dict: Mapping of array names to copies of the weights, biases and, when the
+              optimizer has touched the layer, its momentums and caches.
+        """
+        state = {}
+        for i, layer in enumerate(self.layers):
+            for name in self.LAYER_STATE:
+                if hasattr(layer, name):
+                    state[f'layer_{i}_{name}'] = getattr(layer, name).copy()
+        return state
+
+    def set_state(self, state):
+        """
+        Restore parameters and optimizer state previously returned by `get_state`.
+
+        Parameters:
+        state (dict): Mapping of array names to arrays.
+        """
+        for i, layer in enumerate(self.layers):
+            for name in self.LAYER_STATE:
+                key = f'layer_{i}_{name}'
+                if key in state:
+                    setattr(layer, name, np.array(state[key], copy=True))
+
+    def train(self, X, y, epochs=1, batch_size=1, start_epoch=0, callbacks=None):
         """
         Train the model using the given data.
 
@@ -119,8 +150,11 @@ class DPModel:
         y (ndarray): Target values.
         epochs (int, optional): Number of epochs to train for. Defaults to 1.
         batch_size (int, optional): Number of samples per batch. Defaults to 1.
+        start_epoch (int, optional): Index of the first epoch to run, used when resuming. Defaults to 0.
+        callbacks (list, optional): Objects with an `on_epoch_end(model, epoch, loss)` method.
+                                    Training stops early when any of them returns True.
         """
-        for epoch in range(epochs):
+        for epoch in range(start_epoch, epochs):
             batches = self.create_batches(X, y, batch_size)
             epoch_loss = 0
             for batch_X, batch_y in batches:
@@ -133,6 +167,8 @@ class DPModel:
             epoch_loss /= len(batches)
             rmse = np.sqrt(epoch_loss)
             logger.info(f'Epoch {epoch + 1}, Loss: {epoch_loss}, RMSE: {rmse}')
+            if callbacks and any([callback.on_epoch_end(self, epoch, epoch_loss) for callback in callbacks]):
+                break
 
     def predict(self, inputs):
         """
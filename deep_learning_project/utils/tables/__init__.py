@@ -0,0 +1 @@
+from .parquet import write_parquet, append_parquet, truncate_parquet, read_table, table_columns, iter_table_batches
@@ -0,0 +1,178 @@
+import contextlib
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.log.logger import get_logger
+
+logger = get_logger(__name__)
+
+PARQUET_MAGIC = b'PAR1'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+
+def write_parquet(df, compression='zstd'):
+    """
+    Write a DataFrame to an in-memory Parquet file, keeping the dtypes of its columns.
+
+    Args:
+        df (pandas.DataFrame): The data.
+        compression (str): The Parquet compression codec. Default is 'zstd'.
+
+    Returns:
+        io.BytesIO: The Parquet file, positioned at its start.
+    """
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression=compression)
+    logger.info(f'Wrote {len(df)} rows as {buffer.tell() / 2 ** 20:.1f} MiB of Parquet.')
+    buffer.seek(0)
+    return buffer
+
+
+def append_parquet(path, df, compression='zstd'):
+    """
+    Append a DataFrame to a Parquet file as new row groups, creating the file if it does not exist.
+
+    Parquet files cannot be extended in place, so the file is rewritten row group by row group
+    next to itself and then renamed over the old one. The appended columns are cast to the
+    types of the existing file.
+
+    Args:
+        path (str): The path of the file.
+        df (pandas.DataFrame): The rows to append.
+        compression (str): The Parquet compression codec. Default is 'zstd'.
+
+    Returns:
+        int: The number of rows in the file afterwards.
+    """
+    return _rewrite_parquet(path, None, df, compression)
+
+
+def truncate_parquet(path, n_rows, compression='zstd'):
+    """
+    Keep only the first rows of a Parquet file.
+
+    Args:
+        path (str): The path of the file.
+        n_rows (int): The number of rows to keep.
+        compression (str): The Parquet compression codec. Default is 'zstd'.
+
+    Returns:
+        int: The number of rows in the file afterwards.
+    """
+    return _rewrite_parquet(path, n_rows, None, compression)
+
+
+def _rewrite_parquet(path, n_rows, df, compression):
+    table = pa.Table.from_pandas(df, preserve_index=False) if df is not None else None
+    temporary_path = f'{path}.tmp'
+    written = 0
+    try:
+        with contextlib.ExitStack() as stack:
+            source = None
+            if os.path.exists(path):
+                source = pq.ParquetFile(stack.enter_context(open(path, 'rb')))
+            if source is not None:
+                schema = source.schema_arrow
+            else:
+                # Categories added by later appends must fit the codes of the first one
+                schema = pa.schema([field.with_type(pa.dictionary(pa.int32(), field.type.value_type, field.type.ordered))
+                                    if pa.types.is_dictionary(field.type) else field for field in table.schema],
+                                   metadata=table.schema.metadata)
+            writer = stack.enter_context(pq.ParquetWriter(temporary_path, schema, compression=compression))
+            for index in range(source.num_row_groups if source is not None else 0):
+                if n_rows is not None and written >= n_rows:
+                    break
+                row_group = source.read_row_group(index)
+                if n_rows is not None:
+                    row_group = row_group.slice(0, n_rows - written)
+                writer.write_table(row_group)
+                written += row_group.num_rows
+            if table is not None and table.num_rows:
+                writer.write_table(table.cast(schema))
+                written += table.num_rows
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return written
+
+
+def is_parquet(file):
+    """
+    Check whether a file is Parquet by its magic bytes. Files written before the data was
+    stored as Parquet are CSV.
+
+    Args:
+        file (str or file-like): The path or the open binary file, which is rewound afterwards.
+
+    Returns:
+        bool: True for a Parquet file.
+    """
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, 'rb') as handle:
+            return handle.read(4) == PARQUET_MAGIC
+    position = file.tell()
+    magic = file.read(4)
+    file.seek(position)
+    return magic == PARQUET_MAGIC
+
+
+def table_columns(file):
+    """
+    Return the column names of a Parquet or CSV file without reading its rows.
+
+    Args:
+        file (str or file-like): The path or the open binary file.
+
+    Returns:
+        list: The column names in file order.
+    """
+    if is_parquet(file):
+        names = pq.ParquetFile(file).schema_arrow.names
+    else:
+        names = list(pd.read_csv(file, nrows=0).columns)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return names
+
+
+def read_table(file, columns=None):
+    """
+    Read a Parquet or CSV file, optionally only some of its columns.
+
+    Args:
+        file (str or file-like): The path or the open binary file.
+        columns (list, optional): The columns to read. They are returned in file order. Default is all columns.
+
+    Returns:
+        pandas.DataFrame: The data.
+    """
+    if columns is not None:
+        wanted = set(columns)
+        columns = [column for column in table_columns(file) if column in wanted]
+    if is_parquet(file):
+        return pd.read_parquet(file, columns=columns)
+    return pd.read_csv(file, usecols=columns)
+
+
+def iter_table_batches(file, columns, batch_size):
+    """
+    Read some columns of a Parquet or CSV file in batches of rows.
+
+    Args:
+        file (str or file-like): The path or the open binary file.
+        columns (list): The columns to read.
+        batch_size (int): The number of rows per batch.
+
+    Yields:
+        pandas.DataFrame: The batches.
+    """
+    if not is_parquet(file):
+        yield from pd.read_csv(file, usecols=columns, chunksize=batch_size)
+        return
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()